@@ -0,0 +1,67 @@
+"""对比旧的逐节点递归加载、单次查询 + 内存索引加载、以及懒加载（只读可见部分）的耗时
+
+用法（在仓库根目录）：python -m benchmarks.bench_load_tree --tasks 10000 50000
+"""
+import argparse
+import os
+import time
+
+from benchmarks.synthetic import generate_tree, open_temp_db
+from taskTreeLoader import load_children_index, load_visible_index
+
+
+def recursive_load(conn, parent_id=None):
+    """复刻原 _load_children 的查询方式：每个节点一次 SELECT，再在 Python 中排序"""
+    query = """
+            SELECT id, name, due_date,finish_time, completed,expanded
+            FROM tasks
+            WHERE parent_id IS NULL
+            ORDER BY sort_order
+            """ if parent_id is None else """
+            SELECT id, name, due_date,finish_time, completed,expanded
+            FROM tasks
+            WHERE parent_id = ?
+            ORDER BY sort_order
+            """
+    tasks = conn.execute(query, () if parent_id is None else (parent_id,)).fetchall()
+    tasks.sort(key=lambda t: t[4])
+    count = 0
+    for task in tasks:
+        count += 1 + recursive_load(conn, task[0])
+    return count
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--fanout", type=int, default=8)
+    parser.add_argument("--collapsed", type=float, default=0.5, help="折叠节点的比例（影响懒加载）")
+    args = parser.parse_args()
+
+    print(f"{'任务数':>8} {'递归加载(s)':>12} {'索引加载(s)':>12} {'加速比':>8} {'懒加载(s)':>10} {'可见任务':>8}")
+    for count in args.tasks:
+        conn, path = open_temp_db()
+        try:
+            generate_tree(conn, count, args.fanout)
+            conn.execute("UPDATE tasks SET expanded = (abs(random()) % 1000) >= ? WHERE parent_id IS NOT NULL",
+                         (int(args.collapsed * 1000),))
+            conn.commit()
+            old_time, _ = timed(recursive_load, conn)
+            new_time, _ = timed(load_children_index, conn)
+            lazy_time, (index, _) = timed(load_visible_index, conn)
+            visible = sum(len(tasks) for tasks in index.values())
+            print(f"{count:>8} {old_time:>12.4f} {new_time:>12.4f} {old_time / new_time:>7.1f}x"
+                  f" {lazy_time:>10.4f} {visible:>8}")
+        finally:
+            conn.close()
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
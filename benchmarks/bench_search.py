@@ -0,0 +1,50 @@
+"""按名称搜索的延迟：FTS5（trigram）与 LIKE 全表扫描对比（不依赖 Tk）
+
+用法（在仓库根目录）：python -m benchmarks.bench_search --tasks 100000 --queries 任务 12345 "任务 9" 99
+模拟边输入边搜索：每个查询依次搜索它的每个前缀，统计中位数与最大延迟。
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.bench_transfer import remove_db
+from benchmarks.synthetic import SHAPES, temp_db_path
+from taskSearch import search_tasks
+from taskStore import TaskStore
+
+
+def typing_latencies(conn, query, use_fts):
+    """依次搜索 query 的每个前缀，返回 [(毫秒, 匹配数)]"""
+    results = []
+    for end in range(1, len(query) + 1):
+        start = time.perf_counter()
+        _, matched, _ = search_tasks(conn, query[:end], use_fts=use_fts)
+        results.append(((time.perf_counter() - start) * 1000, len(matched)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=100000)
+    parser.add_argument("--shape", choices=sorted(SHAPES), default="mixed")
+    parser.add_argument("--queries", nargs="+", default=["任务 12345", "任务 9", "99999", "不存在"])
+    args = parser.parse_args()
+
+    store = TaskStore(temp_db_path())
+    try:
+        SHAPES[args.shape](store.conn, args.tasks)
+        modes = [("fts5", True), ("like", False)] if store.has_fts else [("like", False)]
+        print(f"{'查询':<12} {'方式':<6} {'中位数(ms)':>10} {'最大(ms)':>10} {'匹配数':>8}")
+        for query in args.queries:
+            for mode, use_fts in modes:
+                results = typing_latencies(store.conn, query, use_fts)
+                times = [ms for ms, _ in results]
+                print(f"{query:<12} {mode:<6} {statistics.median(times):>10.2f} {max(times):>10.2f}"
+                      f" {results[-1][1]:>8}")
+    finally:
+        store.close()
+        remove_db(store.path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""TaskStore 各操作在不同规模、不同形状任务树上的延迟与内存（不依赖 Tk）
+
+用法（在仓库根目录）：
+    python -m benchmarks.bench_store                      # 10k、100k，wide/deep/mixed
+    python -m benchmarks.bench_store --sizes 1000000 --shapes mixed --repeat 3
+升级前后各跑一次，对比输出即可发现性能回退。
+"""
+import argparse
+import os
+import statistics
+import sqlite3
+import time
+import tracemalloc
+
+from benchmarks.synthetic import SHAPES, temp_db_path
+from taskDatabase import migrate
+from taskDueViews import count_due_views
+from taskStore import TaskStore
+from taskTreeRenderer import PAGE_SIZE
+
+
+def build_store(shape, count):
+    path = temp_db_path()
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    SHAPES[shape](conn, count)
+    conn.close()
+    return TaskStore(path)
+
+
+def operations(store, count):
+    """返回 [(操作名, 调用, 是否可重复执行)]；目标任务按规模取中间与末尾的节点"""
+    mid = count // 2
+    leaf = count
+    victim = count * 3 // 4
+    return [
+        ("load_tree", lambda: store.load_tree(), True),
+        ("load_visible", lambda: store.load_visible(), True),
+        ("load_visible_page", lambda: store.load_visible_page(1, 0, PAGE_SIZE), True),
+        ("get_task", lambda: store.get_task(mid), True),
+        ("get_children", lambda: store.get_children(mid), True),
+        ("is_descendant", lambda: store.is_descendant(1, leaf), True),
+        ("count_due_views", lambda: count_due_views(store.conn), True),  # 不经缓存
+        ("load_due_view", lambda: store.load_due_view("overdue"), True),
+        ("add_task", lambda: store.add_task(mid, "新任务"), True),
+        ("move_task", lambda: store.move_task(leaf, 1), True),
+        ("swap_order", lambda: store.swap_order(mid, leaf), True),
+        ("move_beside", lambda: store.move_beside(leaf, mid, True), True),
+        ("toggle_completed", lambda: store.toggle_completed(mid), True),
+        ("delete_task", lambda: store.delete_task(victim), False),
+        ("archive_completed", lambda: store.archive_completed(), False),
+    ]
+
+
+def measure(fn, repeat):
+    """先在 tracemalloc 下执行一次取内存峰值，再不带追踪地计时"""
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--shapes", nargs="+", choices=sorted(SHAPES), default=["wide", "deep", "mixed"])
+    parser.add_argument("--repeat", type=int, default=5, help="每个可重复操作的计时次数")
+    args = parser.parse_args()
+
+    print(f"{'形状':<6} {'任务数':>8} {'操作':<18} {'中位数(ms)':>11} {'最大(ms)':>10} {'内存峰值(KiB)':>14}")
+    for shape in args.shapes:
+        for count in args.sizes:
+            store = build_store(shape, count)
+            try:
+                for label, fn, repeatable in operations(store, count):
+                    if repeatable:
+                        timings, peak = measure(fn, args.repeat)
+                    else:
+                        # 破坏性操作只执行一次，同时记录耗时和内存
+                        tracemalloc.start()
+                        start = time.perf_counter()
+                        fn()
+                        timings = [time.perf_counter() - start]
+                        peak = tracemalloc.get_traced_memory()[1]
+                        tracemalloc.stop()
+                    print(f"{shape:<6} {count:>8} {label:<18} {statistics.median(timings) * 1000:>11.2f}"
+                          f" {max(timings) * 1000:>10.2f} {peak / 1024:>14.0f}")
+            finally:
+                store.close()
+                for suffix in ("", "-wal", "-shm"):
+                    if os.path.exists(store.path + suffix):
+                        os.remove(store.path + suffix)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""对比逐节点递归与 WITH RECURSIVE 单语句的子树操作（删除、标记完成、后代判断）
+
+用法（在仓库根目录）：python -m benchmarks.bench_subtree_ops --wide 20000 --deep 900 5000
+"""
+import argparse
+import os
+import time
+
+from benchmarks.synthetic import generate_tree, open_temp_db
+from taskSubtree import delete_subtree, is_descendant, set_subtree_completed
+
+
+# ---- 原 TaskTreeApp 中的逐节点实现 ----
+def recursive_delete(conn, task_id):
+    for row in conn.execute("SELECT id FROM tasks WHERE parent_id = ?", (task_id,)).fetchall():
+        recursive_delete(conn, row[0])
+    conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+
+
+def recursive_set_completed(conn, task_id, status):
+    conn.execute("UPDATE tasks SET completed = ? WHERE id = ?", (status, task_id))
+    for row in conn.execute("SELECT id FROM tasks WHERE parent_id = ?", (task_id,)).fetchall():
+        recursive_set_completed(conn, row[0], status)
+
+
+def recursive_is_descendant(conn, parent_id, possible_child_id):
+    for row in conn.execute("SELECT id FROM tasks WHERE parent_id = ?", (parent_id,)).fetchall():
+        if row[0] == possible_child_id or recursive_is_descendant(conn, row[0], possible_child_id):
+            return True
+    return False
+
+
+def measure(count, fanout, operation, *args):
+    """在新生成的任务库上执行一次 operation（以根任务 1 为对象），返回耗时；递归溢出时返回 None"""
+    conn, path = open_temp_db()
+    try:
+        generate_tree(conn, count, fanout)
+        start = time.perf_counter()
+        try:
+            operation(conn, 1, *args)
+        except RecursionError:
+            return None
+        conn.commit()
+        return time.perf_counter() - start
+    finally:
+        conn.close()
+        os.remove(path)
+
+
+def fmt(seconds):
+    return f"{'递归溢出':>10}" if seconds is None else f"{seconds:>10.4f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--wide", type=int, nargs="*", default=[20000], help="宽树规模（每个节点 50 个子节点）")
+    parser.add_argument("--deep", type=int, nargs="*", default=[900, 5000], help="深树规模（单链）")
+    args = parser.parse_args()
+
+    cases = [("宽", count, 50) for count in args.wide] + [("深", count, 1) for count in args.deep]
+    operations = [
+        ("删除子树", recursive_delete, delete_subtree, ()),
+        ("标记完成", recursive_set_completed, set_subtree_completed, (1,)),
+        # 判断最后一个任务是否在根任务之下：两种实现都要走完整棵树/整条链
+        ("后代判断", recursive_is_descendant, is_descendant, None),
+    ]
+    print(f"{'形状':<4} {'任务数':>8} {'操作':<8} {'递归(s)':>10} {'CTE(s)':>10}")
+    for shape, count, fanout in cases:
+        for label, old, new, extra in operations:
+            op_args = (count,) if extra is None else extra
+            old_time = measure(count, fanout, old, *op_args)
+            new_time = measure(count, fanout, new, *op_args)
+            print(f"{shape:<4} {count:>8} {label:<8} {fmt(old_time)} {fmt(new_time)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""流式导入 / 导出的耗时与内存峰值（不依赖 Tk）
+
+用法（在仓库根目录）：python -m benchmarks.bench_transfer --tasks 500000 --formats jsonl csv md
+加 --memory 时用 tracemalloc 统计内存峰值（追踪本身会让耗时明显变长）。
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic import SHAPES, temp_db_path
+from taskStore import TaskStore
+
+
+def timed(fn, *args, trace=False):
+    """返回 (结果, 耗时, 内存峰值)；不追踪内存时峰值为 None"""
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    peak = None
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def fmt_peak(peak):
+    return f"{'-':>14}" if peak is None else f"{peak / 1024:>14.0f}"
+
+
+def remove_db(path):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=100000)
+    parser.add_argument("--shape", choices=sorted(SHAPES), default="mixed")
+    parser.add_argument("--formats", nargs="+", choices=["jsonl", "json", "csv", "md"], default=["jsonl", "csv", "md"])
+    parser.add_argument("--memory", action="store_true", help="同时统计内存峰值")
+    args = parser.parse_args()
+
+    source = TaskStore(temp_db_path())
+    SHAPES[args.shape](source.conn, args.tasks)
+    print(f"{'格式':<6} {'导出(s)':>8} {'导出内存(KiB)':>14} {'导入(s)':>8} {'导入内存(KiB)':>14} {'任务数':>8}")
+    try:
+        for fmt in args.formats:
+            export_path = os.path.join(tempfile.gettempdir(), f"bench_transfer.{fmt}")
+            target = TaskStore(temp_db_path())
+            try:
+                _, export_time, export_peak = timed(source.export_tasks, export_path, trace=args.memory)
+                count, import_time, import_peak = timed(target.import_tasks, export_path, trace=args.memory)
+                print(f"{fmt:<6} {export_time:>8.2f} {fmt_peak(export_peak)}"
+                      f" {import_time:>8.2f} {fmt_peak(import_peak)} {count:>8}")
+            finally:
+                target.close()
+                remove_db(target.path)
+                os.remove(export_path)
+    finally:
+        source.close()
+        remove_db(source.path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import os
+import random
+import sqlite3
+import tempfile
+
+from taskDatabase import migrate
+from taskJournal import forget
+from taskRollups import rebuild_all
+
+INSERT_SQL = ("INSERT INTO tasks (id, name, due_date, parent_id, completed, sort_order, completed_at) "
+              "VALUES (?, ?, ?, ?, ?, ?, ?)")
+
+
+def temp_db_path():
+    fd, path = tempfile.mkstemp(prefix="bench_", suffix=".db")
+    os.close(fd)
+    return path
+
+
+def open_temp_db():
+    """在临时目录创建一个空的任务库，返回 (conn, path)"""
+    path = temp_db_path()
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    return conn, path
+
+
+def _task_row(task_id, parent_id, order):
+    due = f"2025-{(task_id % 12) + 1:02d}-{(task_id % 28) + 1:02d}" if task_id % 3 == 0 else None
+    completed = int(task_id % 5 == 0)
+    return task_id, f"任务 {task_id}", due, parent_id, completed, order, "2025-01-01 00:00:00" if completed else None
+
+
+def _finish(conn):
+    """直接插入的行不经过 TaskStore：补算子树汇总，丢掉触发器记下的撤销日志，使库与正常使用时一致"""
+    rebuild_all(conn)
+    forget(conn)
+    conn.commit()
+
+
+def generate_tree(conn, count, fanout):
+    """按层序生成 count 个任务，每个节点最多 fanout 个子节点；fanout=1 即一条深链"""
+    def rows():
+        for task_id in range(1, count + 1):
+            if task_id == 1 or fanout <= 0:
+                yield _task_row(task_id, None, task_id)
+            else:
+                yield _task_row(task_id, (task_id - 2) // fanout + 1, (task_id - 2) % fanout + 1)
+
+    conn.executemany(INSERT_SQL, rows())
+    _finish(conn)
+
+
+def generate_mixed_tree(conn, count, seed=0, window=1000):
+    """宽窄深浅混合：每个任务的父节点从最近 window 个任务中随机挑选，少量任务为根任务"""
+    rng = random.Random(seed)
+
+    def rows():
+        child_counts = {}
+        for task_id in range(1, count + 1):
+            if task_id == 1 or rng.random() < 0.001:
+                parent_id = None
+            else:
+                parent_id = rng.randint(max(1, task_id - window), task_id - 1)
+            order = child_counts[parent_id] = child_counts.get(parent_id, 0) + 1
+            yield _task_row(task_id, parent_id, order)
+
+    conn.executemany(INSERT_SQL, rows())
+    _finish(conn)
+
+
+# 性能测试使用的树形状
+SHAPES = {
+    "wide": lambda conn, count: generate_tree(conn, count, 500),
+    "deep": lambda conn, count: generate_tree(conn, count, 1),
+    "mixed": generate_mixed_tree,
+}
@@ -0,0 +1,118 @@
+import queue
+import threading
+from concurrent.futures import Future
+from time import perf_counter
+
+from taskProfiler import PROFILER
+
+
+class DbWorker:
+    """独占一个 TaskStore（及其 SQLite 连接）的后台线程。
+
+    界面线程用 submit(fn, *args) 投递请求，fn 在后台线程中以 fn(store, *args) 执行
+    （通常直接传 TaskStore 的方法，如 TaskStore.add_task）；
+    结果通过 root.after 轮询交回界面线程，再调用 callback / errback，
+    因此 Tk 主循环不会因磁盘慢或大事务而卡住。请求按投递顺序依次执行。
+    """
+
+    def __init__(self, root, open_store, poll_ms=15, on_busy=None, on_error=None):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.on_busy = on_busy  # on_busy(bool)：有/无未完成请求时调用，用于显示忙碌状态
+        self.on_error = on_error  # 未指定 errback 时的默认错误处理
+        self.pending = 0
+        self._busy = 0  # 未完成的非 quiet 请求数
+        self._busy_shown = False
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._poll_id = None
+        ready = Future()
+        self._thread = threading.Thread(target=self._run, args=(open_store, ready), name="db-worker", daemon=True)
+        self._thread.start()
+        ready.result()  # 打开连接 / 升级结构失败时在这里抛出
+
+    def _run(self, open_store, ready):
+        try:
+            store = open_store()
+        except BaseException as e:
+            ready.set_exception(e)
+            return
+        ready.set_result(None)
+        while True:
+            request = self._requests.get()
+            if request is None:
+                break
+            future, fn, args = request
+            start = perf_counter()
+            try:
+                result = fn(store, *args)
+            except BaseException as e:
+                if store.in_transaction:
+                    store.rollback()
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            if PROFILER.enabled:
+                PROFILER.record("db", getattr(fn, "__qualname__", repr(fn)), perf_counter() - start)
+        store.close()
+
+    def submit(self, fn, *args, callback=None, errback=None, quiet=False):
+        """投递一个请求，返回 Future；callback(result) / errback(exc) 在界面线程中调用。
+        quiet=True 的请求（如定时轮询）不触发 on_busy，避免忙碌提示闪烁"""
+        future = Future()
+        future.add_done_callback(lambda done: self._results.put((done, callback, errback, quiet)))
+        self._requests.put((future, fn, args))
+        self.pending += 1
+        if not quiet:
+            self._busy += 1
+            if not self._busy_shown and self.on_busy:
+                self.on_busy(True)
+            self._busy_shown = True
+        if self._poll_id is None:
+            self._poll_id = self.root.after(self.poll_ms, self._poll)
+        return future
+
+    def _poll(self):
+        self._poll_id = None
+        try:
+            while True:
+                try:
+                    future, callback, errback, quiet = self._results.get_nowait()
+                except queue.Empty:
+                    break
+                self.pending -= 1
+                if not quiet:
+                    self._busy -= 1
+                self._deliver(future, callback, errback)
+        finally:
+            # 即使回调出错也要继续轮询、收起忙碌提示，否则之后的结果都会停在队列里
+            if self.pending:
+                self._poll_id = self.root.after(self.poll_ms, self._poll)
+            if self._busy_shown and not self._busy:
+                self._busy_shown = False
+                if self.on_busy:
+                    self.on_busy(False)
+
+    def _deliver(self, future, callback, errback):
+        """在界面线程中调用 callback / errback；它们抛出的异常交给 on_error，不影响其余结果"""
+        try:
+            error = future.exception()
+            if error is not None:
+                handler = errback or self.on_error
+                if handler:
+                    handler(error)
+            elif callback:
+                callback(future.result())
+        except Exception as e:
+            if self.on_error:
+                self.on_error(e)
+            else:
+                self.root.report_callback_exception(type(e), e, e.__traceback__)
+
+    def close(self):
+        """执行完已投递的请求后关闭 TaskStore"""
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        self._requests.put(None)
+        self._thread.join()
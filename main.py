@@ -1,16 +1,13 @@
-import tkinter as tk
-from tkinter import font, ttk
+import sys
 
-from taskTreeApp import TaskTreeApp
-from screeninfo import get_monitors
 
+def run_gui():
+    # 界面模块只在打开窗口时导入，命令行模式不必加载 Tk 与 tkcalendar
+    import tkinter as tk
+    from tkinter import font, ttk
 
+    from taskTreeApp import TaskTreeApp
 
-
-
-if __name__ == "__main__":
-    for m in get_monitors():
-        print(m)
     win_width = 1000
     win_hegiht = 600
     root = tk.Tk()
@@ -30,3 +27,11 @@ if __name__ == "__main__":
     tree_style.configure("Treeview.Heading", font=default_font)
     app = TaskTreeApp(root)
     root.mainloop()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # 带参数时为命令行模式，见 taskCli.py
+        from taskCli import main
+        sys.exit(main(sys.argv[1:]))
+    run_gui()
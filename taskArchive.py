@@ -0,0 +1,155 @@
+# 归档：把早已完成的整棵子树从 tasks 移到 tasks_archive（同一数据库文件中的冷表），
+# 日常加载、排序、汇总只涉及进行中的任务。归档表与 tasks 在同一个文件里，
+# 移入 / 移出都在一个事务内完成；tasks 的 id 是 AUTOINCREMENT，不会重用，恢复时保留原 id。
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from taskOrdering import next_order
+from taskRollups import add_counts, rebuild_subtrees, refresh_due
+
+ARCHIVE_AFTER_DAYS = 30  # 默认归档完成超过多少天的任务
+
+ARCHIVE_COLUMNS = "id, parent_id, name, due_date, finish_time, completed, sort_order, expanded, completed_at"
+
+ARCHIVE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS tasks_archive (
+        id INTEGER PRIMARY KEY,
+        parent_id INTEGER,
+        name TEXT NOT NULL,
+        due_date TEXT,
+        finish_time TEXT,
+        completed INTEGER,
+        sort_order INTEGER,
+        expanded INTEGER,
+        completed_at TEXT,
+        archived_at TEXT
+    )
+"""
+
+# 可归档 = 自身完成早于 cutoff，且子树中没有未完成 / 新近完成的任务。
+# 先从所有“新鲜”任务向上找出被它们挡住的祖先（UNION 去重，每个节点只走一次），其余旧的已完成任务即可归档
+ARCHIVABLE_SQL = """
+    WITH RECURSIVE blocked(id) AS (
+        SELECT parent_id FROM tasks
+        WHERE (completed = 0 OR completed_at IS NULL OR completed_at >= :cutoff) AND parent_id IS NOT NULL
+        UNION
+        SELECT t.parent_id FROM tasks t JOIN blocked b ON t.id = b.id WHERE t.parent_id IS NOT NULL
+    )
+    INSERT INTO temp.archive_ids
+    SELECT id FROM tasks WHERE completed = 1 AND completed_at < :cutoff AND id NOT IN blocked
+"""
+
+# 归档子树的根（父任务不在本次归档范围内）把自身数量沿祖先链向上传递，按祖先合计后一次性减去；
+# 归档的子树可能有成千上万棵，逐棵 add_counts 会把同一段祖先链更新成千上万次
+ARCHIVED_COUNTS_SQL = """
+    INSERT INTO temp.archive_counts
+    WITH RECURSIVE up(id, total, done) AS (
+        SELECT t.parent_id, 1 + t.sub_total, t.completed + t.sub_done
+        FROM tasks t JOIN temp.archive_ids a ON a.id = t.id
+        WHERE t.parent_id IS NOT NULL AND t.parent_id NOT IN temp.archive_ids
+        UNION ALL
+        SELECT t.parent_id, u.total, u.done FROM tasks t JOIN up u ON t.id = u.id WHERE t.parent_id IS NOT NULL
+    )
+    SELECT id, SUM(total), SUM(done) FROM up GROUP BY id
+"""
+
+APPLY_COUNTS_SQL = """
+    UPDATE tasks SET (sub_total, sub_done) = (
+        SELECT tasks.sub_total - c.total, tasks.sub_done - c.done FROM temp.archive_counts c WHERE c.id = tasks.id
+    )
+    WHERE id IN (SELECT id FROM temp.archive_counts)
+"""
+
+ARCHIVE_SUBTREE_CTE = """
+    WITH RECURSIVE subtree(id) AS (
+        SELECT :root
+        UNION ALL
+        SELECT a.id FROM tasks_archive a JOIN subtree s ON a.parent_id = s.id
+    )
+"""
+
+# 归档箱中的一行；has_children 用于显示展开箭头
+ArchivedRow = namedtuple("ArchivedRow", "id parent_id name due_date completed_at archived_at has_children")
+
+ARCHIVED_ROW_SQL = """
+    SELECT id, parent_id, name, due_date, completed_at, archived_at,
+           EXISTS(SELECT 1 FROM tasks_archive c WHERE c.parent_id = a.id)
+    FROM tasks_archive a
+"""
+
+
+def create_archive_table(conn):
+    conn.execute(ARCHIVE_TABLE_SQL)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_archive_parent ON tasks_archive(parent_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_archive_archived_at ON tasks_archive(archived_at)")
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def archive_completed(conn, days=ARCHIVE_AFTER_DAYS):
+    """把完成超过 days 天的整棵子树移入归档表，返回归档的任务数（调用方负责事务）"""
+    cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS archive_ids (id INTEGER PRIMARY KEY)")
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS archive_counts (id INTEGER PRIMARY KEY, total INTEGER, done INTEGER)")
+    try:
+        conn.execute(ARCHIVABLE_SQL, {"cutoff": cutoff})
+        conn.execute(ARCHIVED_COUNTS_SQL)
+        conn.execute(APPLY_COUNTS_SQL)  # 归档的都已完成，不影响最早截止日期
+        conn.execute(f"INSERT INTO tasks_archive ({ARCHIVE_COLUMNS}, archived_at) "
+                     f"SELECT {ARCHIVE_COLUMNS}, ? FROM tasks WHERE id IN temp.archive_ids", (_now(),))
+        conn.execute("DELETE FROM tasks WHERE id IN temp.archive_ids")
+        return conn.execute("SELECT changes()").fetchone()[0]
+    finally:
+        conn.execute("DELETE FROM temp.archive_ids")
+        conn.execute("DELETE FROM temp.archive_counts")
+
+
+def restore_archived(conn, archived_id):
+    """把归档中的 archived_id 及其子树移回 tasks：原父任务还在时放回其末尾，否则作为根任务。
+    archived_id 不在归档中时返回 False（调用方负责事务）"""
+    row = conn.execute("SELECT parent_id FROM tasks_archive WHERE id = ?", (archived_id,)).fetchone()
+    if row is None:
+        return False
+    parent_id = row[0]
+    if parent_id is not None and conn.execute("SELECT 1 FROM tasks WHERE id = ?", (parent_id,)).fetchone() is None:
+        parent_id = None
+    conn.execute(
+        ARCHIVE_SUBTREE_CTE + f"""
+        INSERT INTO tasks ({ARCHIVE_COLUMNS})
+        SELECT id, CASE WHEN id = :root THEN :parent ELSE parent_id END, name, due_date, finish_time, completed,
+               CASE WHEN id = :root THEN :order ELSE sort_order END, expanded, completed_at
+        FROM tasks_archive WHERE id IN subtree
+        """,
+        {"root": archived_id, "parent": parent_id, "order": next_order(conn, parent_id)})
+    conn.execute(ARCHIVE_SUBTREE_CTE + "DELETE FROM tasks_archive WHERE id IN subtree", {"root": archived_id})
+    rebuild_subtrees(conn, "SELECT ? AS id", (archived_id,))
+    total, done = conn.execute("SELECT 1 + sub_total, completed + sub_done FROM tasks WHERE id = ?",
+                               (archived_id,)).fetchone()
+    add_counts(conn, parent_id, total, done)
+    refresh_due(conn, parent_id)
+    return True
+
+
+def load_archived(conn, parent_id=None, text="", limit=500):
+    """归档箱的一层：parent_id 为 None 时是各归档子树的根（最近归档的在前）；
+    text 非空时忽略层级，列出名称包含 text 的归档任务"""
+    if text:
+        escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        sql = ARCHIVED_ROW_SQL + "WHERE name LIKE ? ESCAPE '\\' ORDER BY archived_at DESC, id LIMIT ?"
+        params = (f"%{escaped}%", limit)
+    elif parent_id is None:
+        sql = ARCHIVED_ROW_SQL + """
+            WHERE parent_id IS NULL OR parent_id NOT IN (SELECT id FROM tasks_archive)
+            ORDER BY archived_at DESC, id LIMIT ?
+        """
+        params = (limit,)
+    else:
+        sql = ARCHIVED_ROW_SQL + "WHERE parent_id = ? ORDER BY sort_order, id LIMIT ?"
+        params = (parent_id, limit)
+    return [ArchivedRow._make(row) for row in conn.execute(sql, params)]
+
+
+def count_archived(conn):
+    return conn.execute("SELECT COUNT(*) FROM tasks_archive").fetchone()[0]
@@ -0,0 +1,104 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+from taskProfiler import profiled
+from taskStore import TaskStore
+
+PLACEHOLDER = "__archive_placeholder__"
+
+
+class TaskArchiveDialog(tk.Toplevel):
+    """归档箱：按需读取归档表，一次只加载一层，可按名称筛选、恢复选中的任务。
+    所有查询都通过界面的 DbWorker 在后台线程中执行"""
+
+    @profiled
+    def __init__(self, master, db, on_restored=None):
+        super().__init__(master)
+        self.title("归档箱")
+        self.geometry("640x420")
+        self.db = db
+        self.on_restored = on_restored  # 恢复完成后调用（刷新主界面任务树）
+        self._filter_after = None
+        self._filter_seq = 0
+
+        top = tk.Frame(self)
+        top.pack(fill="x", padx=10, pady=(10, 0))
+        tk.Label(top, text="🔍").pack(side="left")
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add("write", self._on_filter_changed)
+        tk.Entry(top, textvariable=self.filter_var, width=24).pack(side="left")
+        self.count_label = tk.Label(top, text="", fg="gray")
+        self.count_label.pack(side="right")
+
+        self.tree = ttk.Treeview(self, columns=("completed_at", "archived_at"), show="tree headings")
+        self.tree.heading("#0", text="任务名称")
+        self.tree.heading("completed_at", text="完成于")
+        self.tree.heading("archived_at", text="归档于")
+        self.tree.column("#0", width=300)
+        self.tree.column("completed_at", width=140)
+        self.tree.column("archived_at", width=140)
+        self.tree.pack(fill="both", expand=True, padx=10, pady=10)
+        self.tree.bind("<<TreeviewOpen>>", self._on_open)
+
+        bottom = tk.Frame(self)
+        bottom.pack(fill="x", padx=10, pady=(0, 10))
+        tk.Button(bottom, text="♻️ 恢复选中", command=self.restore_selected).pack(side="left")
+        tk.Button(bottom, text="关闭", command=self.destroy).pack(side="right")
+
+        self.reload()
+
+    def reload(self):
+        self._filter_seq += 1
+        seq = self._filter_seq
+        self.db.submit(TaskStore.load_archived, None, self.filter_var.get().strip(),
+                       callback=lambda rows: self._fill(seq, "", rows))
+        self.db.submit(TaskStore.count_archived, callback=self._show_count)
+
+    def _show_count(self, count):
+        if self.winfo_exists():
+            self.count_label.config(text=f"共 {count} 个归档任务")
+
+    def _fill(self, seq, parent, rows):
+        if not self.winfo_exists() or (seq != self._filter_seq):
+            return  # 窗口已关闭，或结果已被更新的筛选取代
+        self.tree.delete(*self.tree.get_children(parent))
+        filtering = bool(self.filter_var.get().strip())
+        for row in rows:
+            item = str(row.id)
+            self.tree.insert(parent, "end", iid=item, text=row.name,
+                             values=(row.completed_at or "", row.archived_at or ""))
+            if row.has_children and not filtering:
+                self.tree.insert(item, "end", iid=f"{PLACEHOLDER}{item}", text="…")  # 展开时再读取
+
+    def _on_open(self, event):
+        item = self.tree.focus()
+        children = self.tree.get_children(item)
+        if len(children) == 1 and children[0].startswith(PLACEHOLDER):
+            seq = self._filter_seq
+            self.db.submit(TaskStore.load_archived, int(item),
+                           callback=lambda rows: self._fill(seq, item, rows))
+
+    def _on_filter_changed(self, *args):
+        # 输入防抖：停顿 150ms 后再查询
+        if self._filter_after is not None:
+            self.after_cancel(self._filter_after)
+        self._filter_after = self.after(150, self._run_filter)
+
+    def _run_filter(self):
+        self._filter_after = None
+        self.reload()
+
+    def restore_selected(self):
+        ids = [int(item) for item in self.tree.selection() if not item.startswith(PLACEHOLDER)]
+        if not ids:
+            return
+        if not messagebox.askyesno("恢复任务", f"确定将选中的 {len(ids)} 个任务（含子任务）恢复到任务树中吗？",
+                                   parent=self):
+            return
+        self.db.submit(TaskStore.restore_archived, ids, callback=self._on_restored)
+
+    def _on_restored(self, placements):
+        if self.on_restored:
+            self.on_restored()
+        if self.winfo_exists():
+            self.reload()
@@ -0,0 +1,102 @@
+# 在线快照备份：用 SQLite 的在线备份 API（Connection.backup）把任务库复制到 backups 目录。
+# 在独立线程、独立连接上执行，不占用界面线程和 DbWorker；WAL 模式下读连接不阻塞写入，
+# 一次复制全部页面（pages=-1），快照对应同一时刻，不会因其他连接写入而从头重来
+import os
+import sqlite3
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+
+BACKUP_INTERVAL_S = 30 * 60  # 定期备份的间隔
+BACKUP_KEEP = 10  # 保留最近的快照数
+BACKUP_DIR = "backups"
+
+
+def backup_dir(db_path):
+    """快照目录：任务库所在目录下的 backups"""
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), BACKUP_DIR)
+
+
+def snapshot(conn, db_path, keep=BACKUP_KEEP):
+    """把 conn 所连接的任务库复制为 backups/<库名>-<时间>.db，返回快照路径；只保留最近 keep 个。
+    先写入临时文件，完成后再改名，中途失败不会留下残缺的快照"""
+    directory = backup_dir(db_path)
+    os.makedirs(directory, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(db_path))[0]
+    path = os.path.join(directory, f"{stem}-{datetime.now():%Y%m%d-%H%M%S}.db")
+    partial = path + ".part"
+    target = sqlite3.connect(partial)
+    try:
+        conn.backup(target)
+    finally:
+        target.close()
+    os.replace(partial, path)
+    snapshots = sorted(name for name in os.listdir(directory) if name.startswith(stem + "-") and name.endswith(".db"))
+    for name in snapshots[:-keep]:
+        os.remove(os.path.join(directory, name))
+    return path
+
+
+def backup_once(db_path, keep=BACKUP_KEEP):
+    """立即备份一次（命令行 / 脚本使用），返回快照路径"""
+    conn = sqlite3.connect(db_path)
+    try:
+        return snapshot(conn, db_path, keep)
+    finally:
+        conn.close()
+
+
+class BackupScheduler:
+    """后台线程：每隔 interval 秒备份一次，任务库自上次备份以来没有变化时跳过。
+    request() 要求立即备份，返回 Future（结果为快照路径）；stop() 等当前备份完成后退出"""
+
+    def __init__(self, db_path, interval=BACKUP_INTERVAL_S, keep=BACKUP_KEEP):
+        self.db_path = db_path
+        self.interval = interval
+        self.keep = keep
+        self._wake = threading.Event()
+        self._stopping = False
+        self._requests = []  # 等待立即备份结果的 Future
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="db-backup", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def request(self):
+        future = Future()
+        with self._lock:
+            self._requests.append(future)
+        self._wake.set()
+        return future
+
+    def stop(self):
+        self._stopping = True
+        self._wake.set()
+        self._thread.join()
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path)
+        last_version = None  # 上次备份时的 data_version，只在其他连接提交后变化
+        try:
+            while not self._stopping:
+                self._wake.wait(self.interval)
+                self._wake.clear()
+                with self._lock:
+                    requests, self._requests = self._requests, []
+                if self._stopping and not requests:
+                    break
+                version = conn.execute("PRAGMA data_version").fetchone()[0]
+                if not requests and version == last_version:
+                    continue
+                try:
+                    path = snapshot(conn, self.db_path, self.keep)
+                except Exception as e:
+                    for future in requests:
+                        future.set_exception(e)
+                    continue  # 定期备份失败时等下一次再试
+                last_version = version
+                for future in requests:
+                    future.set_result(path)
+        finally:
+            conn.close()
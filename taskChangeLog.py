@@ -0,0 +1,72 @@
+# 变更日志：触发器把 tasks 中每一行的增删改记入 task_changes（自增序号 + 任务 id），
+# 多个实例 / 命令行脚本共用同一个数据库时，各实例只需取回上次同步之后变化的任务。
+# 展开 / 折叠状态（expanded）是各窗口自己的界面状态，不记录。
+# 日志只保留最近 CHANGE_LOG_KEEP 条，落后更多的实例改为整树重载。
+# 批量导入不逐行记录，只写一条 task_id 为 RELOAD_ID 的记录，其他实例见到它时整树重载
+from collections import namedtuple
+
+CHANGE_LOG_KEEP = 20000
+SYNC_LIMIT = 1000  # 一次变化的任务超过这个数时整树重载，比逐个定位更快
+RELOAD_ID = 0  # 任务 id 从 1 开始，0 不会与真实任务混淆
+
+CHANGE_LOG_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS task_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_id INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TRIGGER tasks_log_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO task_changes (task_id) VALUES (new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER tasks_log_delete AFTER DELETE ON tasks BEGIN
+        INSERT INTO task_changes (task_id) VALUES (old.id);
+    END
+    """,
+    """
+    CREATE TRIGGER tasks_log_update
+    AFTER UPDATE OF name, due_date, finish_time, completed, parent_id, sort_order, sub_total, sub_done, sub_due
+    ON tasks BEGIN
+        INSERT INTO task_changes (task_id) VALUES (new.id);
+    END
+    """,
+    # 每写入 1000 条裁剪一次，日志大小保持在常数范围内
+    f"""
+    CREATE TRIGGER task_changes_prune AFTER INSERT ON task_changes WHEN new.seq % 1000 = 0 BEGIN
+        DELETE FROM task_changes WHERE seq <= new.seq - {CHANGE_LOG_KEEP};
+    END
+    """,
+]
+
+# 其他连接提交后的变化；reload 为 True 时变化太多或日志已被裁剪，应整树重载
+ChangeSet = namedtuple("ChangeSet", "reload removed placements")
+
+
+def create_change_log(conn):
+    for sql in CHANGE_LOG_SQL:
+        conn.execute(sql)
+
+
+def log_reload(conn):
+    """记录一次无法逐个同步的大量变化（批量导入），其他实例整树重载"""
+    conn.execute("INSERT INTO task_changes (task_id) VALUES (?)", (RELOAD_ID,))
+
+
+def latest_seq(conn):
+    return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM task_changes").fetchone()[0]
+
+
+def changed_since(conn, seq, limit=SYNC_LIMIT):
+    """序号 seq 之后变化的任务，返回 (最新序号, 任务 id 列表)；
+    日志已被裁剪到 seq 之后、变化的任务超过 limit，或其中有批量导入时任务 id 列表为 None"""
+    oldest, newest = conn.execute("SELECT MIN(seq), MAX(seq) FROM task_changes").fetchone()
+    if newest is None or newest <= seq:
+        return seq, []
+    if oldest > seq + 1:
+        return newest, None
+    ids = [row[0] for row in conn.execute(
+        "SELECT DISTINCT task_id FROM task_changes WHERE seq > ? AND seq <= ? LIMIT ?", (seq, newest, limit + 1))]
+    return newest, (ids if len(ids) <= limit and RELOAD_ID not in ids else None)
@@ -0,0 +1,184 @@
+"""命令行模式：不启动 Tk、不导入界面模块，直接读写 task_tree.db，适合 cron、git hook 等脚本调用
+
+用法（在 main.py 所在目录）：
+    python main.py add "写周报" --due 2025-01-31          # 输出新任务的 id
+    python main.py add "整理数据" --parent 12
+    python main.py done 12 15                             # 连同子任务标记为完成；--undo 取消完成
+    python main.py list [--parent 12] [--depth 2] [--sort name|due|finish [--desc]]
+    python main.py search 周报
+    python main.py due overdue|today|week|none
+    python main.py undo | redo                            # 撤销 / 重做命令行最近一步修改（不涉及窗口中的修改）
+    python main.py backup                                 # 立即做一次快照，输出快照路径
+"""
+import argparse
+import sys
+from datetime import date
+
+from taskBackup import backup_once
+from taskDueViews import DUE_VIEWS
+from taskProfiler import PROFILER
+from taskSorting import SORT_COLUMNS, SortOrder
+from taskStore import TaskStore
+from taskTreeLoader import progress_text
+
+DB_PATH = "task_tree.db"
+SESSION = "cli"  # 各次命令行调用共用一个撤销会话，下一次调用可以撤销上一次的修改
+
+
+def _due_date(text):
+    try:
+        return date.fromisoformat(text).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"日期格式应为 YYYY-MM-DD：{text}")
+
+
+def format_task(task, depth=0, matched=False):
+    """一行任务：缩进、完成标记、id、名称，再附上截止日期与子任务进度"""
+    parts = [f"{'  ' * depth}[{'x' if task.completed else ' '}] {task.id} {task.name}"]
+    if task.due_date:
+        parts.append(f"截止 {task.due_date}")
+    if task.finish_time:
+        parts.append(f"完成 {task.finish_time}")
+    progress = progress_text(task)
+    if progress:
+        parts.append(f"子任务 {progress}")
+    line = "  ".join(parts)
+    return f"{line}  *" if matched else line
+
+
+def print_index(index, parent_id=None, max_depth=None, matched=()):
+    """按显示顺序打印 parent_id 之下的任务；matched 中的任务行末标 *。返回打印的行数"""
+    count = 0
+    stack = [(task, 0) for task in reversed(index.get(parent_id, ()))]
+    while stack:
+        task, depth = stack.pop()
+        print(format_task(task, depth, task.id in matched))
+        count += 1
+        if max_depth is None or depth + 1 < max_depth:
+            stack.extend((child, depth + 1) for child in reversed(index.get(task.id, ())))
+    return count
+
+
+def cmd_add(store, args):
+    if args.parent is not None and store.get_task(args.parent) is None:
+        return _fail(f"任务 {args.parent} 不存在")
+    task, _ = store.add_task(args.parent, args.name, args.due)
+    print(task.id)
+    return 0
+
+
+def cmd_done(store, args):
+    missing = [task_id for task_id in args.ids if store.get_task(task_id) is None]
+    if missing:
+        return _fail(f"任务不存在：{', '.join(map(str, missing))}")
+    for task, _ in store.set_completed_many(args.ids, 0 if args.undo else 1):
+        print(format_task(task))
+    return 0
+
+
+def cmd_list(store, args):
+    if args.parent is not None and store.get_task(args.parent) is None:
+        return _fail(f"任务 {args.parent} 不存在")
+    if args.sort:
+        store.set_sort(SortOrder(args.sort, args.desc))
+    print_index(store.load_tree(), args.parent, args.depth)
+    return 0
+
+
+def _print_filtered(result, label):
+    index, matched, truncated = result
+    print_index(index, matched=matched)
+    if truncated:
+        print(f"{label}超过 {len(matched)} 个任务，只列出前 {len(matched)} 个", file=sys.stderr)
+    else:
+        print(f"{label} {len(matched)} 个任务", file=sys.stderr)
+    return 0
+
+
+def cmd_search(store, args):
+    return _print_filtered(store.search(args.text), "搜索到")
+
+
+def cmd_due(store, args):
+    return _print_filtered(store.load_due_view(args.view), DUE_VIEWS[args.view])
+
+
+def cmd_undo(store, args):
+    try:
+        if store.undo() is None:
+            return _fail("没有可撤销的修改")
+    except ValueError as e:
+        return _fail(str(e))
+    print("已撤销")
+    return 0
+
+
+def cmd_redo(store, args):
+    try:
+        if store.redo() is None:
+            return _fail("没有可重做的修改")
+    except ValueError as e:
+        return _fail(str(e))
+    print("已重做")
+    return 0
+
+
+def cmd_backup(store, args):
+    print(backup_once(args.db))
+    return 0
+
+
+def _fail(message):
+    print(message, file=sys.stderr)
+    return 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="main.py", description="任务清单命令行模式（不带参数运行时打开窗口）")
+    parser.add_argument("--db", default=DB_PATH, help=f"任务库路径（默认 {DB_PATH}）")
+    parser.add_argument("--profile", action="store_true", help="结束时把每条 SQL 语句的耗时统计输出到标准错误")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="添加任务，输出新任务的 id")
+    add.add_argument("name")
+    add.add_argument("--parent", type=int, help="父任务 id，不指定时为根任务")
+    add.add_argument("--due", type=_due_date, help="截止日期 YYYY-MM-DD")
+    add.set_defaults(run=cmd_add)
+
+    done = commands.add_parser("done", help="把任务连同子任务标记为完成")
+    done.add_argument("ids", type=int, nargs="+")
+    done.add_argument("--undo", action="store_true", help="改为标记为未完成")
+    done.set_defaults(run=cmd_done)
+
+    tree = commands.add_parser("list", help="按显示顺序列出任务树")
+    tree.add_argument("--parent", type=int, help="只列出该任务的子树")
+    tree.add_argument("--depth", type=int, help="最多显示几层")
+    tree.add_argument("--sort", choices=list(SORT_COLUMNS), help="每一级内按名称 / 截止时间 / 完成时间排序（默认手动顺序）")
+    tree.add_argument("--desc", action="store_true", help="与 --sort 一起使用，改为降序")
+    tree.set_defaults(run=cmd_list)
+
+    search = commands.add_parser("search", help="按名称搜索，列出匹配的任务及其所在分支（匹配行末标 *）")
+    search.add_argument("text")
+    search.set_defaults(run=cmd_search)
+
+    due = commands.add_parser("due", help="截止日期视图：" + "，".join(f"{key} {label}" for key, label in DUE_VIEWS.items()))
+    due.add_argument("view", choices=list(DUE_VIEWS))
+    due.set_defaults(run=cmd_due)
+
+    commands.add_parser("undo", help="撤销命令行最近一步修改").set_defaults(run=cmd_undo)
+    commands.add_parser("redo", help="重做命令行最近撤销的一步").set_defaults(run=cmd_redo)
+    commands.add_parser("backup", help="立即备份到任务库所在目录的 backups 下，输出快照路径").set_defaults(run=cmd_backup)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    PROFILER.enabled = PROFILER.enabled or args.profile
+    store = TaskStore(args.db, session=SESSION)
+    try:
+        return args.run(store, args)
+    finally:
+        store.close()
+        if args.profile:
+            print(PROFILER.report(), file=sys.stderr)
+        PROFILER.write_log()
@@ -0,0 +1,166 @@
+# 数据库结构版本管理：PRAGMA user_version 记录已执行到第几步，每一步只执行一次
+import sqlite3
+
+from taskArchive import create_archive_table
+from taskChangeLog import create_change_log
+from taskJournal import create_journal
+from taskProfiler import ProfiledConnection
+from taskOrdering import renumber_all
+from taskRollups import rebuild_all
+
+TASKS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        due_date TEXT,
+        parent_id INTEGER,
+        completed INTEGER DEFAULT 0,
+        sort_order INTEGER DEFAULT 0,
+        expanded INTEGER DEFAULT 1,  -- 1=展开，0=折叠
+        finish_time TEXT,
+        FOREIGN KEY(parent_id) REFERENCES tasks(id)
+    )
+'''
+
+# 旧版本数据库可能缺少的字段
+LEGACY_COLUMNS = [
+    ("sort_order", "INTEGER DEFAULT 0"),
+    ("expanded", "INTEGER DEFAULT 1"),
+    ("finish_time", "TEXT"),
+]
+
+
+def _create_tasks_table(conn):
+    conn.execute(TASKS_TABLE_SQL)
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(tasks)")}
+    for column, definition in LEGACY_COLUMNS:
+        if column not in existing:
+            conn.execute(f"ALTER TABLE tasks ADD COLUMN {column} {definition}")
+
+
+def _create_indexes(conn):
+    # 复合索引覆盖：按父节点取子任务、同级按 completed, sort_order 排序、取 MAX(sort_order)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_parent_order ON tasks(parent_id, completed, sort_order)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_due ON tasks(due_date)")
+
+
+def _create_search_index(conn):
+    # 名称全文索引（外部内容表，不重复存储名称），由触发器与 tasks 保持同步；
+    # trigram 分词可以匹配中文子串。SQLite 未编译 FTS5 时跳过，搜索退回 LIKE
+    try:
+        conn.execute("CREATE VIRTUAL TABLE tasks_fts USING fts5(name, content='tasks', content_rowid='id', "
+                     "tokenize='trigram')")
+    except sqlite3.OperationalError:
+        return
+    conn.execute("""
+        CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts(rowid, name) VALUES (new.id, new.name);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, name) VALUES ('delete', old.id, old.name);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER tasks_fts_update AFTER UPDATE OF name ON tasks BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, name) VALUES ('delete', old.id, old.name);
+            INSERT INTO tasks_fts(rowid, name) VALUES (new.id, new.name);
+        END
+    """)
+    conn.execute("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+
+
+def _add_due_day(conn):
+    # due_date 为 YYYY-MM-DD 文本；due_day 是由它算出的儒略日整数（虚拟生成列，不占存储、无需触发器维护），
+    # 无法解析的日期为 NULL。截止日期视图只看未完成任务，在部分索引上做范围查询，取代按文本的 idx_tasks_due；
+    # 不把 completed 放进索引列，以免整表按 completed 排序的加载查询改走这个索引、逐行回表
+    conn.execute("ALTER TABLE tasks ADD COLUMN due_day INTEGER "
+                 "GENERATED ALWAYS AS (CAST(julianday(due_date) AS INTEGER)) VIRTUAL")
+    conn.execute("DROP INDEX IF EXISTS idx_tasks_due")
+    conn.execute("CREATE INDEX idx_tasks_due_day ON tasks(due_day) WHERE completed = 0")
+
+
+def _add_rollups(conn):
+    # 子树汇总列（见 taskRollups.py），由写操作沿祖先链增量维护；升级时整表计算一次
+    conn.execute("ALTER TABLE tasks ADD COLUMN sub_total INTEGER NOT NULL DEFAULT 0")
+    conn.execute("ALTER TABLE tasks ADD COLUMN sub_done INTEGER NOT NULL DEFAULT 0")
+    conn.execute("ALTER TABLE tasks ADD COLUMN sub_due TEXT")
+    rebuild_all(conn)
+
+
+def _sparse_sort_order(conn):
+    # 同级 sort_order 改为间隔 GAP 的稀疏键（见 taskOrdering.py），拖放到任意位置只需更新一行
+    renumber_all(conn)
+
+
+def _add_archive(conn):
+    # completed_at 记录标记完成的时间，用于按完成时长归档；已完成的旧任务以完成时间（没有则以现在）为准
+    conn.execute("ALTER TABLE tasks ADD COLUMN completed_at TEXT")
+    conn.execute("UPDATE tasks SET completed_at = COALESCE(finish_time, datetime('now', 'localtime')) "
+                 "WHERE completed = 1")
+    create_archive_table(conn)
+
+
+def _add_change_log(conn):
+    # 触发器记录每一行的变化，其他实例据此只同步变化的任务（见 taskChangeLog.py）
+    create_change_log(conn)
+
+
+def _add_journal(conn):
+    # 撤销 / 重做日志：触发器记录每一行的前像（见 taskJournal.py）
+    create_journal(conn)
+
+
+def _add_journal_owner(conn):
+    # 撤销 / 重做只取本会话写入的步骤；升级前的步骤没有会话，不再能撤销
+    conn.execute("ALTER TABLE task_journal_steps ADD COLUMN owner TEXT")
+    conn.execute("CREATE INDEX idx_task_journal_steps_owner ON task_journal_steps(owner, stack, step)")
+
+
+def _add_journal_ranges(conn):
+    # 批量导入不经过触发器，撤销日志整批只记一条 id 区间（见 taskTransfer.py）
+    conn.execute("ALTER TABLE task_journal ADD COLUMN last_id INTEGER")
+
+
+# 按顺序追加，已发布的步骤不要修改或删除
+MIGRATIONS = [
+    _create_tasks_table,
+    _create_indexes,
+    _create_search_index,
+    _add_due_day,
+    _add_rollups,
+    _sparse_sort_order,
+    _add_archive,
+    _add_change_log,
+    _add_journal,
+    _add_journal_owner,
+    _add_journal_ranges,
+]
+
+
+def migrate(conn):
+    """把数据库升级到最新版本；已是最新版本时只读取一次 user_version。
+    每一步先用 BEGIN IMMEDIATE 拿到写锁，再在事务中重新读取 user_version：两个进程同时打开旧数据库时，
+    后拿到锁的一方看到这一步已由对方执行，直接跳过"""
+    while conn.execute("PRAGMA user_version").fetchone()[0] < len(MIGRATIONS):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < len(MIGRATIONS):
+                MIGRATIONS[version](conn)
+                conn.execute(f"PRAGMA user_version = {version + 1}")
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+
+def connect(path):
+    """打开任务库：WAL 日志 + synchronous=NORMAL（提交时不再每次 fsync），并升级到最新结构。
+    开启性能统计时每条语句都会计时（见 taskProfiler.py）"""
+    conn = sqlite3.connect(path, factory=ProfiledConnection)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    migrate(conn)
+    return conn
@@ -0,0 +1,51 @@
+# 按截止日期的视图（只看未完成任务）：在 due_day 的部分索引（completed = 0）上做范围查询，
+# 结果与搜索一样只显示匹配的任务及其祖先分支
+from datetime import date, timedelta
+
+from taskSearch import SEARCH_LIMIT, load_paths_index
+
+# 视图名 -> 显示名称，按工具栏顺序排列
+DUE_VIEWS = {
+    "overdue": "已逾期",
+    "today": "今天到期",
+    "week": "本周到期",
+    "none": "无截止日期",
+}
+
+# 日期边界统一用 SQLite 的 julianday 换算，与 due_day 生成列的算法一致
+DAY = "CAST(julianday(?) AS INTEGER)"
+
+VIEW_CONDITIONS = {
+    "overdue": f"due_day < {DAY}",
+    "today": f"due_day = {DAY}",
+    "week": f"due_day BETWEEN {DAY} AND {DAY}",
+    "none": "due_day IS NULL",
+}
+
+VIEW_MATCHES = "SELECT id FROM tasks WHERE completed = 0 AND {condition} ORDER BY due_day, id LIMIT ?"
+
+VIEW_COUNTS_SQL = "SELECT " + ", ".join(
+    f"(SELECT COUNT(*) FROM tasks WHERE completed = 0 AND {condition})" for condition in VIEW_CONDITIONS.values())
+
+
+def _bounds(view, today):
+    """视图条件中 ? 对应的日期参数；本周 = 今天到本周日"""
+    if view == "week":
+        return today.isoformat(), (today + timedelta(days=6 - today.weekday())).isoformat()
+    if view == "none":
+        return ()
+    return (today.isoformat(),)
+
+
+def load_due_view(conn, view, today=None, limit=SEARCH_LIMIT):
+    """返回 (只含匹配分支的子节点索引, 匹配的任务 id 集合)，格式同 taskSearch.load_paths_index"""
+    today = today or date.today()
+    matches = VIEW_MATCHES.format(condition=VIEW_CONDITIONS[view])
+    return load_paths_index(conn, matches, _bounds(view, today), limit)
+
+
+def count_due_views(conn, today=None):
+    """一条查询统计各视图的任务数：{视图名: 数量}"""
+    today = today or date.today()
+    params = [param for view in VIEW_CONDITIONS for param in _bounds(view, today)]
+    return dict(zip(VIEW_CONDITIONS, conn.execute(VIEW_COUNTS_SQL, params).fetchone()))
@@ -1,32 +1,33 @@
 import tkinter as tk
-from tkcalendar import DateEntry
 from datetime import datetime
 
+from taskProfiler import profiled
+
 class TaskEditorDialog(tk.Toplevel):
+    """任务编辑对话框。构建一次后反复使用：show() 填入任务并显示，保存或关闭时只隐藏（withdraw），
+    不再每次重建日历控件"""
+
+    @profiled
     def __init__(self, master, title="任务编辑", name="", due_date=None, finish_time=None, callback=None):
+        # tkcalendar（连带 babel）导入较慢，第一次构建对话框时才导入，不拖慢窗口启动
+        from tkcalendar import DateEntry
+
         super().__init__(master)
-        self.center_window()
-        self.title(title)
+        self.withdraw()  # 填好内容后再显示，预先构建时也不会闪现
         self.callback = callback
         self.resizable(False, False)
+        self.protocol("WM_DELETE_WINDOW", self.hide)
 
         # ---- 任务名称 ----
         tk.Label(self, text="任务名称").grid(row=0, column=0, padx=10, pady=5, sticky="e")
         self.name_entry = tk.Entry(self, width=25, justify="left")
         self.name_entry.grid(row=0, column=1, padx=5, pady=5)
-        self.name_entry.insert(0, name)
 
         # ---- 截止日期 ----
         tk.Label(self, text="截止时间").grid(row=1, column=0, padx=10, pady=5, sticky="e")
         self.due_entry = DateEntry(self, width=23, date_pattern="y-mm-dd")
         self.due_entry.grid(row=1, column=1, padx=5, pady=5)
 
-        if due_date:
-            self.due_entry.set_date(due_date)
-        else:
-            self.due_entry.set_date(datetime.today())
-            self.due_entry.delete(0, 'end')  # 允许为空
-
         # ---- 完成时间 日期 + 时分 ----
         tk.Label(self, text="完成时间").grid(row=2, column=0, padx=10, pady=5, sticky="e")
 
@@ -45,29 +46,54 @@ class TaskEditorDialog(tk.Toplevel):
         self.minute_spin = tk.Spinbox(frame_finish, from_=0, to=59, width=3, format="%02.0f")
         self.minute_spin.grid(row=0, column=2, padx=3)
 
+        # ---- 按钮 ----
+        self.bind("<Return>", lambda event: self.save())
+        self.bind("<Escape>", lambda event: self.hide())
+        tk.Button(self, text=" 保 存 ", command=self.save).grid(row=3, column=0, columnspan=2, pady=10)
+
+        if callback is not None:
+            self.show(title, name, due_date, finish_time, callback)
+
+    @profiled
+    def show(self, title="任务编辑", name="", due_date=None, finish_time=None, callback=None):
+        """填入任务内容并显示；保存时调用 callback(name, due, finish)"""
+        self.title(title)
+        self.callback = callback
+
+        self.name_entry.delete(0, 'end')
+        self.name_entry.insert(0, name)
+
+        if due_date:
+            self.due_entry.set_date(due_date)
+        else:
+            self.due_entry.set_date(datetime.today())
+            self.due_entry.delete(0, 'end')  # 允许为空
+
         # ---- 完成时间初始化 ----
+        self.hour_spin.delete(0, 'end')
+        self.minute_spin.delete(0, 'end')
         if finish_time:
             if isinstance(finish_time, str):
                 dt = datetime.strptime(finish_time, "%Y-%m-%d %H:%M")
             else:  # 已经是 datetime 对象
                 dt = finish_time
             self.finish_date.set_date(dt.date())
-            self.hour_spin.delete(0, 'end')
             self.hour_spin.insert(0, dt.strftime("%H"))
-            self.minute_spin.delete(0, 'end')
             self.minute_spin.insert(0, dt.strftime("%M"))
         else:
             # 默认留空
             self.finish_date.set_date(datetime.today())
             self.finish_date.delete(0, 'end')
-            self.hour_spin.delete(0, 'end')
-            self.minute_spin.delete(0, 'end')
-
-        # ---- 按钮 ----
-        self.bind("<Return>", lambda event: self.save())
-        tk.Button(self, text=" 保 存 ", command=self.save).grid(row=3, column=0, columnspan=2, pady=10)
 
+        self.center_window()
+        self.deiconify()
+        self.lift()
         self.name_entry.focus_set()
+        self.name_entry.select_range(0, 'end')
+
+    def hide(self):
+        self.callback = None
+        self.withdraw()
 
     def save(self):
         name = self.name_entry.get().strip()
@@ -93,8 +119,9 @@ class TaskEditorDialog(tk.Toplevel):
             finish = f"{finish_date_raw} {hour}:{minute}"
 
         if name and self.callback:
-            self.callback(name, due, finish)
-            self.destroy()
+            callback = self.callback
+            self.hide()
+            callback(name, due, finish)
 
     def center_window(self, w=360, h=230):
         sw = self.winfo_screenwidth()
@@ -0,0 +1,65 @@
+# 按完成状态与日期范围筛选：与搜索、截止日期视图一样，只显示匹配的任务及其祖先分支。
+# 只看未完成任务的截止日期范围落在 due_day 的部分索引上；结果交给界面后，切换排序只重排内存索引
+from collections import namedtuple
+
+from taskDueViews import DAY
+from taskSearch import load_paths_index
+
+FILTER_LIMIT = 5000
+
+# 状态 -> 显示名称
+FILTER_STATUSES = {
+    "all": "全部",
+    "open": "未完成",
+    "completed": "已完成",
+}
+
+# 可按范围筛选的日期列 -> 显示名称
+FILTER_FIELDS = {
+    "due": "截止时间",
+    "finish": "完成时间",
+}
+
+# status 为 FILTER_STATUSES 的键；field 为 FILTER_FIELDS 的键；start / end 为 YYYY-MM-DD 或 None（不限），含两端
+TaskFilter = namedtuple("TaskFilter", ["status", "field", "start", "end"])
+
+STATUS_CONDITIONS = {
+    "all": None,
+    "open": "completed = 0",
+    "completed": "completed = 1",
+}
+
+# (起始条件, 结束条件)；完成时间为 "YYYY-MM-DD HH:MM"，结束日期当天的任意时刻都算在内
+RANGE_CONDITIONS = {
+    "due": (f"due_day >= {DAY}", f"due_day <= {DAY}"),
+    "finish": ("finish_time >= ?", "finish_time < date(?, '+1 day')"),
+}
+
+FILTER_MATCHES = "SELECT id FROM tasks WHERE {conditions} ORDER BY id LIMIT ?"
+
+
+def is_active(task_filter):
+    return task_filter is not None and (
+        task_filter.status != "all" or task_filter.start is not None or task_filter.end is not None)
+
+
+def _conditions(task_filter):
+    """返回 (WHERE 条件列表, 参数)"""
+    conditions, params = [], []
+    if STATUS_CONDITIONS[task_filter.status]:
+        conditions.append(STATUS_CONDITIONS[task_filter.status])
+    start_condition, end_condition = RANGE_CONDITIONS[task_filter.field]
+    if task_filter.start is not None:
+        conditions.append(start_condition)
+        params.append(task_filter.start)
+    if task_filter.end is not None:
+        conditions.append(end_condition)
+        params.append(task_filter.end)
+    return conditions, params
+
+
+def load_filtered(conn, task_filter, limit=FILTER_LIMIT):
+    """返回 (只含匹配分支的子节点索引, 匹配的任务 id 集合)，格式同 taskSearch.load_paths_index"""
+    conditions, params = _conditions(task_filter)
+    matches = FILTER_MATCHES.format(conditions=" AND ".join(conditions) or "1")
+    return load_paths_index(conn, matches, tuple(params), limit)
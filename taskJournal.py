@@ -0,0 +1,186 @@
+# 撤销 / 重做日志：触发器把 tasks 每一行被修改前的样子（前像）追加到 task_journal，
+# TaskStore 的每个写操作结束时把这些记录归为一步（step）。撤销时按每个任务在这一步中最早的前像
+# 集合式地恢复（删除新增的行、改回修改过的行、插回删除的行），整步只需三条语句、一个事务；
+# 恢复过程本身同样被触发器记录，归入对面的栈，即为重做所需的前像。
+# 展开 / 折叠状态（expanded）是界面状态，只在删除时记下，插回时还原，其余修改与恢复都不涉及它。
+# 归档 / 从归档恢复会在两张表之间移动任务，无法只靠 tasks 的前像撤销，执行后清空日志。
+# 多个窗口 / 脚本共用一个数据库：每一步记下写入它的会话（owner），撤销 / 重做只取本会话的步骤；
+# 之后其他会话（或零散记录）又修改过其中任何一个任务时拒绝执行，不会覆盖别人的修改。
+# 批量导入不经过触发器，整批只写一条 insert 记录，覆盖 id 到 last_id 的区间
+UNDO_LEVELS = 100  # 每个会话最多保留的可撤销步数
+JOURNAL_KEEP = 1000  # 所有会话合计最多保留的步数，已关闭的窗口留下的步骤随之淘汰
+PLACE_LIMIT = 10000  # 一步涉及的任务超过这个数时，界面整树重载比逐个放置更快
+
+# 除 expanded 外可恢复的列（due_day 为生成列）
+JOURNAL_FIELDS = ["parent_id", "name", "due_date", "finish_time", "completed", "sort_order", "sub_total", "sub_done",
+                  "sub_due", "completed_at"]
+
+JOURNAL_COLUMNS = ", ".join(JOURNAL_FIELDS)
+
+OLD_VALUES = ", ".join("old." + field for field in JOURNAL_FIELDS)
+
+JOURNAL_SQL = [
+    # kind：insert 只记 id（撤销时删除）；update / delete 记录前像。step 为 NULL 表示还未归入某一步；
+    # last_id（升级时添加）不为 NULL 时，这条 insert 记录代表 id 到 last_id 的整批导入
+    f"""
+    CREATE TABLE IF NOT EXISTS task_journal (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        step INTEGER,
+        kind TEXT NOT NULL,
+        id INTEGER NOT NULL,
+        parent_id INTEGER, name TEXT, due_date TEXT, finish_time TEXT, completed INTEGER, sort_order INTEGER,
+        sub_total INTEGER, sub_done INTEGER, sub_due TEXT, completed_at TEXT, expanded INTEGER
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_task_journal_step ON task_journal(step, id)",
+    # 每一步一行：步号取这一步最后一条记录的 seq，随时间递增；stack 为 undo / redo；
+    # owner（升级时添加）为写入这一步的会话，零散记录归成的步骤为 NULL
+    """
+    CREATE TABLE IF NOT EXISTS task_journal_steps (
+        step INTEGER PRIMARY KEY,
+        stack TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TRIGGER tasks_journal_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO task_journal (kind, id) VALUES ('insert', new.id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER tasks_journal_delete AFTER DELETE ON tasks BEGIN
+        INSERT INTO task_journal (kind, id, {JOURNAL_COLUMNS}, expanded)
+        VALUES ('delete', old.id, {OLD_VALUES}, old.expanded);
+    END
+    """,
+    # 同一步中刚插入的行撤销时直接删除，之后的修改不必再记
+    f"""
+    CREATE TRIGGER tasks_journal_update AFTER UPDATE OF {JOURNAL_COLUMNS} ON tasks
+    WHEN NOT EXISTS(SELECT 1 FROM task_journal WHERE step IS NULL AND id = old.id AND kind = 'insert')
+    BEGIN
+        INSERT INTO task_journal (kind, id, {JOURNAL_COLUMNS}) VALUES ('update', old.id, {OLD_VALUES});
+    END
+    """,
+]
+
+# 一步中每个任务最早的那条记录，就是它在这一步之前的状态；整批导入的记录展开为区间内现存的任务
+BEFORE_SQL = """
+    INSERT INTO journal_before (id, seq)
+    SELECT id, MIN(seq) FROM (
+        SELECT id, seq FROM task_journal WHERE step = ?1 AND last_id IS NULL
+        UNION ALL
+        SELECT t.id, j.seq FROM task_journal j JOIN tasks t ON t.id BETWEEN j.id AND j.last_id
+        WHERE j.step = ?1 AND j.last_id IS NOT NULL
+    )
+    GROUP BY id
+"""
+
+BEFORE_ROWS = (f"SELECT b.id, j.kind, {', '.join('j.' + field for field in JOURNAL_FIELDS)}, j.expanded "
+               "FROM journal_before b JOIN task_journal j ON j.seq = b.seq")
+
+REPLAY_SQL = [
+    # 这一步中新增的任务：删除
+    f"DELETE FROM tasks WHERE id IN (SELECT id FROM ({BEFORE_ROWS}) WHERE kind = 'insert')",
+    # 这一步之前已存在、现在仍在的：改回前像
+    f"""
+    UPDATE tasks SET ({JOURNAL_COLUMNS}) = (SELECT {JOURNAL_COLUMNS} FROM ({BEFORE_ROWS}) r WHERE r.id = tasks.id)
+    WHERE id IN (SELECT id FROM ({BEFORE_ROWS}) WHERE kind != 'insert')
+    """,
+    # 这一步中删除的：插回
+    f"""
+    INSERT INTO tasks (id, {JOURNAL_COLUMNS}, expanded)
+    SELECT id, {JOURNAL_COLUMNS}, COALESCE(expanded, 1) FROM ({BEFORE_ROWS})
+    WHERE kind != 'insert' AND id NOT IN (SELECT id FROM tasks)
+    """,
+]
+
+# 这一步之后，其他会话的步骤或零散记录是否修改过这一步涉及的任务
+CONFLICT_SQL = """
+    SELECT EXISTS(
+        SELECT 1 FROM task_journal j
+        JOIN journal_before b ON b.id = j.id
+        LEFT JOIN task_journal_steps s ON s.step = j.step
+        WHERE j.seq > ? AND s.owner IS NOT ?
+    )
+"""
+
+OPPOSITE = {"undo": "redo", "redo": "undo"}
+
+STACK_NAMES = {"undo": "撤销", "redo": "重做"}
+
+
+def create_journal(conn):
+    for sql in JOURNAL_SQL:
+        conn.execute(sql)
+
+
+def journal_inserted(conn, first_id, last_id):
+    """记录整批导入的 first_id 到 last_id（调用方负责事务），撤销时一并删除"""
+    conn.execute("INSERT INTO task_journal (kind, id, last_id) VALUES ('insert', ?, ?)", (first_id, last_id))
+
+
+def _seal(conn, stack, owner=None):
+    """把尚未归入某一步的记录归为 owner 的 stack 栈顶的新一步，返回是否有记录。
+    每次都会收走全部零散记录，所以最后一条记录总是尚未归入的，用它的 seq 作步号不会重复"""
+    step = conn.execute("SELECT MAX(seq) FROM task_journal").fetchone()[0]
+    if step is None or conn.execute("UPDATE task_journal SET step = ? WHERE step IS NULL", (step,)).rowcount == 0:
+        return False
+    conn.execute("INSERT INTO task_journal_steps (step, stack, owner) VALUES (?, ?, ?)", (step, stack, owner))
+    return True
+
+
+def _drop_steps(conn, condition, params=()):
+    conn.execute(f"DELETE FROM task_journal WHERE step IN (SELECT step FROM task_journal_steps WHERE {condition})",
+                 params)
+    conn.execute(f"DELETE FROM task_journal_steps WHERE {condition}", params)
+
+
+def seal_stray(conn):
+    """其他写入者（直接执行 SQL 的脚本、生成测试数据等）留下的零散记录单独归为一步，
+    在开始一次操作前调用（调用方负责事务），这些记录不会混入接下来的这一步"""
+    _seal(conn, "undo")
+
+
+def close_step(conn, owner):
+    """会话 owner 的一次写操作结束（调用方负责事务）：记录归为一步可撤销的操作，清空它的重做栈，
+    它只保留最近 UNDO_LEVELS 步，所有会话合计只保留最近 JOURNAL_KEEP 步"""
+    if not _seal(conn, "undo", owner):
+        return
+    _drop_steps(conn, "stack = 'redo' AND owner = ?", (owner,))
+    oldest = conn.execute("SELECT step FROM task_journal_steps WHERE stack = 'undo' AND owner = ? "
+                          "ORDER BY step DESC LIMIT 1 OFFSET ?", (owner, UNDO_LEVELS - 1)).fetchone()
+    if oldest is not None:
+        _drop_steps(conn, "stack = 'undo' AND owner = ? AND step < ?", (owner, oldest[0]))
+    # 淘汰最旧的步骤：留下的任何一步之后的记录都还在，冲突检查不受影响
+    oldest = conn.execute("SELECT step FROM task_journal_steps ORDER BY step DESC LIMIT 1 OFFSET ?",
+                          (JOURNAL_KEEP - 1,)).fetchone()
+    if oldest is not None:
+        _drop_steps(conn, "step < ?", oldest)
+
+
+def forget(conn):
+    """清空撤销 / 重做日志（调用方负责事务）"""
+    conn.execute("DELETE FROM task_journal")
+    conn.execute("DELETE FROM task_journal_steps")
+
+
+def replay_step(conn, stack, owner):
+    """撤销（stack="undo"）或重做（"redo"）会话 owner 栈顶的一步（调用方负责事务），返回涉及的任务 id 列表；
+    栈为空时返回 None。之后其他会话又修改过其中的任务时抛出 ValueError，这一步留在栈上"""
+    seal_stray(conn)  # 不混入这次恢复
+    step = conn.execute("SELECT MAX(step) FROM task_journal_steps WHERE stack = ? AND owner = ?",
+                        (stack, owner)).fetchone()[0]
+    if step is None:
+        return None
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS journal_before (id INTEGER PRIMARY KEY, seq INTEGER)")
+    try:
+        conn.execute(BEFORE_SQL, (step,))
+        if conn.execute(CONFLICT_SQL, (step, owner)).fetchone()[0]:
+            raise ValueError(f"其他窗口或脚本之后修改了相同的任务，无法{STACK_NAMES[stack]}这一步")
+        task_ids = [row[0] for row in conn.execute("SELECT id FROM journal_before")]
+        for sql in REPLAY_SQL:
+            conn.execute(sql)
+    finally:
+        conn.execute("DELETE FROM journal_before")
+    _drop_steps(conn, "step = ?", (step,))
+    _seal(conn, OPPOSITE[stack], owner)
+    return task_ids
@@ -0,0 +1,80 @@
+# 稀疏排序键：同级任务的 sort_order 之间留出间隔（GAP），把任务放到任意两个兄弟之间
+# 只需取两者的中间值、更新一行；间隔用完时才把这一级重新等距编号（rebalance）。
+# 同级显示顺序为 (completed, sort_order, id)，已完成与未完成各占索引中的一段，
+# 因此查最大值 / 相邻键都分两段各查一次，都是 idx_tasks_parent_order 上的单次查找
+
+GAP = 1024
+
+# 在每个 completed 分段中各取一个候选值，再取两者的最值
+_BOTH_PARTS = """
+    SELECT {agg}(k) FROM (
+        SELECT {agg}(sort_order) AS k FROM tasks WHERE parent_id IS :parent AND completed = 0 {cond}
+        UNION ALL
+        SELECT {agg}(sort_order) FROM tasks WHERE parent_id IS :parent AND completed = 1 {cond}
+    )
+"""
+
+MAX_ORDER_SQL = _BOTH_PARTS.format(agg="MAX", cond="")
+PREV_ORDER_SQL = _BOTH_PARTS.format(agg="MAX", cond="AND sort_order < :order AND id IS NOT :exclude")
+NEXT_ORDER_SQL = _BOTH_PARTS.format(agg="MIN", cond="AND sort_order > :order AND id IS NOT :exclude")
+
+# 旧数据中可能有相同的排序键，此时无法插到两者之间
+TIE_SQL = """
+    SELECT 1 FROM tasks
+    WHERE parent_id IS :parent AND completed IN (0, 1) AND sort_order = :order
+      AND id IS NOT :target AND id IS NOT :exclude
+    LIMIT 1
+"""
+
+# 按当前顺序重新等距编号；先把新键写入带主键的临时表，再逐行按主键取回
+RANK_SQL = """
+    INSERT INTO temp.order_keys
+    SELECT id, ROW_NUMBER() OVER (PARTITION BY parent_id ORDER BY sort_order, id) * :gap
+    FROM tasks {where}
+"""
+
+APPLY_RANK_SQL = """
+    UPDATE tasks SET sort_order = (SELECT k FROM temp.order_keys o WHERE o.id = tasks.id)
+    WHERE id IN (SELECT id FROM temp.order_keys)
+"""
+
+
+def next_order(conn, parent_id):
+    """parent_id 下末尾位置的排序键"""
+    last = conn.execute(MAX_ORDER_SQL, {"parent": parent_id}).fetchone()[0]
+    return GAP if last is None else last + GAP
+
+
+def _renumber(conn, where, params):
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS order_keys (id INTEGER PRIMARY KEY, k INTEGER)")
+    try:
+        conn.execute(RANK_SQL.format(where=where), dict(params, gap=GAP))
+        conn.execute(APPLY_RANK_SQL)
+    finally:
+        conn.execute("DELETE FROM temp.order_keys")
+
+
+def renumber(conn, parent_id):
+    """把 parent_id 的子任务按当前顺序重新编号为 GAP 的整数倍"""
+    _renumber(conn, "WHERE parent_id IS :parent", {"parent": parent_id})
+
+
+def renumber_all(conn):
+    """整张表的每一级都重新编号（升级数据库结构时使用）"""
+    _renumber(conn, "", {})
+
+
+def order_beside(conn, target_id, after, exclude_id=None):
+    """紧挨在 target_id 之前（after=False）或之后（after=True）的排序键，返回 (parent_id, sort_order)。
+    exclude_id 为正在移动的任务，计算相邻键时不算它自己；两侧键之间没有空隙时先重新编号"""
+    for attempt in range(2):
+        parent_id, order = conn.execute("SELECT parent_id, sort_order FROM tasks WHERE id = ?", (target_id,)).fetchone()
+        params = {"parent": parent_id, "order": order, "target": target_id, "exclude": exclude_id}
+        if conn.execute(TIE_SQL, params).fetchone() is None:
+            neighbour = conn.execute(NEXT_ORDER_SQL if after else PREV_ORDER_SQL, params).fetchone()[0]
+            if neighbour is None:
+                return parent_id, order + GAP if after else order - GAP
+            if abs(neighbour - order) >= 2:
+                return parent_id, (order + neighbour) // 2
+        renumber(conn, parent_id)
+    raise RuntimeError("重新编号后仍没有空隙")
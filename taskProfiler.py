@@ -0,0 +1,186 @@
+# 性能统计：记录每条 SQL 语句、每个后台请求和主要界面处理函数的次数、耗时分布（p50 / p99）与行数。
+# 默认不记录，只多一次开关判断；设置环境变量 TASK_PROFILE=1 时启动即记录，
+# TASK_PROFILE_LOG=路径 时退出前把统计追加写入该文件。界面中可随时开关（见 taskProfilerWindow.py）
+import os
+import re
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime
+from functools import wraps
+from time import perf_counter
+
+SAMPLE_SIZE = 2048  # 每项保留最近多少次耗时用于计算分位数
+
+
+class Stat:
+    __slots__ = ("count", "total", "rows", "max", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.rows = 0
+        self.max = 0.0
+        self.samples = deque(maxlen=SAMPLE_SIZE)
+
+    def add(self, seconds, rows):
+        self.count += 1
+        self.total += seconds
+        self.rows += rows
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+    def percentile(self, fraction):
+        ordered = sorted(self.samples)
+        return ordered[int(fraction * (len(ordered) - 1))] if ordered else 0.0
+
+
+class Profiler:
+    """按 (类别, 名称) 汇总耗时；后台线程与界面线程都会记录，内部加锁"""
+
+    def __init__(self, enabled=False, log_path=None):
+        self.enabled = enabled
+        self.log_path = log_path
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, category, label, seconds, rows=0):
+        with self._lock:
+            stat = self._stats.get((category, label))
+            if stat is None:
+                stat = self._stats[(category, label)] = Stat()
+            stat.add(seconds, rows)
+
+    def clear(self):
+        with self._lock:
+            self._stats.clear()
+
+    def snapshot(self):
+        """[(类别, 名称, 次数, 总计, p50, p99, 最大, 行数)]，按总耗时从大到小排列，时间单位为秒"""
+        with self._lock:
+            rows = [(category, label, stat.count, stat.total, stat.percentile(0.5), stat.percentile(0.99),
+                     stat.max, stat.rows) for (category, label), stat in self._stats.items()]
+        return sorted(rows, key=lambda row: row[3], reverse=True)
+
+    def report(self):
+        lines = [f"{'类别':<6} {'次数':>8} {'总计ms':>10} {'p50ms':>8} {'p99ms':>8} {'最大ms':>8} {'行数':>9}  名称"]
+        for category, label, count, total, p50, p99, longest, rows in self.snapshot():
+            lines.append(f"{category:<6} {count:>8} {total * 1000:>10.1f} {p50 * 1000:>8.2f} {p99 * 1000:>8.2f}"
+                         f" {longest * 1000:>8.2f} {rows:>9}  {label}")
+        return "\n".join(lines)
+
+    def write_log(self, path=None):
+        """把当前统计追加写入 path（默认 log_path）；没有可写的路径或没有数据时什么也不做"""
+        path = path or self.log_path
+        if not path or not self._stats:
+            return
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(f"==== {datetime.now():%Y-%m-%d %H:%M:%S} ====\n{self.report()}\n\n")
+
+
+PROFILER = Profiler(enabled=bool(os.environ.get("TASK_PROFILE")), log_path=os.environ.get("TASK_PROFILE_LOG"))
+
+
+def profiled(fn):
+    """装饰器：以 “类名.方法名” 记录界面处理函数的耗时（未开启统计时直接调用）"""
+    label = fn.__qualname__
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not PROFILER.enabled:
+            return fn(*args, **kwargs)
+        start = perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            PROFILER.record("ui", label, perf_counter() - start)
+    return wrapper
+
+
+def _statement_label(sql):
+    return re.sub(r"\s+", " ", sql).strip()[:300]
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """计时从 execute 开始，累计到结果读完（或游标被丢弃）为止；
+    行数为查询返回的行数，或写语句影响的行数"""
+
+    _pending = None  # [语句, 累计耗时, 行数]
+
+    def execute(self, sql, parameters=()):
+        return self._timed(sql, super().execute, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(sql, super().executemany, seq_of_parameters)
+
+    def _timed(self, sql, run, parameters):
+        self._finish()
+        start = perf_counter()
+        run(sql, parameters)
+        self._pending = [sql, perf_counter() - start, 0]
+        if self.description is None:
+            self._pending[2] = max(self.rowcount, 0)
+            self._finish()
+        return self
+
+    def _fetched(self, start, rows):
+        if self._pending is not None:
+            self._pending[1] += perf_counter() - start
+            self._pending[2] += rows
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            PROFILER.record("sql", _statement_label(pending[0]), pending[1], pending[2])
+
+    def __next__(self):
+        start = perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(start, 0)
+            self._finish()
+            raise
+        self._fetched(start, 1)
+        return row
+
+    def fetchone(self):
+        start = perf_counter()
+        row = super().fetchone()
+        self._fetched(start, row is not None)
+        self._finish()  # fetchone 通常只取一行
+        return row
+
+    def fetchmany(self, size=None):
+        start = perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows))
+        self._finish()
+        return rows
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """开启统计时 execute / executemany 改用计时游标；未开启时与普通连接相同"""
+
+    def execute(self, sql, parameters=()):
+        if not PROFILER.enabled:
+            return super().execute(sql, parameters)
+        return self.cursor(ProfiledCursor).execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        if not PROFILER.enabled:
+            return super().executemany(sql, seq_of_parameters)
+        return self.cursor(ProfiledCursor).executemany(sql, seq_of_parameters)
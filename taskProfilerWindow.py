@@ -0,0 +1,67 @@
+import tkinter as tk
+from tkinter import ttk, filedialog
+
+from taskProfiler import PROFILER
+
+REFRESH_MS = 1000
+
+COLUMNS = [("category", "类别", 50), ("count", "次数", 70), ("total", "总计(ms)", 90), ("p50", "p50(ms)", 80),
+           ("p99", "p99(ms)", 80), ("max", "最大(ms)", 80), ("rows", "行数", 80)]
+
+
+class ProfilerWindow(tk.Toplevel):
+    """性能统计面板：每秒刷新一次 PROFILER 的汇总，按总耗时排序；
+    sql 为单条语句（含读取结果的时间），db 为一次后台请求，ui 为界面处理函数"""
+
+    def __init__(self, master):
+        super().__init__(master)
+        self.title("性能统计")
+        self.geometry("980x480")
+        self._refresh_after = None
+
+        top = tk.Frame(self)
+        top.pack(fill="x", padx=10, pady=(10, 0))
+        self.enabled_var = tk.BooleanVar(value=PROFILER.enabled)
+        tk.Checkbutton(top, text="记录", variable=self.enabled_var, command=self._toggle).pack(side="left")
+        tk.Button(top, text="清空", command=self._clear).pack(side="left", padx=10)
+        tk.Button(top, text="保存到文件…", command=self._save).pack(side="left")
+
+        self.tree = ttk.Treeview(self, columns=[key for key, _, _ in COLUMNS], show="tree headings")
+        self.tree.heading("#0", text="名称")
+        self.tree.column("#0", width=420)
+        for key, title, width in COLUMNS:
+            self.tree.heading(key, text=title)
+            self.tree.column(key, width=width, anchor="e")
+        self.tree.pack(fill="both", expand=True, padx=10, pady=10)
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.refresh()
+
+    def refresh(self):
+        self._refresh_after = None
+        self.tree.delete(*self.tree.get_children())
+        for category, label, count, total, p50, p99, longest, rows in PROFILER.snapshot():
+            self.tree.insert("", "end", text=label, values=(
+                category, count, f"{total * 1000:.1f}", f"{p50 * 1000:.2f}", f"{p99 * 1000:.2f}",
+                f"{longest * 1000:.2f}", rows))
+        self._refresh_after = self.after(REFRESH_MS, self.refresh)
+
+    def close(self):
+        if self._refresh_after is not None:
+            self.after_cancel(self._refresh_after)
+            self._refresh_after = None
+        self.destroy()
+
+    def _toggle(self):
+        PROFILER.enabled = bool(self.enabled_var.get())
+
+    def _clear(self):
+        PROFILER.clear()
+        if self._refresh_after is not None:
+            self.after_cancel(self._refresh_after)
+        self.refresh()
+
+    def _save(self):
+        path = filedialog.asksaveasfilename(title="保存性能统计", defaultextension=".log",
+                                            filetypes=[("日志", "*.log *.txt")], parent=self)
+        if path:
+            PROFILER.write_log(path)
@@ -0,0 +1,99 @@
+# 子树汇总：每个任务保存其全部后代的 sub_total（总数）、sub_done（已完成数）
+# 与 sub_due（未完成后代中最早的截止日期）。写操作后只沿祖先链增量维护，不再遍历整棵树：
+#   数量用增量：一条语句给整条祖先链加减；
+#   最早截止日期不能做减法，逐级由直接子任务重新计算，某一级不变时即停止向上。
+from taskSubtree import SUBTREE_CTE
+
+# 以 ? 为起点（含自身）向上的祖先链
+ANCESTORS_CTE = """
+    WITH RECURSIVE ancestors(id) AS (
+        SELECT ?
+        UNION ALL
+        SELECT t.parent_id FROM tasks t JOIN ancestors a ON t.id = a.id WHERE t.parent_id IS NOT NULL
+    )
+"""
+
+ADD_COUNTS_SQL = ANCESTORS_CTE + """
+    UPDATE tasks SET sub_total = sub_total + ?, sub_done = sub_done + ?
+    WHERE id IN ancestors
+"""
+
+# 整棵子树都已完成：每个节点的后代全部完成，没有未完成的截止日期
+SUBTREE_DONE_SQL = SUBTREE_CTE + "UPDATE tasks SET sub_done = sub_total, sub_due = NULL WHERE id IN subtree"
+
+# 一个子任务对父任务 sub_due 的贡献：自身（未完成时）与其后代中较早的截止日期
+CHILD_DUE = ("COALESCE(MIN(CASE WHEN c.completed = 0 THEN date(c.due_date) END, c.sub_due), "
+             "CASE WHEN c.completed = 0 THEN date(c.due_date) END, c.sub_due)")
+
+CHILD_DUE_SQL = f"SELECT MIN({CHILD_DUE}) FROM tasks c WHERE c.parent_id = ?"
+
+# 由直接子任务（汇总值已是最新）重新计算整行汇总
+RECOMPUTE_SQL = f"""
+    UPDATE tasks SET (sub_total, sub_done, sub_due) = (
+        SELECT COUNT(*) + COALESCE(SUM(c.sub_total), 0), COALESCE(SUM(c.completed + c.sub_done), 0), MIN({CHILD_DUE})
+        FROM tasks c WHERE c.parent_id = tasks.id
+    )
+    WHERE id IN (SELECT id FROM temp.rollup_levels WHERE depth = ?)
+"""
+
+LEVELS_SQL = """
+    INSERT INTO temp.rollup_levels
+    WITH RECURSIVE walk(id, depth) AS (
+        SELECT id, 0 FROM ({roots})
+        UNION ALL
+        SELECT t.id, w.depth + 1 FROM tasks t JOIN walk w ON t.parent_id = w.id
+    )
+    SELECT id, depth FROM walk
+"""
+
+
+def add_counts(conn, parent_id, total, done):
+    """parent_id 及其所有祖先的 sub_total / sub_done 各加上 total / done"""
+    if parent_id is not None and (total or done):
+        conn.execute(ADD_COUNTS_SQL, (parent_id, total, done))
+
+
+def refresh_due(conn, parent_id):
+    """从 parent_id 起逐级向上重算 sub_due，某一级不变时停止"""
+    while parent_id is not None:
+        row = conn.execute("SELECT sub_due, parent_id FROM tasks WHERE id = ?", (parent_id,)).fetchone()
+        if row is None:
+            return
+        due = conn.execute(CHILD_DUE_SQL, (parent_id,)).fetchone()[0]
+        if due == row[0]:
+            return
+        conn.execute("UPDATE tasks SET sub_due = ? WHERE id = ?", (due, parent_id))
+        parent_id = row[1]
+
+
+def rebuild_subtrees(conn, roots_sql, params=()):
+    """自底向上重算 roots_sql（返回 id 列的查询）所选任务及其全部后代的汇总。
+    先把各节点的深度写入临时表，再从最深一层开始逐层用一条 UPDATE 计算，内存占用与任务数无关"""
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS rollup_levels (id INTEGER PRIMARY KEY, depth INTEGER)")
+    conn.execute("CREATE INDEX IF NOT EXISTS temp.rollup_levels_depth ON rollup_levels(depth)")
+    try:
+        conn.execute(LEVELS_SQL.format(roots=roots_sql), params)
+        max_depth = conn.execute("SELECT MAX(depth) FROM temp.rollup_levels").fetchone()[0]
+        for depth in range(max_depth if max_depth is not None else -1, -1, -1):
+            conn.execute(RECOMPUTE_SQL, (depth,))
+    finally:
+        conn.execute("DELETE FROM temp.rollup_levels")
+
+
+def rebuild_all(conn):
+    """重算整张表的汇总（升级数据库结构时使用）"""
+    rebuild_subtrees(conn, "SELECT id FROM tasks WHERE parent_id IS NULL")
+
+
+def refresh_subtree_completed(conn, task_id, status):
+    """整棵子树被标记为 status 后更新子树内的汇总：标记完成时一条语句即可，
+    取消完成时各节点的最早截止日期需要逐层重算"""
+    if status:
+        conn.execute(SUBTREE_DONE_SQL, (task_id,))
+    else:
+        rebuild_subtrees(conn, "SELECT ? AS id", (task_id,))
+
+
+def subtree_totals(conn, task_id):
+    """任务连同其子树的 (总数, 已完成数)，用于从祖先链上整体加减"""
+    return conn.execute("SELECT 1 + sub_total, completed + sub_done FROM tasks WHERE id = ?", (task_id,)).fetchone()
@@ -0,0 +1,58 @@
+# 按名称搜索任务：FTS5（trigram 分词，支持中文子串）索引由触发器与 tasks 同步，
+# 一条递归查询同时取出匹配的任务及其所有祖先，界面只显示这些分支
+from collections import defaultdict
+
+from taskTreeLoader import TaskRow
+
+SEARCH_LIMIT = 500
+
+# matches 由调用方拼接：FTS 可用且关键字不少于 3 个字符时走索引，否则退回 LIKE；
+# 截止日期视图（taskDueViews.py）也复用这条查询
+SEARCH_SQL = """
+    WITH RECURSIVE matches(id) AS ({matches}),
+    paths(id) AS (
+        SELECT id FROM matches
+        UNION
+        SELECT t.parent_id FROM tasks t JOIN paths p ON t.id = p.id WHERE t.parent_id IS NOT NULL
+    )
+    SELECT id, parent_id, name, due_date, finish_time, completed, 1, sub_total, sub_done, sub_due, id IN matches
+    FROM tasks
+    WHERE id IN paths
+    ORDER BY completed, sort_order, id
+"""
+
+# 匹配数恰好等于上限时，再多取一个看是否还有更多
+COUNT_MATCHES_SQL = "SELECT COUNT(*) FROM ({matches})"
+
+FTS_MATCHES = "SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH ? LIMIT ?"
+LIKE_MATCHES = "SELECT id FROM tasks WHERE name LIKE ? ESCAPE '\\' LIMIT ?"
+
+
+def fts_available(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'tasks_fts'").fetchone() is not None
+
+
+def load_paths_index(conn, matches, params, limit):
+    """matches 为返回任务 id 的子查询，其最后一个参数是 LIMIT，由 limit 填入；
+    返回 (只含匹配分支的子节点索引, 匹配的任务 id 集合, 是否还有超出 limit 未显示的匹配)，
+    索引中包含匹配任务的全部祖先，且全部标记为展开"""
+    index = defaultdict(list)
+    matched = set()
+    for row in conn.execute(SEARCH_SQL.format(matches=matches), params + (limit,)):
+        task = TaskRow._make(row[:-1])
+        index[task.parent_id].append(task)
+        if row[-1]:
+            matched.add(task.id)
+    truncated = len(matched) >= limit and conn.execute(
+        COUNT_MATCHES_SQL.format(matches=matches), params + (limit + 1,)).fetchone()[0] > limit
+    return index, matched, truncated
+
+
+def search_tasks(conn, text, limit=SEARCH_LIMIT, use_fts=True):
+    """按名称搜索，返回格式同 load_paths_index"""
+    if use_fts and len(text) >= 3:
+        matches, pattern = FTS_MATCHES, '"' + text.replace('"', '""') + '"'
+    else:
+        escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        matches, pattern = LIKE_MATCHES, f"%{escaped}%"
+    return load_paths_index(conn, matches, (pattern,), limit)
@@ -0,0 +1,50 @@
+# 同级排序方式：默认按手动顺序（sort_order，可拖放调整）；点击列标题改为按名称 / 截止时间 / 完成时间排序。
+# 任何排序下都是未完成在前、空日期排在最后，相同时再按手动顺序，结果稳定。
+# 数据库中用 parent_id 索引取出一级兄弟后排序（只对这一级，带 LIMIT 时为 top-N 排序）；
+# 筛选结果已在内存中，切换排序时直接重排内存索引，不再查询
+from collections import namedtuple
+
+# 列标识 -> tasks 中的列名（同时也是 TaskRow 的字段名）
+SORT_COLUMNS = {"name": "name", "due": "due_date", "finish": "finish_time"}
+
+SortOrder = namedtuple("SortOrder", ["column", "descending"])
+
+MANUAL = SortOrder(None, False)
+
+
+def order_by(sort, prefix=""):
+    """同级显示顺序的 ORDER BY 列表；prefix 为表别名，如 "t." """
+    keys = [f"{prefix}completed"]
+    if sort.column is not None:
+        keys.append(f"{prefix}{SORT_COLUMNS[sort.column]} {'DESC' if sort.descending else 'ASC'} NULLS LAST")
+    keys += [f"{prefix}sort_order", f"{prefix}id"]
+    return ", ".join(keys)
+
+
+def next_sort(sort, column):
+    """点击列标题：换列时升序，同一列依次为升序 → 降序 → 恢复手动顺序"""
+    if sort.column != column:
+        return SortOrder(column, False)
+    if not sort.descending:
+        return SortOrder(column, True)
+    return MANUAL
+
+
+def sort_tasks(tasks, sort):
+    """按 sort 重排一组兄弟（须已是手动顺序）；与 order_by 的结果一致"""
+    if sort.column is None:
+        return tasks
+    field = SORT_COLUMNS[sort.column]
+    present = [task for task in tasks if getattr(task, field) is not None]
+    missing = [task for task in tasks if getattr(task, field) is None]
+    present.sort(key=lambda task: getattr(task, field), reverse=sort.descending)  # 稳定排序，相同时保持手动顺序
+    ordered = present + missing
+    ordered.sort(key=lambda task: task.completed)
+    return ordered
+
+
+def sort_index(index, sort):
+    """重排内存索引（parent_id -> [TaskRow]）中的每一级，返回新的索引"""
+    if sort.column is None:
+        return index
+    return {parent_id: sort_tasks(tasks, sort) for parent_id, tasks in index.items()}
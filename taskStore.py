@@ -0,0 +1,430 @@
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date
+
+from taskArchive import ARCHIVE_AFTER_DAYS, archive_completed, count_archived, load_archived, restore_archived
+from taskChangeLog import ChangeSet, changed_since, latest_seq
+from taskDatabase import connect
+from taskDueViews import count_due_views, load_due_view
+from taskFilters import load_filtered
+from taskJournal import PLACE_LIMIT, close_step, forget, replay_step, seal_stray
+from taskOrdering import next_order, order_beside
+from taskRollups import ANCESTORS_CTE, add_counts, refresh_due, refresh_subtree_completed, subtree_totals
+from taskSearch import fts_available, search_tasks
+from taskSorting import MANUAL, order_by
+from taskSubtree import delete_subtree, is_descendant, set_subtree_completed
+from taskTransfer import export_tasks, import_tasks
+from taskTreeLoader import (TASK_COLUMNS, TaskRow, load_children_index, load_placement, load_subtree_index, load_task,
+                            load_visible_index)
+
+
+class TaskStore:
+    """不依赖界面的任务数据层：加载、增删改移、排序、查询都在这里完成。
+
+    每个写操作在一个事务内完成，并返回界面增量更新所需的数据
+    （TaskRow 与它在同级中的位置等）；子树汇总在同一事务内沿祖先链更新，
+    受影响的祖先由 take_rollup_changes 取回。界面通过 DbWorker 在后台线程中调用，
+    命令行与性能测试则可以直接使用。
+    """
+
+    def __init__(self, path="task_tree.db", session=None):
+        self.path = path
+        self.conn = connect(path)
+        # 撤销 / 重做只涉及本会话写入的步骤；默认每个实例（每个窗口）各自一个会话
+        self.session = session or uuid.uuid4().hex
+        self.has_fts = fts_available(self.conn)
+        self.sort = MANUAL  # 同级显示顺序（taskSorting.SortOrder），读取与返回的位置都按它计算
+        self._view_counts = (None, None)  # (缓存键, {视图名: 数量})
+        self._rollup_dirty = set()  # 汇总值可能已变化的祖先链起点
+        # 已同步到的变更日志序号，以及上次检查时的 data_version（只在其他连接提交后变化）
+        self._change_seq = latest_seq(self.conn)
+        self._data_version = self._read_data_version()
+
+    def close(self):
+        self.conn.close()
+
+    @property
+    def in_transaction(self):
+        return self.conn.in_transaction
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def set_sort(self, sort):
+        """切换同级显示顺序；之后的读取、以及写操作返回的位置都按新顺序计算"""
+        self.sort = sort
+
+    # ---- 读取 ----
+    def load_tree(self):
+        """整棵树：parent_id -> [TaskRow]"""
+        return load_children_index(self.conn, self.sort)
+
+    def load_visible(self, parent_id=None):
+        """parent_id 之下当前可见的部分：(子节点索引, 子任务尚未加载的任务 id 集合)"""
+        return load_visible_index(self.conn, parent_id, sort=self.sort)
+
+    def load_visible_page(self, parent_id=None, offset=0, limit=None):
+        """parent_id 的第 offset 个起的 limit 个子任务及其下可见的部分（分页读取，见 load_visible_index）：
+        (子节点索引, 子任务尚未加载的任务 id 集合, 这一页之后还剩的子任务数)"""
+        index, unloaded = load_visible_index(self.conn, parent_id, offset, -1 if limit is None else limit, self.sort)
+        if limit is None:
+            return index, unloaded, 0
+        total = self.conn.execute("SELECT COUNT(*) FROM tasks WHERE parent_id IS ?", (parent_id,)).fetchone()[0]
+        return index, unloaded, max(0, total - offset - limit)
+
+    def get_task(self, task_id):
+        return load_task(self.conn, task_id)
+
+    def get_children(self, parent_id):
+        return [TaskRow._make(row) for row in self.conn.execute(
+            f"SELECT {TASK_COLUMNS} FROM tasks WHERE parent_id IS ? ORDER BY {order_by(self.sort)}", (parent_id,))]
+
+    def count_tasks(self):
+        return self.conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+    def is_descendant(self, parent_id, possible_child_id):
+        return is_descendant(self.conn, parent_id, possible_child_id)
+
+    def is_descendant_of_any(self, parent_ids, possible_child_id):
+        return any(is_descendant(self.conn, parent_id, possible_child_id) for parent_id in parent_ids)
+
+    def search(self, text):
+        """按名称搜索：(只含匹配分支的子节点索引, 匹配的任务 id 集合, 是否超过上限只取了前一部分)"""
+        return search_tasks(self.conn, text, use_fts=self.has_fts)
+
+    def load_due_view(self, view):
+        """截止日期视图（overdue / today / week / none），返回格式同 search"""
+        return load_due_view(self.conn, view)
+
+    def load_filtered(self, task_filter):
+        """按完成状态 / 日期范围筛选（taskFilters.TaskFilter），返回格式同 search"""
+        return load_filtered(self.conn, task_filter)
+
+    def due_view_counts(self):
+        """各截止日期视图的任务数。缓存键包含日期、本连接的写入计数 total_changes
+        和其他连接提交时才会变化的 data_version，任何写入后自动失效"""
+        key = (date.today(), self.conn.total_changes, self.conn.execute("PRAGMA data_version").fetchone()[0])
+        if self._view_counts[0] != key:
+            self._view_counts = (key, count_due_views(self.conn, key[0]))
+        return self._view_counts[1]
+
+    def _read_data_version(self):
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def external_changes(self):
+        """其他进程 / 连接自上次调用以来提交的修改，返回 ChangeSet；没有时返回 None。
+        data_version 不变时只执行两条常数时间的查询，适合定时轮询"""
+        seq = latest_seq(self.conn)  # 先读序号再读 data_version，两次读取之间的外部提交留到下次处理
+        version = self._read_data_version()
+        if version == self._data_version:
+            self._change_seq = seq  # 这段时间的日志都是本连接自己写的，界面已经更新过
+            return None
+        self._data_version = version
+        self._change_seq, task_ids = changed_since(self.conn, self._change_seq)
+        if task_ids is None:
+            return ChangeSet(True, [], [])
+        if not task_ids:
+            return None
+        removed, placements = [], []
+        for task_id in task_ids:
+            task, position = self._placement(task_id)
+            if task is None:
+                removed.append(task_id)
+            else:
+                placements.append((task, position))
+        return ChangeSet(False, removed, placements)
+
+    def take_rollup_changes(self):
+        """上次调用以来汇总值可能变化的祖先任务 [TaskRow, ...]，供界面刷新这些节点"""
+        seeds, self._rollup_dirty = self._rollup_dirty, set()
+        seeds.discard(None)
+        ids = set()
+        for seed in seeds:
+            ids.update(row[0] for row in self.conn.execute(ANCESTORS_CTE + "SELECT id FROM ancestors", (seed,)))
+        return [task for task in map(self.get_task, ids) if task is not None]
+
+    def _detach(self, task_id, parent_id):
+        """任务（连同子树）离开 parent_id 时更新旧祖先链的汇总"""
+        total, done = subtree_totals(self.conn, task_id)
+        add_counts(self.conn, parent_id, -total, -done)
+        self._rollup_dirty.add(parent_id)
+        return total, done
+
+    def _placement(self, task_id):
+        return load_placement(self.conn, task_id, self.sort)
+
+    def _parent_of(self, task_id):
+        row = self.conn.execute("SELECT parent_id FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return row[0] if row else None
+
+    # ---- 写入：每个写操作是一步可撤销的操作（见 taskJournal.py） ----
+    @contextmanager
+    def _transaction(self):
+        """一个事务，出错时整体回滚。sqlite3 只在 INSERT / UPDATE / DELETE 前隐式 BEGIN，
+        WITH 开头的语句（祖先链汇总、子树删除等）不会，不显式开始时它们各自立即提交"""
+        with self.conn:
+            if not self.conn.in_transaction:
+                self.conn.execute("BEGIN")
+            yield
+
+    @contextmanager
+    def _operation(self):
+        """一个事务；提交前把期间记录的前像归为一步"""
+        with self._transaction():
+            seal_stray(self.conn)
+            yield
+            close_step(self.conn, self.session)
+
+    def add_task(self, parent_id, name, due_date=None, finish_time=None, after_id=None):
+        """在 parent_id 下末尾添加任务；给出 after_id 时插在该任务之后（与它同级）。返回 (TaskRow, position)"""
+        with self._operation():
+            if after_id is None:
+                order = next_order(self.conn, parent_id)
+            else:
+                parent_id, order = order_beside(self.conn, after_id, after=True)
+            cursor = self.conn.execute(
+                "INSERT INTO tasks (name, due_date, finish_time, parent_id, sort_order) VALUES (?, ?, ?, ?, ?)",
+                (name, due_date, finish_time, parent_id, order))
+            add_counts(self.conn, parent_id, 1, 0)
+            refresh_due(self.conn, parent_id)
+        self._rollup_dirty.add(parent_id)
+        return self._placement(cursor.lastrowid)
+
+    def update_task(self, task_id, name, due_date, finish_time):
+        with self._operation():
+            self.conn.execute("UPDATE tasks SET name = ?, due_date = ?, finish_time = ? WHERE id = ?",
+                              (name, due_date, finish_time, task_id))
+            parent_id = self._parent_of(task_id)
+            refresh_due(self.conn, parent_id)
+        self._rollup_dirty.add(parent_id)
+        return self._placement(task_id)  # 按列排序时，修改名称 / 日期会改变位置
+
+    def rename_task(self, task_id, name):
+        """只修改名称（原地重命名），不影响子树汇总；返回 (TaskRow, position)，任务不存在时返回 (None, None)"""
+        with self._operation():
+            self.conn.execute("UPDATE tasks SET name = ? WHERE id = ?", (name, task_id))
+        return self._placement(task_id)
+
+    def _delete(self, task_id):
+        parent_id = self._parent_of(task_id)
+        if subtree_totals(self.conn, task_id) is not None:
+            self._detach(task_id, parent_id)
+        delete_subtree(self.conn, task_id)
+        refresh_due(self.conn, parent_id)
+
+    def delete_task(self, task_id):
+        """删除任务及其所有子任务"""
+        with self._operation():
+            self._delete(task_id)
+        return task_id
+
+    def _check_move(self, task_id, parent_id):
+        if parent_id is not None and (parent_id == task_id or is_descendant(self.conn, task_id, parent_id)):
+            raise ValueError("不能将任务移动到其子任务下")
+
+    def _place(self, task_id, parent_id, order):
+        """把任务放到 parent_id 下的排序键 order 处：只更新这一行，换了父任务时再更新两条祖先链的汇总"""
+        old_parent_id = self._parent_of(task_id)
+        if old_parent_id == parent_id:
+            self.conn.execute("UPDATE tasks SET sort_order = ? WHERE id = ?", (order, task_id))
+            return
+        total, done = self._detach(task_id, old_parent_id)
+        self.conn.execute("UPDATE tasks SET parent_id = ?, sort_order = ? WHERE id = ?", (parent_id, order, task_id))
+        refresh_due(self.conn, old_parent_id)
+        add_counts(self.conn, parent_id, total, done)
+        refresh_due(self.conn, parent_id)
+        self._rollup_dirty.add(parent_id)
+
+    def move_task(self, task_id, parent_id):
+        """把任务移到 parent_id 下的末尾（None 为根任务），返回 (TaskRow, position)"""
+        self._check_move(task_id, parent_id)
+        with self._operation():
+            self._place(task_id, parent_id, next_order(self.conn, parent_id))
+        return self._placement(task_id)
+
+    def move_beside(self, task_id, target_id, after):
+        """把任务移到 target_id 之前 / 之后（与它同级，可以换父任务），返回 (TaskRow, position)"""
+        if target_id == task_id:
+            raise ValueError("不能将任务移动到自身旁边")
+        self._check_move(task_id, self._parent_of(target_id))
+        with self._operation():
+            parent_id, order = order_beside(self.conn, target_id, after, exclude_id=task_id)
+            self._place(task_id, parent_id, order)
+        return self._placement(task_id)
+
+    def _set_completed(self, task_id, status):
+        parent_id = self._parent_of(task_id)
+        changed = set_subtree_completed(self.conn, task_id, status)
+        # 子树内每个节点的汇总都会变化；祖先只需加减变化的数量
+        refresh_subtree_completed(self.conn, task_id, status)
+        add_counts(self.conn, parent_id, 0, changed if status else -changed)
+        refresh_due(self.conn, parent_id)
+        self._rollup_dirty.add(parent_id)
+
+    def toggle_completed(self, task_id):
+        """切换任务及其子树的完成状态，返回 (TaskRow, position, 子树索引)；任务不存在时返回 None"""
+        current = self.conn.execute("SELECT completed FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        if current is None:
+            return None
+        with self._operation():
+            self._set_completed(task_id, 0 if current[0] else 1)
+        task, position = self._placement(task_id)
+        return task, position, load_subtree_index(self.conn, task_id, self.sort)
+
+    def swap_order(self, first_id, second_id):
+        """交换两个同级任务的 sort_order，返回两者的新位置 [(TaskRow, position), ...]"""
+        with self._operation():
+            first_order = self.conn.execute("SELECT sort_order FROM tasks WHERE id = ?", (first_id,)).fetchone()[0]
+            second_order = self.conn.execute("SELECT sort_order FROM tasks WHERE id = ?", (second_id,)).fetchone()[0]
+            self.conn.execute("UPDATE tasks SET sort_order = ? WHERE id = ?", (second_order, first_id))
+            self.conn.execute("UPDATE tasks SET sort_order = ? WHERE id = ?", (first_order, second_id))
+        return [self._placement(first_id), self._placement(second_id)]
+
+    # ---- 批量操作：整批在一个事务内完成，失败时整体回滚 ----
+    def _outermost(self, task_ids):
+        """去重并去掉祖先也在 task_ids 中的任务（它们随祖先一起处理），保持原有顺序"""
+        chosen = set(task_ids)
+        return [task_id for task_id in dict.fromkeys(task_ids)
+                if not any(row[0] in chosen for row in self.conn.execute(
+                    ANCESTORS_CTE + "SELECT id FROM ancestors", (self._parent_of(task_id),)))]
+
+    def _placements(self, task_ids):
+        return [placement for placement in map(self._placement, task_ids) if placement[0]]
+
+    def toggle_completed_many(self, task_ids):
+        """选中的任务全部已完成时取消完成，否则全部标记为完成（均含子树）。
+        返回 ([(TaskRow, position), ...], 各子树合并后的索引)"""
+        task_ids = self._outermost(task_ids)
+        status = int(any(self.conn.execute("SELECT completed FROM tasks WHERE id = ?", (task_id,)).fetchone() == (0,)
+                         for task_id in task_ids))
+        with self._operation():
+            for task_id in task_ids:
+                self._set_completed(task_id, status)
+        index = {}
+        for task_id in task_ids:
+            index.update(load_subtree_index(self.conn, task_id, self.sort))
+        return self._placements(task_ids), index
+
+    def set_completed_many(self, task_ids, status):
+        """把多个任务（均含子树）标记为完成（status=1）或未完成（status=0），返回 [(TaskRow, position), ...]"""
+        task_ids = self._outermost(task_ids)
+        with self._operation():
+            for task_id in task_ids:
+                self._set_completed(task_id, status)
+        return self._placements(task_ids)
+
+    def delete_tasks(self, task_ids):
+        """删除多个任务及其子任务，返回实际删除的顶层任务 id 列表"""
+        task_ids = self._outermost(task_ids)
+        with self._operation():
+            for task_id in task_ids:
+                self._delete(task_id)
+        return task_ids
+
+    def move_tasks(self, task_ids, parent_id):
+        """按给定顺序把多个任务移到 parent_id 下的末尾，返回 [(TaskRow, position), ...]"""
+        task_ids = self._outermost(task_ids)
+        for task_id in task_ids:
+            self._check_move(task_id, parent_id)
+        with self._operation():
+            for task_id in task_ids:
+                self._place(task_id, parent_id, next_order(self.conn, parent_id))
+        return self._placements(task_ids)
+
+    def move_tasks_beside(self, task_ids, target_id, after):
+        """按给定顺序把多个任务连续放到 target_id 之前 / 之后，返回 [(TaskRow, position), ...]"""
+        task_ids = self._outermost(task_ids)
+        if target_id in task_ids:
+            raise ValueError("不能将任务移动到自身旁边")
+        for task_id in task_ids:
+            self._check_move(task_id, self._parent_of(target_id))
+        with self._operation():
+            anchor = target_id
+            for task_id in task_ids:
+                parent_id, order = order_beside(self.conn, anchor, after, exclude_id=task_id)
+                self._place(task_id, parent_id, order)
+                if after:
+                    anchor = task_id  # 之后：依次接在上一个后面；之前：都插在目标前，顺序自然保持
+        return self._placements(task_ids)
+
+    def set_expanded(self, states):
+        """批量写回展开状态：{task_id: 0/1}，一个事务内 executemany"""
+        with self._transaction():
+            self.conn.executemany("UPDATE tasks SET expanded = ? WHERE id = ?",
+                                  [(expanded, task_id) for task_id, expanded in states.items()])
+
+    # ---- 撤销 / 重做 ----
+    def undo(self):
+        """撤销本会话最近一步修改，返回界面增量更新用的 ChangeSet；没有可撤销的修改时返回 None；
+        其他窗口 / 脚本之后修改过相同的任务时抛出 ValueError"""
+        return self._replay("undo")
+
+    def redo(self):
+        """重做最近撤销的一步，返回格式同 undo"""
+        return self._replay("redo")
+
+    def _replay(self, stack):
+        with self._transaction():
+            task_ids = replay_step(self.conn, stack, self.session)
+        if task_ids is None:
+            return None
+        if len(task_ids) > PLACE_LIMIT:
+            return ChangeSet(True, [], [])
+        return ChangeSet(False, *self._locate(task_ids))
+
+    def _locate(self, task_ids):
+        """返回 (已不存在的任务 id, [(TaskRow, position), ...])；
+        同一父任务下有多个任务时只读一次兄弟列表，恢复整棵子树时不必逐个计算位置"""
+        removed, siblings = [], defaultdict(list)
+        for task_id in task_ids:
+            task = load_task(self.conn, task_id)
+            if task is None:
+                removed.append(task_id)
+            else:
+                siblings[task.parent_id].append(task)
+        placements = []
+        for parent_id, tasks in siblings.items():
+            if len(tasks) == 1:
+                placements.append(self._placement(tasks[0].id))
+                continue
+            positions = {child.id: position for position, child in enumerate(self.get_children(parent_id))}
+            placements.extend((task, positions[task.id]) for task in tasks)
+        return removed, placements
+
+    # ---- 归档 ----
+    def archive_completed(self, days=ARCHIVE_AFTER_DAYS):
+        """把完成超过 days 天、且子树中没有未完成任务的整棵子树移入归档表，返回归档的任务数"""
+        with self._transaction():
+            count = archive_completed(self.conn, days)
+            forget(self.conn)  # 移入归档表的任务无法靠日志撤销，之前的步骤也可能涉及它们
+        return count
+
+    def restore_archived(self, task_ids):
+        """把归档中的多个任务（连同子树）移回任务树，返回恢复的顶层任务 [(TaskRow, position), ...]"""
+        restored = []
+        with self._transaction():
+            for task_id in task_ids:
+                if restore_archived(self.conn, task_id):  # 已随先恢复的祖先一起移回的会返回 False
+                    restored.append(task_id)
+                    self._rollup_dirty.add(self._parent_of(task_id))
+            forget(self.conn)
+        return self._placements(restored)
+
+    def load_archived(self, parent_id=None, text=""):
+        """归档箱中的一层（或按名称筛选的结果）：[ArchivedRow, ...]"""
+        return load_archived(self.conn, parent_id, text)
+
+    def count_archived(self):
+        return count_archived(self.conn)
+
+    # ---- 导入 / 导出 ----
+    def import_tasks(self, path, parent_id=None):
+        """流式导入 .jsonl / .json / .csv / .md 文件，返回导入的任务数"""
+        self._rollup_dirty.add(parent_id)
+        with self._operation():  # 整个导入与归入撤销日志在同一个事务内，为一步，可以一次撤销
+            return import_tasks(self.conn, path, parent_id)
+
+    def export_tasks(self, path):
+        """按显示顺序流式导出整棵任务树，返回导出的任务数"""
+        return export_tasks(self.conn, path)
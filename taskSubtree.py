@@ -0,0 +1,49 @@
+# 基于 WITH RECURSIVE 的整棵子树操作：每个操作一条语句完成，不再逐节点往返查询
+
+# 以 ? 为根（含自身）的全部后代
+SUBTREE_CTE = """
+    WITH RECURSIVE subtree(id) AS (
+        SELECT ?
+        UNION ALL
+        SELECT t.id FROM tasks t JOIN subtree s ON t.parent_id = s.id
+    )
+"""
+
+DELETE_SUBTREE_SQL = SUBTREE_CTE + "DELETE FROM tasks WHERE id IN subtree"
+
+SET_SUBTREE_COMPLETED_SQL = SUBTREE_CTE + """
+    UPDATE tasks SET completed = ?2, completed_at = CASE WHEN ?2 THEN datetime('now', 'localtime') END
+    WHERE id IN subtree AND completed IS NOT ?2
+"""
+
+# 沿 parent_id 向上找祖先链；UNION 去重，数据中即使有环也能结束
+IS_ANCESTOR_SQL = """
+    WITH RECURSIVE ancestors(id) AS (
+        SELECT parent_id FROM tasks WHERE id = ?
+        UNION
+        SELECT t.parent_id FROM tasks t JOIN ancestors a ON t.id = a.id
+    )
+    SELECT 1 FROM ancestors WHERE id = ? LIMIT 1
+"""
+
+
+def _changes(conn, sql, params):
+    # 以 WITH 开头的语句，cursor.rowcount 恒为 -1；total_changes 又会算上触发器（如全文索引）的修改，
+    # 改用 changes()：只统计这条语句本身修改的行数
+    conn.execute(sql, params)
+    return conn.execute("SELECT changes()").fetchone()[0]
+
+
+def delete_subtree(conn, task_id):
+    """删除任务及其所有子任务，返回删除的行数"""
+    return _changes(conn, DELETE_SUBTREE_SQL, (task_id,))
+
+
+def set_subtree_completed(conn, task_id, status):
+    """把任务及其所有子任务标记为 status，返回实际修改的行数"""
+    return _changes(conn, SET_SUBTREE_COMPLETED_SQL, (task_id, status))
+
+
+def is_descendant(conn, parent_id, possible_child_id):
+    """possible_child_id 是否位于 parent_id 的子树中（不含自身）"""
+    return conn.execute(IS_ANCESTOR_SQL, (possible_child_id, parent_id)).fetchone() is not None
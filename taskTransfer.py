@@ -0,0 +1,326 @@
+# 任务的流式导入 / 导出：读写都是生成器管道，内存占用与任务数量无关。
+# 支持的格式（按扩展名区分）：
+#   .jsonl          每行一个 JSON 对象（JSON Lines）
+#   .json           任务对象组成的 JSON 数组，读取时逐个元素解析，不整体读入
+#   .csv            带表头的 CSV
+#   .md             Markdown 大纲：两个空格（或一个制表符）一级缩进，"- [ ]" / "- [x]" 表示完成状态，
+#                   没有复选框的 "- 名称" 为未完成任务；名称后可跟 "📅 截止日期" 与 "✅ 完成时间"
+import csv
+import json
+import os
+import re
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+
+from taskChangeLog import log_reload
+from taskJournal import journal_inserted
+from taskOrdering import GAP, next_order
+from taskRollups import add_counts, rebuild_subtrees, refresh_due
+from taskSearch import fts_available
+
+FIELDS = ["id", "parent_id", "name", "due_date", "finish_time", "completed", "sort_order", "expanded", "completed_at"]
+
+CHUNK_SIZE = 5000
+READ_SIZE = 1 << 16  # 解析 JSON 数组时每次读入的字符数
+
+# 深度优先、按界面显示顺序遍历整棵树：递归队列按 depth DESC 取出（即深度优先），
+# 同一深度再按同级显示顺序；队列中只保留当前路径上待处理的兄弟节点
+EXPORT_SQL = """
+    WITH RECURSIVE walk(id, parent_id, name, due_date, finish_time, completed, sort_order, expanded, completed_at,
+                        depth) AS (
+        SELECT id, parent_id, name, due_date, finish_time, completed, sort_order, expanded, completed_at, 0
+        FROM tasks WHERE parent_id IS NULL
+        UNION ALL
+        SELECT t.id, t.parent_id, t.name, t.due_date, t.finish_time, t.completed, t.sort_order, t.expanded,
+               t.completed_at, w.depth + 1
+        FROM tasks t JOIN walk w ON t.parent_id = w.id
+        ORDER BY 10 DESC, 6, 7, 1
+    )
+    SELECT * FROM walk
+"""
+
+INSERT_SQL = """
+    INSERT INTO tasks (id, parent_id, name, due_date, finish_time, completed, sort_order, expanded, completed_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# 父任务不在本次导入中的任务（导入的 id 都大于 id_offset）
+ORPHAN_SQL = """
+    SELECT t.id, t.parent_id FROM tasks t
+    WHERE t.id > ? AND t.parent_id > ? AND NOT EXISTS (SELECT 1 FROM tasks p WHERE p.id = t.parent_id)
+    ORDER BY t.id LIMIT 1
+"""
+
+NON_SPACE = re.compile(r"\S")
+
+MARKDOWN_LINE = re.compile(r"^(?P<indent>[ \t]*)[-*+] (?:\[(?P<done>[ xX])\] )?(?P<name>.*?)"
+                           r"(?: 📅 (?P<due>\d{4}-\d{2}-\d{2}))?(?: ✅ (?P<finish>\d{4}-\d{2}-\d{2} \d{2}:\d{2}))?$")
+
+
+def _format_of(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".json", ".csv", ".md"):
+        return ext[1:]
+    raise ValueError(f"不支持的文件格式：{ext or path}（可用 .jsonl / .json / .csv / .md）")
+
+
+# ---- 导出 ----
+def iter_export_rows(conn):
+    """按显示顺序逐行产出 dict（含 depth），不一次性读入内存"""
+    for row in conn.execute(EXPORT_SQL):
+        record = dict(zip(FIELDS, row[:-1]))
+        record["depth"] = row[-1]
+        yield record
+
+
+def _write_jsonl(rows, f):
+    for record in rows:
+        record.pop("depth")
+        f.write(json.dumps(record, ensure_ascii=False))
+        f.write("\n")
+        yield
+
+
+def _write_json(rows, f):
+    """每个元素占一行的 JSON 数组"""
+    f.write("[")
+    separator = "\n"
+    for record in rows:
+        record.pop("depth")
+        f.write(separator)
+        f.write(json.dumps(record, ensure_ascii=False))
+        separator = ",\n"
+        yield
+    f.write("\n]\n")
+
+
+def _write_csv(rows, f):
+    writer = csv.DictWriter(f, fieldnames=FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for record in rows:
+        writer.writerow(record)
+        yield
+
+
+def _write_markdown(rows, f):
+    for record in rows:
+        line = f"{'  ' * record['depth']}- [{'x' if record['completed'] else ' '}] {record['name']}"
+        if record["due_date"]:
+            line += f" 📅 {record['due_date']}"
+        if record["finish_time"]:
+            line += f" ✅ {record['finish_time']}"
+        f.write(line + "\n")
+        yield
+
+
+WRITERS = {"jsonl": _write_jsonl, "json": _write_json, "csv": _write_csv, "md": _write_markdown}
+
+
+def export_tasks(conn, path):
+    """把整棵任务树导出到 path，返回导出的任务数"""
+    writer = WRITERS[_format_of(path)]
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for _ in writer(iter_export_rows(conn), f):
+            count += 1
+    return count
+
+
+# ---- 导入 ----
+@contextmanager
+def _without_row_triggers(conn):
+    """在当前事务内暂时删除 tasks 上的触发器（全文索引、变更日志、撤销日志），结束时按原定义重建。
+    这些触发器每插入一行各执行一次，导入几十万行时比插入本身还慢；删除与重建都在导入的事务中，
+    其他连接看不到中间状态，失败回滚时触发器随之恢复"""
+    if not conn.in_transaction:
+        conn.execute("BEGIN")  # 不在事务中时 DROP TRIGGER 会立即生效
+    triggers = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'tasks'").fetchall()
+    for name, _ in triggers:
+        conn.execute(f"DROP TRIGGER {name}")
+    yield
+    for _, sql in triggers:
+        conn.execute(sql)
+
+
+def _int_or_none(value):
+    return None if value in (None, "") else int(value)
+
+
+def _int_field(record, field, number, positive=False):
+    """读取第 number 条记录的整数字段，不是整数（positive 时不是正整数）时抛出指明记录的 ValueError"""
+    value = record.get(field)
+    try:
+        result = _int_or_none(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"第 {number} 条记录的 {field} 应为整数：{value!r}") from None
+    if positive and result is not None and result < 1:
+        raise ValueError(f"第 {number} 条记录的 {field} 应为正整数：{value!r}")
+    return result
+
+
+def _read_jsonl(f):
+    for line in f:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _read_json(f):
+    """逐个解析 JSON 数组的元素：缓冲区中凑够一个完整元素就用 raw_decode 取出并丢弃，
+    内存只占一块读入的内容加一个元素。以前版本导出的 .json 为每行一个对象，按 JSON Lines 读取"""
+    decoder = json.JSONDecoder()
+    buffer, pos = "", 0
+
+    def next_char():
+        """跳过空白，返回下一个字符（pos 指向它）"""
+        nonlocal buffer, pos
+        while True:
+            match = NON_SPACE.search(buffer, pos)
+            if match:
+                pos = match.start()
+                return buffer[pos]
+            buffer, pos = f.read(READ_SIZE), 0
+            if not buffer:
+                raise ValueError("JSON 文件不完整：数组没有以 ] 结束")
+
+    first = next_char()
+    if first == "{":
+        f.seek(0)
+        yield from _read_jsonl(f)
+        return
+    if first != "[":
+        raise ValueError("JSON 文件应为任务对象组成的数组")
+    pos += 1
+    if next_char() == "]":
+        return
+    while True:
+        next_char()
+        while True:
+            try:
+                record, pos = decoder.raw_decode(buffer, pos)
+                break
+            except json.JSONDecodeError as e:
+                more = f.read(READ_SIZE)
+                if not more:
+                    raise ValueError(f"JSON 文件格式错误：{e}") from e
+                buffer, pos = buffer[pos:] + more, 0
+        if not isinstance(record, dict):
+            raise ValueError("JSON 数组的元素应为任务对象")
+        yield record
+        separator = next_char()
+        pos += 1
+        if separator == "]":
+            return
+        if separator != ",":
+            raise ValueError(f"JSON 数组中缺少逗号：{separator!r}")
+
+
+def _read_csv(f):
+    yield from csv.DictReader(f)
+
+
+def _read_markdown(f):
+    """按缩进还原层级：栈里只保存当前路径上的祖先，内存与树的深度成正比。
+    空行跳过；其他不是列表项的行抛出指明行号的 ValueError，不悄悄丢掉任务"""
+    stack = []  # [(缩进, 行号 id, 已有子任务数)]
+    root_count = 0
+    for number, line in enumerate(f, start=1):
+        line = line.rstrip("\r\n")
+        match = MARKDOWN_LINE.match(line)
+        if not match:
+            if line.strip():
+                raise ValueError(f"第 {number} 行无法识别为任务：{line.strip()}")
+            continue
+        indent = len(match["indent"].replace("\t", "  "))
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+        if stack:
+            parent_indent, parent_id, children = stack[-1]
+            stack[-1] = (parent_indent, parent_id, children + 1)
+            order = (children + 1) * GAP
+        else:
+            parent_id = None
+            root_count += 1
+            order = root_count * GAP
+        stack.append((indent, number, 0))
+        yield {"id": number, "parent_id": parent_id, "name": match["name"], "due_date": match["due"],
+               "finish_time": match["finish"], "completed": int(match["done"] not in (None, " ")), "sort_order": order}
+
+
+READERS = {"jsonl": _read_jsonl, "json": _read_json, "csv": _read_csv, "md": _read_markdown}
+
+
+def _import_rows(records, id_offset, parent_id, root_order_offset):
+    """把文件中的 id / parent_id 整体平移 id_offset，保持原有层级与 sort_order；
+    逐条检查字段，缺少 id / name 或数值字段不是整数时抛出指明第几条记录的 ValueError"""
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for number, record in enumerate(records, start=1):
+        file_id = _int_field(record, "id", number, positive=True)
+        if file_id is None:
+            raise ValueError(f"第 {number} 条记录缺少 id")
+        if record.get("name") is None:
+            raise ValueError(f"第 {number} 条记录缺少 name")
+        # id 都是正整数，平移后父任务只可能是本次导入的任务，不会误挂到已有任务下
+        file_parent = _int_field(record, "parent_id", number, positive=True)
+        sort_order = _int_field(record, "sort_order", number) or 0
+        if file_parent is None:
+            new_parent = parent_id
+            sort_order += root_order_offset
+        else:
+            new_parent = file_parent + id_offset
+        expanded = _int_field(record, "expanded", number)
+        completed = _int_field(record, "completed", number) or 0
+        # 文件中没有完成时间的已完成任务，从导入时起计算归档时长
+        completed_at = (record.get("completed_at") or now) if completed else None
+        yield (file_id + id_offset, new_parent, record["name"], record.get("due_date") or None,
+               record.get("finish_time") or None, completed, sort_order, 0 if expanded is None else expanded,
+               completed_at)
+
+
+def _check_reachable(conn, parent_id, id_offset, count):
+    """导入的任务都应挂在导入的根任务之下：汇总已重算，各根任务的 1 + sub_total 之和就是能从根到达的任务数。
+    父任务不在文件中或 parent_id 成环的任务在界面上看不到，却会计入汇总，因此整个导入作废"""
+    reachable = conn.execute("SELECT COALESCE(SUM(1 + sub_total), 0) FROM tasks WHERE parent_id IS ? AND id > ?",
+                             (parent_id, id_offset)).fetchone()[0]
+    if reachable == count:
+        return
+    orphan = conn.execute(ORPHAN_SQL, (id_offset, id_offset)).fetchone()
+    if orphan:
+        raise ValueError(f"id 为 {orphan[0] - id_offset} 的任务的父任务 {orphan[1] - id_offset} 不在文件中")
+    raise ValueError(f"文件中有 {count - reachable} 个任务的 parent_id 构成循环，无法挂到任务树上")
+
+
+def import_tasks(conn, path, parent_id=None):
+    """从 path 流式导入任务到 parent_id 之下（None 为根），返回导入的任务数。
+
+    文件中的 id 平移到当前最大 id（含归档表）之后，因此不需要在内存中保存 id 映射；
+    全部行分块 executemany；父任务不在文件中的记录使整个导入失败（ValueError）；调用方负责事务（TaskStore 把整个导入作为一步可撤销的操作），失败时整体回滚。
+    插入期间暂停 tasks 上的触发器，之后全文索引、变更日志、撤销日志各自整批补写一次；
+    导入的子树整体计算一次汇总，再把数量加到 parent_id 的祖先链上。
+    """
+    reader = READERS[_format_of(path)]
+    with open(path, encoding="utf-8", newline="") as f:
+        id_offset = conn.execute("SELECT MAX((SELECT COALESCE(MAX(id), 0) FROM tasks), "
+                                 "(SELECT COALESCE(MAX(id), 0) FROM tasks_archive))").fetchone()[0]
+        root_order_offset = next_order(conn, parent_id)
+        rows = _import_rows(reader(f), id_offset, parent_id, root_order_offset)
+        with _without_row_triggers(conn):
+            while True:
+                chunk = list(islice(rows, CHUNK_SIZE))
+                if not chunk:
+                    break
+                conn.executemany(INSERT_SQL, chunk)
+            # 导入的 id 都大于 id_offset；不用 total_changes 计数，它会算上触发器的修改
+            count, done, last_id = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(completed), 0), MAX(id) FROM tasks WHERE id > ?",
+                (id_offset,)).fetchone()
+            rebuild_subtrees(conn, "SELECT id FROM tasks WHERE parent_id IS ? AND id > ?", (parent_id, id_offset))
+            _check_reachable(conn, parent_id, id_offset, count)
+        if count:
+            if fts_available(conn):
+                conn.execute("INSERT INTO tasks_fts(rowid, name) SELECT id, name FROM tasks WHERE id > ?", (id_offset,))
+            log_reload(conn)
+            journal_inserted(conn, id_offset + 1, last_id)
+        add_counts(conn, parent_id, count, done)
+        refresh_due(conn, parent_id)
+        return count
@@ -2,18 +2,60 @@ import math
 import time
 import tkinter as tk
 from functools import partial
-from tkinter import ttk, messagebox
-import sqlite3
-from datetime import datetime
+from tkinter import ttk, messagebox, filedialog, simpledialog
+from datetime import date, datetime
+from dbWorker import DbWorker
+from taskArchive import ARCHIVE_AFTER_DAYS
+from taskArchiveDialog import TaskArchiveDialog
+from taskBackup import BackupScheduler
+from taskDueViews import DUE_VIEWS
 from taskEditorDialog import TaskEditorDialog
+from taskFilters import FILTER_FIELDS, FILTER_STATUSES, TaskFilter, is_active
+from taskProfiler import PROFILER, profiled
+from taskProfilerWindow import ProfilerWindow
+from taskSorting import MANUAL, next_sort, sort_index
+from taskStore import TaskStore
+from taskTreeLoader import is_more, is_placeholder
+from taskTreeRenderer import PAGE_SIZE, ProgressiveRenderer
+from taskTreeUpdater import TaskTreeUpdater, TreeOutOfSync
+from writeBehindBuffer import WriteBehindBuffer
+
+DB_PATH = "task_tree.db"
+
+# 导入 / 导出支持的文件类型
+TRANSFER_FILETYPES = [("JSON Lines", "*.jsonl"), ("JSON", "*.json"), ("CSV", "*.csv"), ("Markdown 大纲", "*.md")]
+
+SYNC_MS = 500  # 检查其他实例 / 脚本修改的间隔
+PREBUILD_EDITOR_MS = 1000  # 启动后空闲片刻再预先构建编辑对话框，第一次添加 / 修改也不用等
+
+# 可点击排序的列：Treeview 列 -> (taskSorting 中的列标识, 标题)
+SORT_HEADINGS = {"#0": ("name", "任务名称"), "due": ("due", "截止时间"), "finish": ("finish", "完成时间")}
+
 
 class TaskTreeApp:
-    def __init__(self, root):
+    def __init__(self, root, lazy_load=True):
         self.root = root
+        self.lazy_load = lazy_load  # 折叠分支的子任务在展开时才读取
         self._dragging_item = None
         self._dragging_target = None
+        self._dragging_ids = []  # 一起拖动的任务：按下时若点在已选中的行上，则为整个选择
         self._hover_target_item = None  # 当前悬浮的 item
+        self._hover_tag = "hover"  # 放到其下为 hover，放到其前 / 后为 hover_edge
         self._completed_items = set()
+        self._unloaded_items = set()  # 挂着占位子节点、子任务尚未加载的节点
+        self._search_text = ""  # 非空时树中只显示搜索结果
+        self._search_after = None
+        self._due_view = None  # 当前截止日期视图（DUE_VIEWS 的键），None 为全部任务
+        self._task_filter = None  # 当前的状态 / 日期范围筛选（taskFilters.TaskFilter），None 为不筛选
+        self._filter_seq = 0  # 搜索 / 视图 / 筛选请求序号，只显示最新一次的结果
+        self._filter_view = None  # 最近一次筛选结果 (标题, 索引, 匹配的 id, 是否超过上限)，切换排序时在内存中重排
+        self._sort = MANUAL  # 同级显示顺序，点击列标题切换
+        self._heading_label = ""  # 名称列标题后附带的筛选结果数
+        self._paging_items = set()  # 正在读取下一页的“显示更多”节点
+        self._sync_after = None
+        self._profiler_window = None
+        self._editor = None  # 复用的 TaskEditorDialog
+        self._rename_entry = None  # 原地重命名：(覆盖在名称上的输入框, item)
 
         self._press_time = None
         self._press_coords = None
@@ -21,23 +63,80 @@ class TaskTreeApp:
         self._min_distance = 5  # 拖拽最小距离（像素）
 
 
-        self.conn = sqlite3.connect("task_tree.db")
-        self.create_tables()
+        # 所有数据库操作都在后台线程中执行，结果再交回界面线程
+        self.db = DbWorker(root, partial(TaskStore, DB_PATH), on_busy=self._show_busy, on_error=self._show_db_error)
+        # 定期在后台线程中做在线快照备份（backups 目录），不占用界面线程和 DbWorker
+        self.backups = BackupScheduler(DB_PATH)
+        self.backups.start()
+        # 展开/折叠状态延迟合并写回，不在每次点击时提交
+        self.expanded_buffer = WriteBehindBuffer(root, self.db, TaskStore.set_expanded)
+        root.protocol("WM_DELETE_WINDOW", self.on_close)
         # 添加父任务按钮
         self.toolbar = tk.Frame(root)
         self.toolbar.pack(fill="x", pady=(5,0))
         tk.Button(self.toolbar, text="➕ 添加父任务", command=self.add_parent_task).pack(side="left", padx=20)
         tk.Button(self.toolbar, text="🔽 全部展开", command=self.expand_all).pack(side="left", padx=20)
         tk.Button(self.toolbar, text="🔼 全部折叠", command=self.collapse_all).pack(side="left", padx=20)
+        tk.Button(self.toolbar, text="📥 导入", command=self.import_tasks).pack(side="left", padx=20)
+        tk.Button(self.toolbar, text="📤 导出", command=self.export_tasks).pack(side="left", padx=20)
+        tk.Button(self.toolbar, text="↶ 撤销", command=self.undo).pack(side="left", padx=(20, 0))
+        tk.Button(self.toolbar, text="↷ 重做", command=self.redo).pack(side="left", padx=5)
+        tk.Button(self.toolbar, text="💾 备份", command=self.backup_now).pack(side="left", padx=15)
+        tk.Button(self.toolbar, text="📊 性能", command=self.toggle_profiler_window).pack(side="left", padx=20)
+        self.busy_label = tk.Label(self.toolbar, text="", fg="gray")
+        self.busy_label.pack(side="right", padx=20)
+        # 搜索框：输入即搜索，清空后恢复完整任务树
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", self._on_search_changed)
+        tk.Entry(self.toolbar, textvariable=self.search_var, width=20).pack(side="right")
+        tk.Label(self.toolbar, text="🔍").pack(side="right")
+        # 截止日期视图：只显示对应的未完成任务及其所在分支，按钮上显示任务数
+        self.view_bar = tk.Frame(root)
+        self.view_bar.pack(fill="x", padx=10, pady=(5, 0))
+        self.view_var = tk.StringVar(value="")
+        self.view_buttons = {}
+        for view, label in [("", "全部任务")] + list(DUE_VIEWS.items()):
+            button = tk.Radiobutton(self.view_bar, text=label, variable=self.view_var, value=view,
+                                    indicatoron=False, padx=8, command=self._on_view_selected)
+            button.pack(side="left", padx=(0, 5))
+            self.view_buttons[view] = button
+        # 归档：完成已久的子树移入归档表，不再参与加载；归档箱中可以浏览和恢复
+        tk.Button(self.view_bar, text="📂 归档箱", command=self.open_archive).pack(side="right")
+        tk.Button(self.view_bar, text="🗄 归档已完成", command=self.archive_completed).pack(side="right", padx=5)
+        # 筛选：按完成状态与截止 / 完成日期范围（含两端，留空为不限），与搜索、截止日期视图互斥
+        self.filter_bar = tk.Frame(root)
+        self.filter_bar.pack(fill="x", padx=10, pady=(5, 0))
+        tk.Label(self.filter_bar, text="筛选").pack(side="left")
+        self.filter_status = ttk.Combobox(self.filter_bar, values=list(FILTER_STATUSES.values()), state="readonly",
+                                          width=7)
+        self.filter_status.pack(side="left", padx=5)
+        self.filter_field = ttk.Combobox(self.filter_bar, values=list(FILTER_FIELDS.values()), state="readonly",
+                                         width=9)
+        self.filter_field.pack(side="left")
+        tk.Label(self.filter_bar, text="从").pack(side="left", padx=(5, 0))
+        self.filter_start = tk.Entry(self.filter_bar, width=11)
+        self.filter_start.pack(side="left")
+        tk.Label(self.filter_bar, text="到").pack(side="left")
+        self.filter_end = tk.Entry(self.filter_bar, width=11)
+        self.filter_end.pack(side="left")
+        for entry in (self.filter_start, self.filter_end):
+            entry.bind("<Return>", lambda event: self.apply_filter())
+        tk.Button(self.filter_bar, text="筛选", command=self.apply_filter).pack(side="left", padx=5)
+        tk.Button(self.filter_bar, text="清除", command=self.clear_filter).pack(side="left")
+        self._reset_filter_bar()
 
         # 创建 Treeview
-        self.tree = ttk.Treeview(root, columns=("due","finish"), show="tree headings")
-        self.tree.heading("#0", text="任务名称")
-        self.tree.heading("due", text="截止时间")
-        self.tree.heading("finish", text="完成时间")
-        self.tree.column("#0", width=600)
-        self.tree.column("due", width=150)
-        self.tree.column("finish", width=180)
+        self.tree = ttk.Treeview(root, columns=("due", "finish", "progress", "next_due"), show="tree headings")
+        # 点击名称 / 截止时间 / 完成时间列标题，在每一级内按该列排序
+        for column, (key, title) in SORT_HEADINGS.items():
+            self.tree.heading(column, text=title, command=partial(self.sort_by, key))
+        self.tree.heading("progress", text="子任务进度")
+        self.tree.heading("next_due", text="子任务最近截止")
+        self.tree.column("#0", width=420)
+        self.tree.column("due", width=110)
+        self.tree.column("finish", width=140)
+        self.tree.column("progress", width=110)
+        self.tree.column("next_due", width=120)
         self.tree.pack(fill="both", expand=True, padx=10, pady=10)
 
         # 右键菜单
@@ -46,6 +145,7 @@ class TaskTreeApp:
         self.menu.add_command(label="🌱 设置为根任务", command=self.set_as_root_task)
         self.menu.add_separator()
         self.menu.add_command(label="➕ 添加子任务", command=self.add_child_task)
+        self.menu.add_command(label="⤵️ 在下方添加同级任务", command=self.add_sibling_task)
         self.menu.add_command(label="✏️ 修改任务", command=self.edit_task)
         self.menu.add_command(label="❌ 删除任务", command=self.delete_task)
 
@@ -53,12 +153,29 @@ class TaskTreeApp:
         self.tree.bind("<ButtonPress-1>", self.on_drag_start)
         self.tree.bind("<B1-Motion>", self.on_drag_motion)
         self.tree.bind("<ButtonRelease-1>", self.on_release)
+        self.tree.bind("<Double-1>", self.on_double_click)
+        self.tree.bind("<F2>", lambda event: self.start_rename())
+        self.tree.bind("<Control-z>", lambda event: self.undo())
+        self.tree.bind("<Control-y>", lambda event: self.redo())
+        self.tree.bind("<Control-Z>", lambda event: self.redo())  # Ctrl+Shift+Z
         self.tree.tag_configure("hover", background="#d0eaff")  # 浅蓝色背景
+        self.tree.tag_configure("hover_edge", background="#eef6ff")  # 放到前 / 后时更浅
+        self.tree.tag_configure("completed", foreground="gray")
+        self.tree.tag_configure("match", background="#fff3b0")  # 搜索命中
+        self.tree.tag_configure("more", foreground="#1a6fb5")
         self.tree.bind("<<TreeviewOpen>>", self.on_tree_open)
         self.tree.bind("<<TreeviewClose>>", self.on_tree_close)
+        self.updater = TaskTreeUpdater(self.tree, self._completed_items, self._unloaded_items,
+                                       load_children=self._load_unloaded_children)
+        # 大量任务分时间片插入，子任务很多的节点分页显示
+        self.renderer = ProgressiveRenderer(self.tree, self._completed_items, self._unloaded_items,
+                                            load_children=self._load_unloaded_children)
 
         self.load_tree()
+        self._schedule_sync()
+        root.after(PREBUILD_EDITOR_MS, self._editor_dialog)
 
+    @profiled
     def on_release(self, event):
         release_time = time.time()
         duration = release_time - self._press_time
@@ -73,78 +190,347 @@ class TaskTreeApp:
             if distance >= self._min_distance:
                 self.tree.after(remaining_time, self.on_drag_drop_sort, event)
 
-    def create_tables(self):
-        self.conn.execute('''
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                due_date TEXT,
-                parent_id INTEGER,
-                completed INTEGER DEFAULT 0,
-                sort_order INTEGER DEFAULT 0,
-                expanded INTEGER DEFAULT 1,  -- 1=展开，0=折叠
-                FOREIGN KEY(parent_id) REFERENCES tasks(id)
-            )
-        ''')
-        self.conn.commit()
-        # 若旧表中没有 sort_order 字段，尝试添加（避免报错）
+    def on_close(self):
+        if self._sync_after is not None:
+            self.root.after_cancel(self._sync_after)
+            self._sync_after = None
+        self.expanded_buffer.flush()
+        self.db.close()
+        self.backups.stop()
+        PROFILER.write_log()  # 设置了 TASK_PROFILE_LOG 时写入统计
+        self.root.destroy()
+
+    def _show_busy(self, busy):
+        self.busy_label.config(text="⏳ 处理中…" if busy else "")
+        self.tree.config(cursor="watch" if busy else "")
+
+    def _show_db_error(self, error):
+        messagebox.showerror("数据库错误", str(error))
+
+    @profiled
+    def load_tree(self, lazy=None, then=None):
+        self.expanded_buffer.flush()  # 重新读取前先写回未保存的展开状态
+        if self._filtered:
+            self._submit_filter()  # 搜索 / 视图中只刷新筛选结果
+            return
+        if self.lazy_load if lazy is None else lazy:
+            # 只加载可见部分（根任务只读第一页），折叠节点挂占位子节点
+            self.db.submit(TaskStore.load_visible_page, None, 0, PAGE_SIZE,
+                           callback=lambda result: self._fill_tree(*result, then=then))
+        else:
+            # 一次查询 + 内存索引，替代逐节点查询子任务（N+1）
+            self.db.submit(TaskStore.load_tree, callback=lambda index: self._fill_tree(index, (), then=then))
+
+    @profiled
+    def _fill_tree(self, index, unloaded, hidden=0, then=None, paged=True):
+        self.renderer.cancel()
+        self.tree.delete(*self.tree.get_children())
+        self._completed_items.clear()
+        self._unloaded_items.clear()
+        self._paging_items.clear()
+        self.renderer.render(index, unloaded, hidden=hidden, paged=paged, then=then)
+        self._refresh_view_counts()
+
+    @property
+    def _filtered(self):
+        return bool(self._search_text or self._due_view or self._task_filter)
+
+    def _set_headings(self, label=None):
+        """刷新列标题：排序列标上 ▲ / ▼，名称列附带筛选结果数（label 为 None 时保留原来的）"""
+        if label is not None:
+            self._heading_label = label
+        for column, (key, title) in SORT_HEADINGS.items():
+            if self._sort.column == key:
+                title += " ▼" if self._sort.descending else " ▲"
+            if column == "#0" and self._heading_label:
+                title += f"（{self._heading_label}）"
+            self.tree.heading(column, text=title)
+
+    def sort_by(self, column):
+        """点击列标题：每一级内按该列排序，再点一次降序，第三次恢复手动顺序"""
+        self._sort = next_sort(self._sort, column)
+        self._set_headings()
+        self.db.submit(TaskStore.set_sort, self._sort)  # 之后的读取与增量更新都按新顺序
+        if not self._filtered:
+            self.load_tree()
+        elif self._filter_view is not None:
+            self._render_filtered()  # 筛选结果已在内存中，直接重排，不再查询
+
+    def _refresh_view_counts(self):
+        # 计数在 TaskStore 中缓存，没有写入时不会重新查询
+        self.db.submit(TaskStore.due_view_counts, callback=self._show_view_counts)
+
+    def _show_view_counts(self, counts):
+        for view, count in counts.items():
+            self.view_buttons[view].config(text=f"{DUE_VIEWS[view]} ({count})")
+
+    def _on_view_selected(self):
+        self._due_view = self.view_var.get() or None
+        if self._search_text:
+            self._search_text = ""
+            self.search_var.set("")  # 视图与搜索互斥
+        self._task_filter = None
+        self._reset_filter_bar()
+        if not self._filtered:
+            self._filter_seq += 1  # 丢弃还在路上的筛选结果
+            self._set_headings("")
+        self.load_tree()
+
+    def _on_search_changed(self, *args):
+        # 输入防抖：停顿 150ms 后再查询
+        if self._search_after is not None:
+            self.root.after_cancel(self._search_after)
+        self._search_after = self.root.after(150, self._run_search)
+
+    def _run_search(self):
+        self._search_after = None
+        text = self.search_var.get().strip()
+        if text == self._search_text:
+            return
+        self._search_text = text
+        if text:
+            self._due_view = None
+            self.view_var.set("")
+            self._task_filter = None
+            self._reset_filter_bar()
+            self._submit_filter()
+        else:
+            self._filter_seq += 1  # 丢弃还在路上的搜索结果
+            self._set_headings("")
+            self.load_tree()
+
+    def _reset_filter_bar(self):
+        self.filter_status.current(0)
+        self.filter_field.current(0)
+        self.filter_start.delete(0, "end")
+        self.filter_end.delete(0, "end")
+
+    def apply_filter(self):
         try:
-            self.conn.execute("ALTER TABLE tasks ADD COLUMN sort_order INTEGER DEFAULT 0")
-            self.conn.commit()
-        except sqlite3.OperationalError:
-            pass  # 字段已存在
-        # 若旧表中没有 expanded 字段，尝试添加（避免报错）
+            start, end = [date.fromisoformat(text).isoformat() if text else None
+                          for text in (self.filter_start.get().strip(), self.filter_end.get().strip())]
+        except ValueError:
+            messagebox.showerror("日期格式错误", "请输入正确的日期格式：YYYY-MM-DD")
+            return
+        task_filter = TaskFilter(list(FILTER_STATUSES)[self.filter_status.current()],
+                                 list(FILTER_FIELDS)[self.filter_field.current()], start, end)
+        if not is_active(task_filter):
+            self.clear_filter()
+            return
+        self._task_filter = task_filter
+        self._due_view = None
+        self.view_var.set("")
+        if self._search_text:
+            self._search_text = ""
+            self.search_var.set("")  # 筛选与搜索、视图互斥
+        self.load_tree()
+
+    def clear_filter(self):
+        self._reset_filter_bar()
+        if self._task_filter is None:
+            return
+        self._task_filter = None
+        self._filter_seq += 1  # 丢弃还在路上的筛选结果
+        self._set_headings("")
+        self.load_tree()
+
+    def _submit_filter(self):
+        """后台查询搜索 / 截止日期视图匹配的任务及其祖先分支"""
+        self._filter_seq += 1
+        self._filter_view = None
+        if self._search_text:
+            fn, arg, label = TaskStore.search, self._search_text, "搜索到"
+        elif self._task_filter:
+            fn, arg, label = TaskStore.load_filtered, self._task_filter, "筛选到"
+        else:
+            fn, arg, label = TaskStore.load_due_view, self._due_view, DUE_VIEWS[self._due_view]
+        self.db.submit(fn, arg, callback=partial(self._show_filtered, self._filter_seq, label))
+
+    @profiled
+    def _show_filtered(self, seq, label, result):
+        if seq != self._filter_seq:
+            return  # 已有更新的输入或视图切换
+        index, matched, truncated = result
+        self._filter_view = (label, index, matched, truncated)
+        self._render_filtered()
+
+    def _render_filtered(self):
+        label, index, matched, truncated = self._filter_view
+
+        def mark_matches():
+            for task_id in matched:
+                self._set_tag(str(task_id), "match", True)
+
+        # 筛选结果只在内存中（手动顺序），按当前排序重排后显示，不分页；全部插入后再标记命中的任务
+        self._fill_tree(sort_index(index, self._sort), (), then=mark_matches, paged=False)
+        if truncated:
+            self._set_headings(f"{label}超过 {len(matched)} 个，只显示前 {len(matched)} 个")
+        else:
+            self._set_headings(f"{label} {len(matched)} 个")
+
+    def _load_unloaded_children(self, item_id):
+        """展开懒加载节点时，后台读取其子任务，读完后替换占位子节点"""
+        if item_id not in self._unloaded_items:
+            return
+        self._unloaded_items.discard(item_id)
+        self.db.submit(TaskStore.load_visible_page, int(item_id), 0, PAGE_SIZE,
+                       callback=partial(self._fill_children, item_id))
+
+    @profiled
+    def _fill_children(self, item_id, result):
+        if not self.tree.exists(item_id) or item_id in self._unloaded_items:
+            return  # 读取期间整树已重载
+        index, unloaded, hidden = result
+        self.renderer.finish()
+        for child in self.tree.get_children(item_id):
+            self.updater.remove(child)  # 占位节点，以及读取期间增量插入的节点（结果中已包含）
+        self.renderer.render(index, unloaded, int(item_id), hidden)
+
+    def _show_more(self, more_item):
+        """读取“显示更多”节点所在父节点的下一页子任务"""
+        if more_item in self._paging_items:
+            return
+        self._paging_items.add(more_item)
+        tree_parent = self.tree.parent(more_item)
+        offset = len(self.tree.get_children(tree_parent)) - 1  # 已显示的是完整列表的前缀
+        self.tree.item(more_item, text="加载中…")
+        self.db.submit(TaskStore.load_visible_page, int(tree_parent) if tree_parent else None, offset, PAGE_SIZE,
+                       callback=partial(self._fill_page, more_item, offset))
+
+    @profiled
+    def _fill_page(self, more_item, offset, result):
+        if more_item not in self._paging_items or not self.tree.exists(more_item):
+            return  # 读取期间整树已重载
+        self._paging_items.discard(more_item)
+        self.renderer.finish()
+        tree_parent = self.tree.parent(more_item)
+        if len(self.tree.get_children(tree_parent)) - 1 != offset:
+            self._show_more(more_item)  # 读取期间增删了已显示的任务，按新的位置重读
+            return
+        index, unloaded, hidden = result
+        self.tree.delete(more_item)
+        self.renderer.render(index, unloaded, int(tree_parent) if tree_parent else None, hidden)
+
+    def _submit_update(self, apply, fn, *args):
+        """后台执行修改，完成后用 apply(result) 增量更新 Treeview"""
+        self.db.submit(fn, *args, callback=partial(self._update_tree, apply))
+
+    @profiled
+    def _update_tree(self, apply, *args):
+        """增量更新 Treeview；与数据库状态对不上时回退为整树重载"""
+        if self._filtered:
+            self.load_tree()  # 修改可能让任务进入或离开筛选结果，直接重新筛选
+            return
+        self.renderer.finish()  # 先插完读取结果的剩余部分，增量更新才有准确的位置
         try:
-            self.conn.execute("ALTER TABLE tasks ADD COLUMN expanded INTEGER DEFAULT 1")
-            self.conn.commit()
-        except sqlite3.OperationalError:
-            pass  # 字段已存在
-        # 若旧表中没有 finish_time 字段，尝试添加（避免报错）
+            apply(*args)
+        except (TreeOutOfSync, tk.TclError):
+            self.load_tree()
+            return
+        self._refresh_view_counts()
+        # 子树汇总只在祖先链上变化，只刷新这些节点
+        self.db.submit(TaskStore.take_rollup_changes, callback=self._apply_rollups)
+
+    # ---- 其他实例 / 命令行脚本的修改 ----
+    def _schedule_sync(self):
+        self._sync_after = self.root.after(SYNC_MS, self._sync)
+
+    def _sync(self):
+        # 上一次结果回来后才安排下一次，轮询不会堆积；偶发错误（如数据库被锁）留到下次重试
+        self.db.submit(TaskStore.external_changes, quiet=True, callback=self._on_external_changes,
+                       errback=lambda error: self._schedule_sync())
+
+    def _on_external_changes(self, changes):
         try:
-            self.conn.execute("ALTER TABLE tasks ADD COLUMN finish_time TEXT")
-            self.conn.commit()
-        except sqlite3.OperationalError:
-            pass  # 字段已存在
+            if changes is not None:
+                if changes.reload:
+                    self.load_tree()
+                else:
+                    self._update_tree(self._apply_external, changes)
+        finally:
+            self._schedule_sync()  # 应用变化出错时也继续同步
+
+    @profiled
+    def _apply_external(self, changes):
+        """只应用变化的任务：删除的移除；其余按父节点由上到下逐层放置，父节点不在树中的（折叠未加载的分支内）移除。
+        只有子树的根在变化中时（从未加载的分支移来），根节点挂占位子节点或读取子任务；
+        逐层放完后才检查，整棵子树都在变化中时（撤销删除）直接放入，不再重新读取"""
+        for task_id in changes.removed:
+            self.updater.remove(task_id)
+        pending = changes.placements
+        while pending:
+            ready, waiting = [], []
+            for placement in pending:
+                parent_id = placement[0].parent_id
+                (ready if parent_id is None or self.tree.exists(str(parent_id)) else waiting).append(placement)
+            if not ready:
+                break
+            self.updater.place_many(ready, settle=False)
+            pending = waiting
+        for task, _ in pending:
+            self.updater.remove(task.id)
+        self.updater.settle()
+
+    @profiled
+    def _apply_rollups(self, tasks):
+        for task in tasks:
+            if self.tree.exists(str(task.id)):
+                self.updater.refresh_item(task)
+
+    # ---- 撤销 / 重做：按日志恢复涉及的任务，只增量更新这些节点 ----
+    def undo(self):
+        self._submit_replay(TaskStore.undo)
+
+    def redo(self):
+        self._submit_replay(TaskStore.redo)
+
+    def _submit_replay(self, fn):
+        # 只撤销本窗口的修改；其他窗口 / 脚本之后改过相同的任务时提示，不覆盖它们的修改
+        self.db.submit(fn, callback=partial(self._update_tree, self._apply_replay),
+                       errback=lambda error: messagebox.showwarning("无法撤销 / 重做", str(error)))
+
+    def _apply_replay(self, changes):
+        if changes is None:
+            self.root.bell()  # 没有可撤销 / 重做的修改
+        elif changes.reload:
+            self.load_tree()
+        else:
+            self._apply_external(changes)
 
-    def load_tree(self):
-        self.tree.delete(*self.tree.get_children())
-        self._completed_items.clear()
-        self._load_children(None, "")
-
-    def _load_children(self, parent_id, tree_parent):
-        query = """
-                SELECT id, name, due_date,finish_time, completed,expanded
-                FROM tasks
-                WHERE parent_id IS NULL
-                ORDER BY sort_order
-                """ if parent_id is None else """
-                SELECT id, name, due_date,finish_time, completed,expanded
-                FROM tasks
-                WHERE parent_id = ? 
-                ORDER BY sort_order
-                """
-        cursor = self.conn.execute(query, () if parent_id is None else (parent_id,))
-        tasks = cursor.fetchall()
-
-        tasks.sort(key=lambda t: t[4])  # 根据是否完成排序
-
-        for task_id, name, due, finish, completed, expanded in tasks:
-            item_id = self.tree.insert(
-                tree_parent,
-                "end",
-                iid=str(task_id),
-                text=name,
-                values=(due or '', finish or '')
-            )
-            if completed:
-                self.tree.item(item_id, tags=("completed",))
-                self._completed_items.add(item_id)  # 记录
-            self.tree.item(item_id, open=bool(expanded))  # <---- 恢复展开状态
-            # ✅ 修复关键：递归加载子任务
-            self._load_children(task_id, item_id)
+    def backup_now(self):
+        self._wait_backup(self.backups.request())
 
-        self.tree.tag_configure("completed", foreground="gray")
+    def _wait_backup(self, future):
+        # 备份在后台线程中进行，这里只轮询结果
+        if not future.done():
+            self.root.after(200, self._wait_backup, future)
+            return
+        if future.exception() is not None:
+            messagebox.showerror("备份失败", str(future.exception()))
+        else:
+            messagebox.showinfo("备份完成", f"已保存到 {future.result()}")
+
+    def _apply_placement(self, placement):
+        task, position = placement
+        if task is not None:
+            self.updater.place(task, position)
+
+    def _apply_batch_toggle(self, result):
+        placements, subtree = result
+        self.updater.place_many(placements)
+        self.updater.sync_subtree(subtree)
 
+    def _apply_removals(self, task_ids):
+        for task_id in task_ids:
+            self.updater.remove(task_id)
+
+    def _selected_ids(self):
+        return [int(item) for item in self.tree.selection() if not is_placeholder(item)]
+
+    def _describe(self, task_ids):
+        if len(task_ids) == 1:
+            return f"任务 '{self.tree.item(task_ids[0], 'text')}'"
+        return f"选中的 {len(task_ids)} 个任务"
 
     def add_parent_task(self):
         self.open_task_dialog(title="添加父任务", parent_id=None)
@@ -157,14 +543,21 @@ class TaskTreeApp:
         parent_id = int(selected[0])
         self.open_task_dialog(title="添加子任务", parent_id=parent_id)
 
+    def add_sibling_task(self):
+        selected = self.tree.selection()
+        if not selected:
+            return
+        self.open_task_dialog(title="添加同级任务", after_id=int(selected[0]))
+
     def edit_task(self):
         selected = self.tree.selection()
         if not selected:
             return
-        task_id = int(selected[0])
-        row = self.conn.execute("SELECT name, due_date,finish_time FROM tasks WHERE id = ?", (task_id,)).fetchone()
-        if row:
-            name, due,finish = row
+        self.db.submit(TaskStore.get_task, int(selected[0]), callback=self._open_edit_dialog)
+
+    def _open_edit_dialog(self, task):
+        if task:
+            task_id, name, due, finish = task.id, task.name, task.due_date, task.finish_time
             due_date = datetime.strptime(due, "%Y-%m-%d").date() if due else None
             finish_date = None
             if finish:
@@ -175,38 +568,29 @@ class TaskTreeApp:
             self.open_task_dialog(title="修改任务", task_id=task_id, name=name, due_date=due_date,finish_date=finish_date)
 
     def delete_task(self):
-        selected = self.tree.selection()
-        if not selected:
+        task_ids = self._selected_ids()
+        if not task_ids:
             return
-        task_id = int(selected[0])
-        if messagebox.askyesno("确认删除", "是否删除该任务及其所有子任务？"):
-            self._delete_recursive(task_id)
-            self.conn.commit()
-            self.load_tree()
+        if messagebox.askyesno("确认删除", f"是否删除{self._describe(task_ids)}及其所有子任务？"):
+            # 整批在一个事务内删除，界面只更新一次
+            self._submit_update(self._apply_removals, TaskStore.delete_tasks, task_ids)
 
     def set_as_root_task(self):
-        selected = self.tree.selection()
-        if not selected:
+        task_ids = self._selected_ids()
+        if not task_ids:
             return
-        task_id = int(selected[0])
         # 更新数据库，将 parent_id 设为 NULL
-        self.conn.execute("UPDATE tasks SET parent_id = NULL WHERE id = ?", (task_id,))
-        self.conn.commit()
-        self.load_tree()
-
-    def _delete_recursive(self, task_id):
-        cursor = self.conn.execute("SELECT id FROM tasks WHERE parent_id = ?", (task_id,))
-        for row in cursor.fetchall():
-            self._delete_recursive(row[0])
-        self.conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+        self._submit_update(self.updater.place_many, TaskStore.move_tasks, task_ids, None)
 
     def show_context_menu(self, event):
         selected = self.tree.identify_row(event.y)
-        if selected:
-            self.tree.selection_set(selected)
+        if selected and not is_placeholder(selected):
+            if selected not in self.tree.selection():
+                self.tree.selection_set(selected)  # 在已选中的行上右键时保留多选
             self.menu.post(event.x_root, event.y_root)
 
-    def open_task_dialog(self, title, parent_id=None, task_id=None, name="", due_date=None,finish_date=None):
+    @profiled
+    def open_task_dialog(self, title, parent_id=None, task_id=None, name="", due_date=None,finish_date=None, after_id=None):
         def on_save(new_name, new_due, new_finish):
             # =============== 日期格式验证 =================
             if new_due:
@@ -225,20 +609,117 @@ class TaskTreeApp:
                     finish_date = None
             # =============================================
             if task_id:  # 编辑
-                self.conn.execute("UPDATE tasks SET name = ?, due_date = ? , finish_time = ?  WHERE id = ?", (new_name, new_due,new_finish, task_id))
+                self._submit_update(self._apply_placement, TaskStore.update_task, task_id, new_name, new_due,
+                                    new_finish)
             else:  # 添加
-                cursor = self.conn.execute(
-                    "SELECT MAX(sort_order) FROM tasks WHERE parent_id IS ?", (parent_id,))
-                max_order = cursor.fetchone()[0] or 0
-                new_order = max_order + 1
-                self.conn.execute("INSERT INTO tasks (name, due_date,finish_time, parent_id,sort_order) VALUES (?, ?, ?,?,?)",
-                                  (new_name, new_due,new_finish, parent_id, new_order))
-            self.conn.commit()
-            self.load_tree()
+                self._submit_update(self._apply_placement, TaskStore.add_task, parent_id, new_name, new_due, new_finish,
+                                    after_id)
+
+        self._editor_dialog().show(title=title, name=name, due_date=due_date,finish_time=finish_date, callback=on_save)
+
+    def _editor_dialog(self):
+        """构建一次、之后只隐藏 / 显示的编辑对话框"""
+        if self._editor is None or not self._editor.winfo_exists():
+            self._editor = TaskEditorDialog(self.root)
+        return self._editor
+
+    # ---- 原地重命名：双击名称或按 F2，不打开对话框 ----
+    def on_double_click(self, event):
+        item = self.tree.identify_row(event.y)
+        if not item or is_placeholder(item):
+            return
+        if self.tree.identify_column(event.x) == "#0":
+            self.start_rename(item)
+        else:
+            self.tree.selection_set(item)
+            self.edit_task()  # 双击日期等列打开完整的编辑对话框
+        return "break"  # 不让双击同时展开 / 折叠节点
+
+    def start_rename(self, item=None):
+        item = item or next(iter(self.tree.selection()), None)
+        if not item or is_placeholder(item):
+            return
+        self.finish_rename(save=True)
+        self.tree.see(item)
+        bbox = self.tree.bbox(item, "#0")
+        if not bbox:
+            return
+        x, y, width, height = bbox
+        depth = 0
+        parent = self.tree.parent(item)
+        while parent:
+            depth += 1
+            parent = self.tree.parent(parent)
+        indent = (depth + 1) * 20  # 跳过缩进和展开箭头
+        entry = tk.Entry(self.tree)
+        entry.insert(0, self.tree.item(item, "text"))
+        entry.select_range(0, "end")
+        entry.place(x=x + indent, y=y, width=max(width - indent, 80), height=height)
+        entry.focus_set()
+        entry.bind("<Return>", lambda event: self.finish_rename(save=True))
+        entry.bind("<KP_Enter>", lambda event: self.finish_rename(save=True))
+        entry.bind("<Escape>", lambda event: self.finish_rename(save=False))
+        entry.bind("<FocusOut>", lambda event: self.finish_rename(save=True))
+        self._rename_entry = (entry, item)
+
+    def finish_rename(self, save):
+        if self._rename_entry is None:
+            return
+        entry, item = self._rename_entry
+        self._rename_entry = None
+        name = entry.get().strip()
+        entry.destroy()
+        self.tree.focus_set()
+        if save and name and self.tree.exists(item) and name != self.tree.item(item, "text"):
+            self.tree.item(item, text=name)  # 先显示新名称，写入在后台完成
+            self._submit_update(self._apply_placement, TaskStore.rename_task, int(item), name)
+
+    def import_tasks(self):
+        path = filedialog.askopenfilename(title="导入任务", filetypes=TRANSFER_FILETYPES)
+        if path:
+            self.db.submit(TaskStore.import_tasks, path, callback=self._on_imported,
+                           errback=lambda error: messagebox.showerror("导入失败", str(error)))
+
+    def _on_imported(self, count):
+        self.load_tree()  # 导入结束后只刷新一次
+        messagebox.showinfo("导入完成", f"已导入 {count} 个任务")
+
+    def export_tasks(self):
+        path = filedialog.asksaveasfilename(title="导出任务", defaultextension=".jsonl", filetypes=TRANSFER_FILETYPES)
+        if path:
+            self.db.submit(TaskStore.export_tasks, path,
+                           callback=lambda count: messagebox.showinfo("导出完成", f"已导出 {count} 个任务"))
+
+    def archive_completed(self):
+        days = simpledialog.askinteger("归档已完成任务", "归档完成超过多少天的任务（子任务须全部完成）：",
+                                       initialvalue=ARCHIVE_AFTER_DAYS, minvalue=0, parent=self.root)
+        if days is not None:
+            self.db.submit(TaskStore.archive_completed, days, callback=self._on_archived)
+
+    def _on_archived(self, count):
+        self.load_tree()
+        messagebox.showinfo("归档完成", f"已归档 {count} 个任务")
+
+    def open_archive(self):
+        TaskArchiveDialog(self.root, self.db, on_restored=self.load_tree)
 
-        TaskEditorDialog(self.root, title=title, name=name, due_date=due_date,finish_time=finish_date, callback=on_save)
+    def toggle_profiler_window(self):
+        """打开 / 关闭性能统计面板；打开时同时开始记录"""
+        if self._profiler_window is not None and self._profiler_window.winfo_exists():
+            self._profiler_window.close()
+            self._profiler_window = None
+            return
+        PROFILER.enabled = True
+        self._profiler_window = ProfilerWindow(self.root)
 
     def expand_all(self):
+        if self._unloaded_items:
+            # 还有未加载的折叠分支，一次性读取整棵树后再展开
+            self.load_tree(lazy=False, then=self._expand_all_items)
+        else:
+            self._expand_all_items()
+
+    def _expand_all_items(self):
         for item in self.tree.get_children():
             self._expand_recursive(item)
 
@@ -260,155 +741,165 @@ class TaskTreeApp:
 
 
     def toggle_task_completed(self):
-        selected = self.tree.selection()
-        if not selected:
+        task_ids = self._selected_ids()
+        if not task_ids:
             return
-        task_id = int(selected[0])
-        current = self.conn.execute("SELECT completed FROM tasks WHERE id = ?", (task_id,)).fetchone()
-        if current is not None:
-            new_status = 0 if current[0] else 1
-            self._set_task_completed_recursive(task_id, new_status)
-            self.conn.commit()
-            self.load_tree()
-
-    def _set_task_completed_recursive(self, task_id, status):
-        self.conn.execute("UPDATE tasks SET completed = ? WHERE id = ?", (status, task_id))
-        cursor = self.conn.execute("SELECT id FROM tasks WHERE parent_id = ?", (task_id,))
-        for row in cursor.fetchall():
-            self._set_task_completed_recursive(row[0], status)
+        self._submit_update(self._apply_batch_toggle, TaskStore.toggle_completed_many, task_ids)
 
+    @profiled
     def on_drag_start(self, event):
         self._press_time = time.time()
         self._press_coords = (event.x, event.y)
         item = self.tree.identify_row(event.y)
-        if item:
+        if item and is_more(item):
+            self._show_more(item)
+        elif item and not is_placeholder(item):
             self._dragging_item = item
+            # 此时 Treeview 自身的点击处理还没有改动选择
+            selected = self._selected_ids()
+            self._dragging_ids = selected if item in self.tree.selection() else [int(item)]
 
+    @profiled
     def on_drag_motion(self, event):
         if not self._dragging_item:
             return
 
         # 找到鼠标当前位置下的 item
         hover_item = self.tree.identify_row(event.y)
+        hover_tag = "hover" if hover_item and self._drop_zone(hover_item, event.y) == "into" else "hover_edge"
 
-        # 如果悬浮在新的目标上
-        if hover_item != self._hover_target_item:
+        # 如果悬浮在新的目标上，或在同一目标上换了放置区域
+        if hover_item != self._hover_target_item or hover_tag != self._hover_tag:
             # 清除旧目标的高亮
             if self._hover_target_item:
-                self.tree.item(self._hover_target_item, tags=())
+                self._set_tag(self._hover_target_item, self._hover_tag, False)
 
             # 设置新目标高亮（但不包括拖动源自己）
-            if hover_item and hover_item != self._dragging_item:
-                self.tree.item(hover_item, tags=("hover",))
+            if hover_item and hover_item != self._dragging_item and not is_placeholder(hover_item):
+                self._set_tag(hover_item, hover_tag, True)
                 self._hover_target_item = hover_item
+                self._hover_tag = hover_tag
             else:
                 self._hover_target_item = None
 
+    def _drop_zone(self, item, y):
+        """按鼠标在行内的纵向位置判断放置方式：上 1/4 为 before，下 1/4 为 after，中间为 into"""
+        bbox = self.tree.bbox(item)
+        if not bbox:
+            return "into"
+        offset = (y - bbox[1]) / bbox[3]
+        if offset < 0.25:
+            return "before"
+        if offset > 0.75:
+            return "after"
+        return "into"
+
+    def _set_tag(self, item, tag, on):
+        # 只增删指定标签，保留 completed 等其他标签
+        if not self.tree.exists(item):
+            return
+        tags = tuple(t for t in self.tree.item(item, "tags") if t != tag)
+        self.tree.item(item, tags=tags + (tag,) if on else tags)
+
+    @profiled
     def on_drag_drop(self, event):
         if not self._dragging_item:
             return
 
         target_item = self.tree.identify_row(event.y)
-        if target_item and target_item != self._dragging_item:
-            dragged_id = int(self._dragging_item)
+        dragged_ids = self._dragging_ids
+        if target_item and int(target_item) not in dragged_ids:
             target_id = int(target_item)
 
             # 防止拖动到自己的子节点中，造成递归死循环
-            if self._is_descendant(dragged_id, target_id):
-                messagebox.showwarning("无效操作", "不能将任务拖动到其子任务下")
-            else:
-                # 弹出确认框
-                confirm = messagebox.askyesno(
-                    "确认操作",
-                    f"是否将任务 '{self.tree.item(dragged_id, 'text')}' 移动到 '{self.tree.item(target_id, 'text')}' 下？"
-                )
-
-                if confirm:
-                    # 更新数据库
-                    self.conn.execute("UPDATE tasks SET parent_id = ? WHERE id = ?", (target_id, dragged_id))
-                    self.conn.commit()
-                    self.load_tree()
+            self.db.submit(TaskStore.is_descendant_of_any, dragged_ids, target_id,
+                           callback=partial(self._confirm_move, dragged_ids, target_id))
 
         self._dragging_item = None
         self._dragging_target = None
 
-    def _is_descendant(self, parent_id, possible_child_id):
-        # 避免任务拖动到自己的后代节点下
-        cursor = self.conn.execute("SELECT id FROM tasks WHERE parent_id = ?", (parent_id,))
-        for row in cursor.fetchall():
-            child_id = row[0]
-            if child_id == possible_child_id:
-                return True
-            elif self._is_descendant(child_id, possible_child_id):
-                return True
-        return False
+    def _confirm_move(self, dragged_ids, target_id, target_is_descendant):
+        if target_is_descendant:
+            messagebox.showwarning("无效操作", "不能将任务拖动到其子任务下")
+            return
+        if not (all(self.tree.exists(task_id) for task_id in dragged_ids) and self.tree.exists(target_id)):
+            return  # 等待结果期间节点已被删除
+        # 弹出确认框
+        confirm = messagebox.askyesno(
+            "确认操作",
+            f"是否将{self._describe(dragged_ids)}移动到 '{self.tree.item(target_id, 'text')}' 下？"
+        )
+
+        if confirm:
+            # 更新数据库
+            self.db.submit(TaskStore.move_tasks, dragged_ids, target_id,
+                           callback=partial(self._update_tree, self.updater.place_many),
+                           errback=lambda error: messagebox.showwarning("无效操作", str(error)))
 
 
+    @profiled
     def on_drag_drop_sort(self, event):
         if not self._dragging_item:
             return
         # 清除悬浮高亮
         if self._hover_target_item:
-            self.tree.item(self._hover_target_item, tags=())
+            self._set_tag(self._hover_target_item, self._hover_tag, False)
             self._hover_target_item = None
 
         target_item = self.tree.identify_row(event.y)
-        if not target_item or target_item == self._dragging_item:
+        if (not target_item or is_placeholder(target_item) or target_item == self._dragging_item
+                or int(target_item) in self._dragging_ids):
             self._dragging_item = None
             return
 
-        drag_id = int(self._dragging_item)
+        dragged_ids = self._dragging_ids
         target_id = int(target_item)
 
-        # 确保是同一父级
-        drag_parent = self.conn.execute("SELECT parent_id FROM tasks WHERE id = ?", (drag_id,)).fetchone()[0]
-        target_parent = self.conn.execute("SELECT parent_id FROM tasks WHERE id = ?", (target_id,)).fetchone()[0]
-        if drag_parent != target_parent:
-            # messagebox.showwarning("跨层级拖动无效", "只能在同一层级排序。")
-            # self._dragging_item = None
-            # return
+        # 放到行中间：成为目标的子任务
+        zone = self._drop_zone(target_item, event.y)
+        if zone == "into":
             self.on_drag_drop(event)
             self._dragging_item = None
             return
-        # 弹出确认框
+        if self._sort.column is not None:
+            messagebox.showinfo("按列排序中", "按列排序时不能手动调整顺序，再次点击列标题恢复手动顺序后再拖动")
+            self._dragging_item = None
+            return
+        # 放到行的上 / 下边缘：移到目标之前 / 之后（可跨层级），每个任务只更新一行
         confirm = messagebox.askyesno(
             "确认排序",
-            f"是否将任务顺序互换？\n\n任务 1: {self.tree.item(drag_id, 'text')}\n任务 2: {self.tree.item(target_id, 'text')}"
+            f"是否将{self._describe(dragged_ids)}移动到 '{self.tree.item(target_id, 'text')}' "
+            f"{'之后' if zone == 'after' else '之前'}？"
         )
-        # 获取两者排序值并交换
-        drag_order = self.conn.execute("SELECT sort_order FROM tasks WHERE id = ?", (drag_id,)).fetchone()[0]
-        target_order = self.conn.execute("SELECT sort_order FROM tasks WHERE id = ?", (target_id,)).fetchone()[0]
         if confirm:
-            self.conn.execute("UPDATE tasks SET sort_order = ? WHERE id = ?", (target_order, drag_id))
-            self.conn.execute("UPDATE tasks SET sort_order = ? WHERE id = ?", (drag_order, target_id))
-            self.conn.commit()
-            self.load_tree()
+            self.db.submit(TaskStore.move_tasks_beside, dragged_ids, target_id, zone == "after",
+                           callback=partial(self._update_tree, self.updater.place_many),
+                           errback=lambda error: messagebox.showwarning("无效操作", str(error)))
         self._dragging_item = None
 
     def _record_expanded_state(self):
         def record_recursive(item_id):
-            task_id = int(item_id)
-            is_open = int(self.tree.item(item_id, "open"))
-            self.conn.execute("UPDATE tasks SET expanded = ? WHERE id = ?", (is_open, task_id))
+            if is_placeholder(item_id):
+                return
+            self.expanded_buffer.mark(int(item_id), int(self.tree.item(item_id, "open")))
             for child in self.tree.get_children(item_id):
                 record_recursive(child)
 
         for top_item in self.tree.get_children():
             record_recursive(top_item)
 
-        self.conn.commit()
+        self.expanded_buffer.flush()
 
     def on_tree_open(self, event):
         item_id = self.tree.focus()
-        if item_id:
-            self.conn.execute("UPDATE tasks SET expanded = 1 WHERE id = ?", (int(item_id),))
-            self.conn.commit()
+        if item_id and not self._filtered:  # 筛选结果全部展开显示，不记录
+            self.expanded_buffer.mark(int(item_id), 1)
+            self._load_unloaded_children(item_id)
 
     def on_tree_close(self, event):
         item_id = self.tree.focus()
-        if item_id:
-            self.conn.execute("UPDATE tasks SET expanded = 0 WHERE id = ?", (int(item_id),))
-            self.conn.commit()
+        if item_id and not self._filtered:
+            self.expanded_buffer.mark(int(item_id), 0)
 
 
 
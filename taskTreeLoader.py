@@ -0,0 +1,207 @@
+import json
+from collections import defaultdict, namedtuple
+
+from taskSorting import MANUAL, order_by
+
+# 一行任务数据（与 LOAD_ALL_SQL 的列顺序一致）；sub_* 为子树汇总，见 taskRollups.py
+TASK_FIELDS = ["id", "parent_id", "name", "due_date", "finish_time", "completed", "expanded",
+               "sub_total", "sub_done", "sub_due"]
+
+TaskRow = namedtuple("TaskRow", TASK_FIELDS)
+
+TASK_COLUMNS = ", ".join(TASK_FIELDS)
+
+# 以下查询中的 {order} 为同级显示顺序（见 taskSorting.order_by），默认未完成在前、再按 sort_order
+
+# 单次查询读取整张表
+LOAD_ALL_SQL = f"""
+    SELECT {TASK_COLUMNS}
+    FROM tasks
+    ORDER BY {{order}}
+"""
+
+# 懒加载：从 parent_id 的子节点出发逐层向下，只展开已展开的节点；
+# 折叠且有子任务（sub_total > 0）的节点标记为未加载，界面上放一个占位子节点。
+# 起点可以只取 parent_id 的一页子节点（LIMIT -1 为不限），子任务很多时不必读出整个列表
+LOAD_PAGE_SQL = f"""
+    SELECT {TASK_COLUMNS} FROM tasks WHERE parent_id IS ?
+    ORDER BY {{order}} LIMIT ? OFFSET ?
+"""
+
+# 下一层：JSON 数组中每个父节点的前 ? 个子任务，按父节点在数组中的顺序、再按同级显示顺序排列；
+# {child_order} / {task_order} 为分别带 c. / t. 前缀的 {order}
+LOAD_LEVEL_SQL = f"""
+    SELECT {", ".join("t." + field for field in TASK_FIELDS)}
+    FROM json_each(?) p JOIN tasks t ON t.id IN (
+        SELECT c.id FROM tasks c WHERE c.parent_id = p.value
+        ORDER BY {{child_order}} LIMIT ?
+    )
+    ORDER BY p.key, {{task_order}}
+"""
+
+# 分页读取时一次大约读出的任务数（最后一个父节点的子任务可略微超出）；首屏只需要其中一小部分
+VISIBLE_BUDGET = 1000
+
+LOAD_TASK_SQL = f"SELECT {TASK_COLUMNS} FROM tasks WHERE id = ?"
+
+# 任务在同级中的显示位置 = 排在它前面的兄弟数量；手动顺序下是 idx_tasks_parent_order 上的一段计数
+POSITION_SQL = """
+    SELECT COUNT(*)
+    FROM tasks t, tasks s
+    WHERE t.id = ?
+      AND s.parent_id IS t.parent_id
+      AND (s.completed, s.sort_order, s.id) < (t.completed, t.sort_order, t.id)
+"""
+
+# 按列排序时（升降序、空值在后）无法写成一个行值比较，改为给这一级兄弟编号
+SORTED_POSITION_SQL = """
+    SELECT position FROM (
+        SELECT id, ROW_NUMBER() OVER (ORDER BY {order}) - 1 AS position
+        FROM tasks
+        WHERE parent_id IS (SELECT parent_id FROM tasks WHERE id = ?1)
+    )
+    WHERE id = ?1
+"""
+
+LOAD_SUBTREE_SQL = f"""
+    WITH RECURSIVE subtree(id) AS (
+        SELECT id FROM tasks WHERE parent_id = ?
+        UNION ALL
+        SELECT t.id FROM tasks t JOIN subtree s ON t.parent_id = s.id
+    )
+    SELECT {TASK_COLUMNS}
+    FROM tasks
+    WHERE id IN subtree
+    ORDER BY {{order}}
+"""
+
+
+def load_children_index(conn, sort=MANUAL):
+    """一次查询构建 parent_id -> [TaskRow] 的内存索引，列表已按显示顺序排好"""
+    index = defaultdict(list)
+    for row in conn.execute(LOAD_ALL_SQL.format(order=order_by(sort))):
+        task = TaskRow._make(row)
+        index[task.parent_id].append(task)
+    return index
+
+
+def load_visible_index(conn, parent_id=None, offset=0, limit=-1, sort=MANUAL, budget=VISIBLE_BUDGET):
+    """只读取 parent_id 之下当前可见的部分，返回 (子节点索引, 子任务尚未加载的任务 id 集合)；
+    offset / limit 限定 parent_id 的直接子节点（按显示顺序）。
+
+    limit 为 -1 时读出全部可见部分。否则分页读取：更深的每个父节点最多读 limit + 1 个子任务
+    （多出的一个让界面显示“显示更多”），读满约 budget 个任务后，还没读的展开节点也记为未加载，
+    由界面随后逐个读取。
+    """
+    index = defaultdict(list)
+    unloaded = set()
+    paged = limit >= 0
+    per_parent = limit + 1 if paged else -1
+    remaining = budget
+    level_sql = LOAD_LEVEL_SQL.format(child_order=order_by(sort, "c."), task_order=order_by(sort, "t."))
+    level = [TaskRow._make(row) for row in conn.execute(
+        LOAD_PAGE_SQL.format(order=order_by(sort)), (parent_id, limit, offset))]
+    while level:
+        expanded = []
+        for task in level:
+            index[task.parent_id].append(task)
+            if task.sub_total and task.expanded:
+                expanded.append(task)
+            elif task.sub_total:
+                unloaded.add(task.id)
+        remaining -= len(level)
+        parents = [task.id for task in expanded]
+        if paged:
+            # 一个父节点的子任务不超过 min(sub_total, per_parent) 个；按这个上限只取读得完 remaining 的前几个
+            parents, bound = [], 0
+            for task in expanded:
+                if bound >= remaining:
+                    break
+                parents.append(task.id)
+                bound += min(task.sub_total, per_parent)
+            unloaded.update(task.id for task in expanded[len(parents):])
+        if not parents:
+            break
+        level = [TaskRow._make(row) for row in conn.execute(level_sql, (json.dumps(parents), per_parent))]
+    return index, unloaded
+
+
+def load_task(conn, task_id):
+    row = conn.execute(LOAD_TASK_SQL, (task_id,)).fetchone()
+    return TaskRow._make(row) if row else None
+
+
+def load_placement(conn, task_id, sort=MANUAL):
+    """读取任务及其在同级中的位置，返回 (TaskRow, position)；任务不存在时返回 (None, None)"""
+    task = load_task(conn, task_id)
+    if task is None:
+        return None, None
+    sql = POSITION_SQL if sort.column is None else SORTED_POSITION_SQL.format(order=order_by(sort))
+    position = conn.execute(sql, (task_id,)).fetchone()[0]
+    return task, position
+
+
+def load_subtree_index(conn, task_id, sort=MANUAL):
+    """读取 task_id 的全部后代（不含自身），格式同 load_children_index"""
+    index = defaultdict(list)
+    for row in conn.execute(LOAD_SUBTREE_SQL.format(order=order_by(sort)), (task_id,)):
+        task = TaskRow._make(row)
+        index[task.parent_id].append(task)
+    return index
+
+
+def item_tags(task):
+    return ("completed",) if task.completed else ()
+
+
+def progress_text(task):
+    """子树完成进度，如 "3/10 30%"；没有子任务时为空"""
+    if not task.sub_total:
+        return ''
+    return f"{task.sub_done}/{task.sub_total} {task.sub_done * 100 // task.sub_total}%"
+
+
+def item_values(task):
+    return task.due_date or '', task.finish_time or '', progress_text(task), task.sub_due or ''
+
+
+def insert_task_item(tree, tree_parent, position, task, completed_items):
+    """在 Treeview 中插入一个任务节点（标签、展开状态一次设置）"""
+    item_id = tree.insert(
+        tree_parent,
+        position,
+        iid=str(task.id),
+        text=task.name,
+        values=item_values(task),
+        tags=item_tags(task),
+        open=bool(task.expanded),
+    )
+    if task.completed:
+        completed_items.add(item_id)
+    return item_id
+
+
+def placeholder_iid(item_id):
+    return f"{item_id}:placeholder"
+
+
+def more_iid(tree_parent):
+    """父节点下“显示更多”节点的 iid；根任务的 tree_parent 为空字符串"""
+    return f"{tree_parent}:more"
+
+
+def is_more(item_id):
+    return item_id.endswith(":more")
+
+
+def is_placeholder(item_id):
+    """占位子节点和“显示更多”节点都不是任务"""
+    return item_id.endswith((":placeholder", ":more"))
+
+
+def add_placeholder(tree, item_id, unloaded_items):
+    """给子任务尚未加载的节点挂一个占位子节点，使其显示展开箭头"""
+    if not tree.exists(placeholder_iid(item_id)):
+        tree.insert(item_id, "end", iid=placeholder_iid(item_id), text="加载中…")
+    unloaded_items.add(item_id)
+
@@ -0,0 +1,102 @@
+import time
+
+from taskProfiler import profiled
+from taskTreeLoader import add_placeholder, insert_task_item, more_iid
+
+PAGE_SIZE = 500  # 每个父节点一次最多显示的子任务数，其余收进“显示更多”节点
+SLICE_MS = 15  # 每个时间片最多占用界面线程的毫秒数
+
+
+class ProgressiveRenderer:
+    """分时间片把内存索引插入 Treeview，插入大量任务时窗口不会卡住。
+
+    按显示顺序（先序）插入，第一个时间片在调用 render 时同步执行，首屏立即可见；
+    其余时间片用 after 排队，中间让出界面线程处理事件和重绘。
+    子任务超过 page_size 的父节点只显示前 page_size 个，末尾挂一个“显示更多”节点，
+    由界面按需读取下一页（见 TaskStore.load_visible_page）。
+    展开着、但这次没有读到子任务的节点（超出读取预算）插入后调用 load_children(item_id) 随后读取。
+    """
+
+    def __init__(self, tree, completed_items, unloaded_items, page_size=PAGE_SIZE, slice_ms=SLICE_MS,
+                 load_children=None):
+        self.tree = tree
+        self.page_size = page_size
+        self.slice_ms = slice_ms
+        self._completed_items = completed_items
+        self._unloaded_items = unloaded_items
+        self._load_children = load_children
+        # 待插入的帧：[索引, 未加载集合, 是否分页, tree_parent, 任务列表, 下一个下标, 隐藏的任务数]
+        self._stack = []
+        self._after_id = None
+        self._on_done = []
+
+    @property
+    def busy(self):
+        return bool(self._stack)
+
+    def render(self, index, unloaded=(), parent_id=None, hidden=0, paged=True, then=None):
+        """把 index 中 parent_id 之下的部分插入对应节点末尾；hidden 为这一页之后还未读取的子任务数。
+        paged=False 时不分页（筛选结果只在内存中，没有下一页可读）；全部插入后调用 then()"""
+        tree_parent = "" if parent_id is None else str(parent_id)
+        self._push(index, unloaded, paged, tree_parent, index.get(parent_id, ()), hidden)
+        if then:
+            self._on_done.append(then)
+        if self._after_id is None:
+            self._run_slice()
+
+    def cancel(self):
+        """丢弃尚未插入的部分（整树重载前调用）"""
+        self._stack.clear()
+        self._on_done.clear()
+        if self._after_id is not None:
+            self.tree.after_cancel(self._after_id)
+            self._after_id = None
+
+    def finish(self):
+        """同步插入剩余部分；增量更新前调用，保证 Treeview 与读取结果一致"""
+        if self._after_id is not None:
+            self.tree.after_cancel(self._after_id)
+            self._after_id = None
+        while self._stack:
+            self._step()
+        self._done()
+
+    def _push(self, index, unloaded, paged, tree_parent, tasks, hidden=0):
+        if paged and len(tasks) > self.page_size:
+            hidden += len(tasks) - self.page_size
+            tasks = tasks[:self.page_size]
+        self._stack.append([index, unloaded, paged, tree_parent, tasks, 0, hidden])
+
+    def _step(self):
+        frame = self._stack[-1]
+        index, unloaded, paged, tree_parent, tasks, position, hidden = frame
+        if position == len(tasks):
+            self._stack.pop()
+            if hidden:
+                self.tree.insert(tree_parent, "end", iid=more_iid(tree_parent), text="⋯ 显示更多", tags=("more",))
+            return
+        frame[5] = position + 1
+        task = tasks[position]
+        item_id = insert_task_item(self.tree, tree_parent, "end", task, self._completed_items)
+        if task.id in unloaded:
+            add_placeholder(self.tree, item_id, self._unloaded_items)
+            if task.expanded and self._load_children is not None:
+                self._load_children(item_id)
+        elif task.id in index:
+            self._push(index, unloaded, paged, item_id, index[task.id])  # 先插子任务，保持显示顺序
+
+    @profiled
+    def _run_slice(self):
+        self._after_id = None
+        deadline = time.perf_counter() + self.slice_ms / 1000
+        while self._stack and time.perf_counter() < deadline:
+            self._step()
+        if self._stack:
+            self._after_id = self.tree.after(1, self._run_slice)
+        else:
+            self._done()
+
+    def _done(self):
+        callbacks, self._on_done = self._on_done, []
+        for callback in callbacks:
+            callback()
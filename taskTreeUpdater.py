@@ -0,0 +1,130 @@
+from taskTreeLoader import add_placeholder, insert_task_item, is_placeholder, item_tags, item_values, more_iid
+
+
+class TreeOutOfSync(Exception):
+    """Treeview 与数据库状态对不上（例如父节点不存在），调用方应回退为整树重载"""
+
+
+class TaskTreeUpdater:
+    """把单个任务的增删改移直接应用到 Treeview，避免整树重建（保留滚动位置与选中状态）"""
+
+    def __init__(self, tree, completed_items, unloaded_items, load_children=None):
+        self.tree = tree
+        self._completed_items = completed_items
+        self._unloaded_items = unloaded_items  # 懒加载：子任务尚未读取的节点
+        self._load_children = load_children  # load_children(item_id)：后台读取展开节点的子任务
+        self._inserted = []  # 这一批新插入、有子任务的任务，放置结束后由 settle 检查子树是否齐全
+
+    def refresh_item(self, task):
+        """只更新节点显示内容（名称、日期列、完成标签）"""
+        item_id = str(task.id)
+        self.tree.item(item_id, text=task.name, values=item_values(task), tags=item_tags(task))
+        if task.completed:
+            self._completed_items.add(item_id)
+        else:
+            self._completed_items.discard(item_id)
+
+    def place(self, task, position):
+        """把任务放到父节点下的 position 处：不存在则插入，存在则移动并刷新"""
+        self._place(task, position)
+        self.settle()
+
+    def _place(self, task, position):
+        item_id = str(task.id)
+        tree_parent = "" if task.parent_id is None else str(task.parent_id)
+        if tree_parent and not self.tree.exists(tree_parent):
+            raise TreeOutOfSync(f"父节点 {tree_parent} 不在树中")
+        if tree_parent in self._unloaded_items:
+            # 父节点的子任务还没加载，等展开时再读取
+            self.remove(task.id)
+            return
+        if self.tree.exists(more_iid(tree_parent)) and position >= self._shown_count(tree_parent, item_id):
+            # 落在“显示更多”之后尚未读取的部分：已显示的始终是完整列表的前缀，下一页从这里接着读
+            self.remove(task.id)
+            return
+        if not self.tree.exists(item_id):
+            insert_task_item(self.tree, tree_parent, position, task, self._completed_items)
+            if task.sub_total:
+                self._inserted.append(task)
+            return
+        if self.tree.parent(item_id) != tree_parent or self.tree.index(item_id) != position:
+            self.tree.move(item_id, tree_parent, position)
+        self.refresh_item(task)
+
+    def _shown_count(self, tree_parent, item_id):
+        """分页的父节点下已显示的任务数，不计“显示更多”节点和 item_id 自身"""
+        count = len(self.tree.get_children(tree_parent)) - 1
+        if self.tree.exists(item_id) and self.tree.parent(item_id) == tree_parent:
+            count -= 1
+        return count
+
+    def place_many(self, placements, settle=True):
+        """同时放置多个任务：先全部移到目标父节点末尾，再按最终位置从小到大放回，
+        这样其余节点的相对顺序不受影响，每个 position 都能直接使用。
+        分几批放置同一组变化时传 settle=False，全部放完后再调用 settle"""
+        placements = sorted(placements, key=lambda placement: placement[1])
+        for task, _ in placements:
+            item_id = str(task.id)
+            tree_parent = "" if task.parent_id is None else str(task.parent_id)
+            if self.tree.exists(item_id) and (not tree_parent or self.tree.exists(tree_parent)):
+                self.tree.move(item_id, tree_parent, "end")
+        for task, position in placements:
+            self._place(task, position)
+        if settle:
+            self.settle()
+
+    def sync_children(self, parent_id, tasks):
+        """按 tasks 的顺序重排 parent_id 下的子节点"""
+        for position, task in enumerate(tasks):
+            self._place(task, position)
+        self.settle()
+
+    def sync_subtree(self, index):
+        """按 load_subtree_index 的结果刷新一棵子树中的每个节点及其顺序"""
+        for parent_id, tasks in index.items():
+            tree_parent = str(parent_id)
+            if tree_parent in self._unloaded_items or not self.tree.exists(tree_parent):
+                continue  # 位于尚未加载的折叠分支中
+            for position, task in enumerate(tasks):
+                self._place(task, position)
+        self.settle()
+
+    def settle(self):
+        """检查这一批新插入的任务：子任务没有随同一批全部放进来的（例如从未加载的分支移来、
+        撤销只恢复了子树的根），清掉已放入的部分，改挂占位子节点；展开着的立即读取子任务"""
+        inserted, self._inserted = self._inserted, []
+        complete = set()
+        for task in inserted:  # 按插入顺序，父节点在前
+            item_id = str(task.id)
+            if not self.tree.exists(item_id) or item_id in self._unloaded_items:
+                continue
+            if self.tree.parent(item_id) in complete or self._count_descendants(item_id) == task.sub_total:
+                complete.add(item_id)  # 整棵子树都已放入，其中新插入的节点也都齐全
+                continue
+            for child in self.tree.get_children(item_id):
+                self.remove(child)
+            add_placeholder(self.tree, item_id, self._unloaded_items)
+            if task.expanded and self._load_children is not None:
+                self._load_children(item_id)
+
+    def _count_descendants(self, item_id):
+        count = 0
+        stack = list(self.tree.get_children(item_id))
+        while stack:
+            current = stack.pop()
+            if not is_placeholder(current):
+                count += 1
+                stack.extend(self.tree.get_children(current))
+        return count
+
+    def remove(self, task_id):
+        item_id = str(task_id)
+        if not self.tree.exists(item_id):
+            return
+        stack = [item_id]
+        while stack:
+            current = stack.pop()
+            self._completed_items.discard(current)
+            self._unloaded_items.discard(current)
+            stack.extend(self.tree.get_children(current))
+        self.tree.delete(item_id)
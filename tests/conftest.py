@@ -0,0 +1,17 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# 各模块都在仓库根目录（不是包），测试按模块名直接导入
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from taskStore import TaskStore  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path):
+    """临时目录中的空任务库"""
+    store = TaskStore(str(tmp_path / "task_tree.db"))
+    yield store
+    store.close()
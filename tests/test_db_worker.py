@@ -0,0 +1,67 @@
+# 后台数据库线程：界面线程中的回调出错时，轮询照常继续、忙碌提示照常收起
+import pytest
+
+from dbWorker import DbWorker
+from taskStore import TaskStore
+
+
+class FakeRoot:
+    """只记录 after 安排的回调，由测试手动执行（代替 Tk 主循环）"""
+
+    def __init__(self):
+        self.scheduled = {}
+        self.next_id = 0
+
+    def after(self, ms, func):
+        self.next_id += 1
+        self.scheduled[self.next_id] = func
+        return self.next_id
+
+    def after_cancel(self, after_id):
+        self.scheduled.pop(after_id, None)
+
+    def run_pending(self):
+        scheduled, self.scheduled = self.scheduled, {}
+        for func in scheduled.values():
+            func()
+
+
+@pytest.fixture
+def worker(tmp_path):
+    root = FakeRoot()
+    events = {"busy": [], "errors": []}
+    worker = DbWorker(root, lambda: TaskStore(str(tmp_path / "task_tree.db")),
+                      on_busy=events["busy"].append, on_error=events["errors"].append)
+    yield worker, root, events
+    worker.close()
+
+
+def fail(result):
+    raise RuntimeError("回调出错")
+
+
+def broken(store):
+    raise ValueError("请求出错")
+
+
+def test_failing_callback_does_not_stall_results(worker):
+    worker, root, events = worker
+    results = []
+    first = worker.submit(TaskStore.add_task, None, "a", callback=fail)
+    second = worker.submit(TaskStore.add_task, None, "b", callback=results.append)
+    first.result(), second.result()
+    while worker.pending:
+        root.run_pending()
+    assert [task.name for task, _ in results] == ["b"]
+    assert [str(error) for error in events["errors"]] == ["回调出错"]
+    assert events["busy"] == [True, False]
+
+
+def test_failing_errback_is_reported(worker):
+    worker, root, events = worker
+    future = worker.submit(broken, errback=fail)
+    future.exception()
+    while worker.pending:
+        root.run_pending()
+    assert [str(error) for error in events["errors"]] == ["回调出错"]
+    assert events["busy"] == [True, False]
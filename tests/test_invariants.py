@@ -0,0 +1,294 @@
+# 随机操作任务库，检查数据层的不变量：子树汇总、同级顺序、撤销日志。种子固定，失败时可重现
+import os
+import random
+from collections import defaultdict
+
+import pytest
+
+import taskOrdering
+from taskJournal import UNDO_LEVELS
+from taskRollups import rebuild_all
+from taskStore import TaskStore
+
+SEEDS = [0, 1, 2]
+STEPS = 300  # 每个种子的随机操作数
+
+DATES = [None, "2024-01-05", "2024-03-01", "2023-12-31", "不是日期"]
+IMPORT_MAX_TASKS = 300  # 任务数超过这个值后不再做“导出再导入”，免得任务数成倍增长
+
+
+def recount_rollups(conn):
+    """按 parent_id 逐节点重算子树汇总：{id: (sub_total, sub_done, sub_due)}"""
+    children = defaultdict(list)
+    for row in conn.execute("SELECT id, parent_id, completed, date(due_date) FROM tasks"):
+        children[row[1]].append(row)
+    totals = {}
+    # 后序遍历用显式栈，深链不受递归深度限制
+    stack = [(row, False) for row in children[None]]
+    while stack:
+        row, visited = stack.pop()
+        if not visited:
+            stack.append((row, True))
+            stack.extend((child, False) for child in children[row[0]])
+            continue
+        total = done = 0
+        due = None
+        for child in children[row[0]]:
+            child_total, child_done, child_due = totals[child[0]]
+            total += 1 + child_total
+            done += child[2] + child_done
+            for day in (None if child[2] else child[3], child_due):
+                if day is not None and (due is None or day < due):
+                    due = day
+        totals[row[0]] = (total, done, due)
+    return totals
+
+
+def stored_rollups(conn):
+    return {row[0]: row[1:] for row in conn.execute("SELECT id, sub_total, sub_done, sub_due FROM tasks")}
+
+
+def task_ids(store):
+    return [row[0] for row in store.conn.execute("SELECT id FROM tasks")]
+
+
+def random_edit(store, rng, workdir):
+    """对随机任务做一次随机写操作，返回操作名；不合法的操作（如移到自己的后代下）TaskStore 抛出 ValueError，忽略"""
+    ids = task_ids(store)
+    if not ids:
+        store.add_task(None, "任务", rng.choice(DATES))
+        return "add_task"
+    a, b = rng.choice(ids), rng.choice(ids)
+    some = rng.sample(ids, min(3, len(ids)))
+    operations = [
+        ("add_task", lambda: store.add_task(rng.choice([None, a]), "任务", rng.choice(DATES))),
+        ("add_task after", lambda: store.add_task(None, "任务", rng.choice(DATES), None, b)),
+        ("update_task", lambda: store.update_task(a, "改名", rng.choice(DATES), None)),
+        ("delete_task", lambda: store.delete_task(a)),
+        ("delete_tasks", lambda: store.delete_tasks(some)),
+        ("move_task", lambda: store.move_task(a, rng.choice([None, b]))),
+        ("move_beside", lambda: store.move_beside(a, b, rng.random() < 0.5)),
+        ("move_tasks", lambda: store.move_tasks(some, rng.choice([None, b]))),
+        ("toggle_completed", lambda: store.toggle_completed(a)),
+        ("toggle_completed_many", lambda: store.toggle_completed_many(some)),
+    ]
+    if len(ids) < IMPORT_MAX_TASKS:
+        operations.append(("import_tasks", lambda: _reimport(store, rng.choice([None, a]), workdir)))
+    name, operation = rng.choice(operations)
+    try:
+        operation()
+    except ValueError:
+        pass
+    return name
+
+
+def _reimport(store, parent_id, workdir):
+    """把整棵树导出后再导入到 parent_id 之下"""
+    path = os.path.join(workdir, "export.jsonl")
+    store.export_tasks(path)
+    store.import_tasks(path, parent_id)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_rollups_match_recount(store, tmp_path, seed):
+    """每次写操作之后，sub_total / sub_done / sub_due 与逐节点重算的结果一致，rebuild_all 之后也一致"""
+    rng = random.Random(seed)
+    for step in range(STEPS):
+        name = random_edit(store, rng, tmp_path)
+        stored, expected = stored_rollups(store.conn), recount_rollups(store.conn)
+        wrong = [task_id for task_id in expected if stored[task_id] != expected[task_id]][:5]
+        assert not wrong, (f"第 {step} 步 {name} 之后，任务 {wrong} 的汇总为 {[stored[i] for i in wrong]}，"
+                           f"应为 {[expected[i] for i in wrong]}")
+    with store.conn:
+        rebuild_all(store.conn)
+    assert stored_rollups(store.conn) == recount_rollups(store.conn), "rebuild_all 之后汇总与重算结果不一致"
+
+
+class ListModel:
+    """任务树的内存模型：每一级按 sort_order 排列的 id 列表；显示时未完成在前，各段内保持列表顺序"""
+
+    def __init__(self):
+        self.parents = {}
+        self.children = defaultdict(list)
+        self.completed = {}
+
+    def display(self, parent_id):
+        tasks = self.children[parent_id]
+        return ([task_id for task_id in tasks if not self.completed[task_id]]
+                + [task_id for task_id in tasks if self.completed[task_id]])
+
+    def subtree(self, task_id):
+        found = [task_id]
+        for task in found:
+            found.extend(self.children[task])
+        return found
+
+    def can_move(self, task_id, parent_id):
+        """task_id 能否移到 parent_id 之下：不能移到自身或自己的后代下"""
+        return parent_id not in self.subtree(task_id)
+
+    def outermost(self, task_ids):
+        chosen = set(task_ids)
+        result = []
+        for task_id in dict.fromkeys(task_ids):
+            parent_id = self.parents[task_id]
+            while parent_id is not None and parent_id not in chosen:
+                parent_id = self.parents[parent_id]
+            if parent_id is None:
+                result.append(task_id)
+        return result
+
+    def add(self, task_id, parent_id, target_id=None, after=False):
+        """新任务放在 parent_id 下的末尾，或 target_id 之前 / 之后"""
+        self.parents[task_id] = None
+        self.children[None].append(task_id)
+        self.completed[task_id] = 0
+        self.place(task_id, parent_id, target_id, after)
+
+    def place(self, task_id, parent_id, target_id=None, after=False):
+        self.children[self.parents[task_id]].remove(task_id)
+        self.parents[task_id] = parent_id
+        tasks = self.children[parent_id]
+        tasks.insert(len(tasks) if target_id is None else tasks.index(target_id) + after, task_id)
+
+    def delete(self, task_id):
+        self.children[self.parents[task_id]].remove(task_id)
+        for task in self.subtree(task_id):
+            del self.parents[task], self.completed[task]
+
+
+def _ordering_step(store, model, rng):
+    """做一次随机操作并同步更新模型，返回操作名；模型与 TaskStore 对操作是否合法的判断必须一致"""
+    ids = list(model.parents)
+    if not ids:
+        task, _ = store.add_task(None, "任务")
+        model.add(task.id, None)
+        return "add_task"
+    a, b = rng.choice(ids), rng.choice(ids)
+    name = rng.choice(["add_task", "add_task after", "move_task", "move_beside", "move_tasks_beside",
+                       "swap_order", "toggle_completed", "delete_task"])
+    if name == "add_task":
+        parent_id = rng.choice([None, a])
+        task, _ = store.add_task(parent_id, "任务")
+        model.add(task.id, parent_id)
+    elif name == "add_task after":
+        task, _ = store.add_task(None, "任务", after_id=b)
+        model.add(task.id, model.parents[b], b, True)
+    elif name == "move_task":
+        parent_id = rng.choice([None, b])
+        valid = model.can_move(a, parent_id)
+        if _raises(store.move_task, a, parent_id) == valid:
+            raise AssertionError(f"move_task({a}, {parent_id}) 的合法性与模型不一致")
+        if valid:
+            model.place(a, parent_id)
+    elif name == "move_beside":
+        after = rng.random() < 0.5
+        valid = a != b and model.can_move(a, model.parents[b])
+        if _raises(store.move_beside, a, b, after) == valid:
+            raise AssertionError(f"move_beside({a}, {b}, {after}) 的合法性与模型不一致")
+        if valid:
+            model.place(a, model.parents[b], b, after)
+    elif name == "move_tasks_beside":
+        chosen = rng.sample(ids, min(3, len(ids)))
+        after = rng.random() < 0.5
+        moved = model.outermost(chosen)
+        valid = b not in moved and all(model.can_move(task_id, model.parents[b]) for task_id in moved)
+        if _raises(store.move_tasks_beside, chosen, b, after) == valid:
+            raise AssertionError(f"move_tasks_beside({chosen}, {b}, {after}) 的合法性与模型不一致")
+        if valid:
+            anchor = b
+            for task_id in moved:
+                model.place(task_id, model.parents[b], anchor, after)
+                if after:
+                    anchor = task_id
+    elif name == "swap_order":
+        b = rng.choice(model.children[model.parents[a]])
+        store.swap_order(a, b)
+        tasks = model.children[model.parents[a]]
+        i, j = tasks.index(a), tasks.index(b)
+        tasks[i], tasks[j] = tasks[j], tasks[i]
+    elif name == "toggle_completed":
+        status = 0 if model.completed[a] else 1
+        store.toggle_completed(a)
+        for task_id in model.subtree(a):
+            model.completed[task_id] = status
+    else:
+        store.delete_task(a)
+        model.delete(a)
+    return name
+
+
+def _raises(operation, *args):
+    try:
+        operation(*args)
+    except ValueError:
+        return True
+    return False
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("gap", [taskOrdering.GAP, 2])  # 间隔为 2 时几乎每次插入都要重新编号
+def test_ordering_matches_list_model(store, monkeypatch, seed, gap):
+    """添加、移动、交换、完成 / 取消完成之后，每一级的显示顺序与列表模型一致"""
+    monkeypatch.setattr(taskOrdering, "GAP", gap)
+    rng = random.Random(seed)
+    model = ListModel()
+    for step in range(STEPS):
+        name = _ordering_step(store, model, rng)
+        for parent_id in [None] + list(model.parents):
+            shown = [task.id for task in store.get_children(parent_id)]
+            expected = model.display(parent_id)
+            assert shown == expected, f"第 {step} 步 {name} 之后，{parent_id} 的子任务顺序为 {shown}，应为 {expected}"
+
+
+def snapshot(conn, exclude_id=None):
+    return conn.execute("SELECT * FROM tasks WHERE id IS NOT ? ORDER BY id", (exclude_id,)).fetchall()
+
+
+def top_step(store):
+    return store.conn.execute("SELECT MAX(step) FROM task_journal_steps WHERE stack = 'undo' AND owner = ?",
+                              (store.session,)).fetchone()[0]
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_journal_undo_redo(store, tmp_path, seed):
+    """每次写操作之后没有未归入某一步的日志；撤销到底、再重做，每一步都回到当时的任务表；
+    另一个会话的修改不被撤销，之后它改过同一任务时拒绝撤销"""
+    rng = random.Random(seed)
+    snapshots = [snapshot(store.conn)]
+    for step in range(STEPS):
+        before = top_step(store)
+        name = random_edit(store, rng, tmp_path)
+        stray = store.conn.execute("SELECT COUNT(*) FROM task_journal WHERE step IS NULL").fetchone()[0]
+        assert not stray, f"第 {step} 步 {name} 之后有 {stray} 条日志未归入任何一步"
+        if top_step(store) != before:
+            snapshots.append(snapshot(store.conn))
+        else:
+            assert snapshot(store.conn) == snapshots[-1], f"第 {step} 步 {name} 修改了任务却没有记入撤销日志"
+
+    other = TaskStore(store.path)
+    try:
+        other_task, _ = other.add_task(None, "另一个会话")
+        # 撤销到底（最多 UNDO_LEVELS 步）：每一步都回到当时的任务表，另一个会话添加的任务不受影响
+        current = len(snapshots) - 1
+        while store.undo() is not None:
+            current -= 1
+            assert snapshot(store.conn, other_task.id) == snapshots[current], f"撤销到第 {current} 步时任务表不一致"
+            assert stored_rollups(store.conn) == recount_rollups(store.conn), f"撤销到第 {current} 步时汇总不一致"
+        assert current == max(0, len(snapshots) - 1 - UNDO_LEVELS), f"只撤销到第 {current} 步"
+        assert store.get_task(other_task.id) is not None, "撤销了另一个会话添加的任务"
+        undone = len(snapshots) - 1 - current
+        for _ in range(undone // 2):
+            assert store.redo() is not None, f"重做到第 {current} 步时重做栈为空"
+            current += 1
+            assert snapshot(store.conn, other_task.id) == snapshots[current], f"重做到第 {current} 步时任务表不一致"
+        # 新的修改清空重做栈；另一个会话之后改过同一任务时拒绝撤销，任务表不变
+        task, _ = store.add_task(None, "新任务")
+        assert store.redo() is None, "新的修改之后仍能重做"
+        other.rename_task(task.id, "另一个会话改名")
+        before = snapshot(store.conn)
+        with pytest.raises(ValueError):
+            store.undo()
+        assert snapshot(store.conn) == before, "拒绝撤销时任务表被修改"
+    finally:
+        other.close()
@@ -0,0 +1,40 @@
+# 数据库结构升级：两个进程同时打开旧数据库时，每一步只执行一次
+import sqlite3
+
+import taskDatabase
+
+
+class RacingConnection(sqlite3.Connection):
+    """第一次开始事务前，让另一个连接（相当于另一个进程）抢先把数据库升级完"""
+    path = None
+    raced = False
+
+    def execute(self, sql, *args):
+        if sql.startswith("BEGIN") and not RacingConnection.raced:
+            RacingConnection.raced = True
+            taskDatabase.connect(self.path).close()
+        return super().execute(sql, *args)
+
+
+def test_concurrent_migrate_skips_applied_steps(tmp_path, monkeypatch):
+    path = str(tmp_path / "task_tree.db")
+    monkeypatch.setattr(RacingConnection, "path", path)
+    monkeypatch.setattr(RacingConnection, "raced", False)
+    conn = sqlite3.connect(path, factory=RacingConnection)
+    try:
+        taskDatabase.migrate(conn)
+        assert RacingConnection.raced
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == len(taskDatabase.MIGRATIONS)
+    finally:
+        conn.close()
+
+
+def test_migrate_is_idempotent(tmp_path):
+    path = str(tmp_path / "task_tree.db")
+    taskDatabase.connect(path).close()
+    conn = taskDatabase.connect(path)
+    try:
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert "idx_tasks_parent_order" in indexes
+    finally:
+        conn.close()
@@ -0,0 +1,108 @@
+# 写操作要么整体生效、要么整体回滚：Python 的 sqlite3 只在 INSERT / UPDATE / DELETE 前隐式 BEGIN，
+# WITH 开头的语句（祖先链汇总、子树删除等）不会，事务须由 TaskStore 显式开始
+import pytest
+
+import taskArchive
+import taskStore
+from taskJournal import forget
+
+
+def fail(*args):
+    raise RuntimeError("注入的失败")
+
+
+def state(store):
+    return store.conn.execute("SELECT * FROM tasks ORDER BY id").fetchall()
+
+
+@pytest.fixture
+def tree(store):
+    """父任务带两个子任务，撤销日志为空（新库、归档 / 恢复之后即是如此）"""
+    parent, _ = store.add_task(None, "父")
+    child, _ = store.add_task(parent.id, "子")
+    store.add_task(child.id, "孙")
+    with store.conn:
+        forget(store.conn)
+    return store, parent, child
+
+
+def test_failed_delete_rolls_back(tree, monkeypatch):
+    store, parent, child = tree
+    before = state(store)
+    monkeypatch.setattr(taskStore, "delete_subtree", fail)
+    with pytest.raises(RuntimeError):
+        store.delete_task(child.id)
+    assert not store.conn.in_transaction
+    assert state(store) == before
+    assert store.get_task(parent.id).sub_total == 2
+
+
+def test_failed_toggle_rolls_back(tree, monkeypatch):
+    store, parent, child = tree
+    before = state(store)
+    monkeypatch.setattr(taskStore, "refresh_subtree_completed", fail)
+    with pytest.raises(RuntimeError):
+        store.toggle_completed(child.id)
+    assert state(store) == before
+
+
+def test_failed_operation_leaves_no_journal_rows(tree, monkeypatch):
+    store, parent, child = tree
+    monkeypatch.setattr(taskStore, "refresh_due", fail)
+    with pytest.raises(RuntimeError):
+        store.delete_task(child.id)
+    assert store.conn.execute("SELECT COUNT(*) FROM task_journal").fetchone()[0] == 0
+
+
+def test_failed_undo_rolls_back(tree, monkeypatch):
+    store, parent, child = tree
+    store.delete_task(child.id)
+    before = state(store)
+
+    def half_replay(conn, stack, owner):
+        conn.execute("WITH doomed AS (SELECT id FROM tasks) DELETE FROM tasks WHERE id IN doomed")
+        fail()
+
+    monkeypatch.setattr(taskStore, "replay_step", half_replay)
+    with pytest.raises(RuntimeError):
+        store.undo()
+    assert state(store) == before
+
+
+@pytest.fixture
+def archived(tree):
+    """子任务（连同孙任务）已完成 60 天，归档后留下父任务"""
+    store, parent, child = tree
+    store.toggle_completed(child.id)
+    with store.conn:
+        store.conn.execute("UPDATE tasks SET completed_at = datetime('now', '-60 days') WHERE completed")
+    return store, parent, child
+
+
+def archive_state(store):
+    return store.conn.execute("SELECT * FROM tasks_archive ORDER BY id").fetchall()
+
+
+def test_failed_archive_rolls_back(archived, monkeypatch):
+    store, parent, child = archived
+    before = state(store)
+    monkeypatch.setattr(taskArchive, "_now", fail)
+    with pytest.raises(RuntimeError):
+        store.archive_completed()
+    assert state(store) == before
+    assert archive_state(store) == []
+
+
+def test_failed_restore_rolls_back(archived, monkeypatch):
+    store, parent, child = archived
+    assert store.archive_completed() == 2
+    assert store.get_task(parent.id).sub_total == 0
+    before, archive_before = state(store), archive_state(store)
+    monkeypatch.setattr(taskArchive, "rebuild_subtrees", fail)
+    with pytest.raises(RuntimeError):
+        store.restore_archived([child.id])
+    assert state(store) == before
+    assert archive_state(store) == archive_before
+    monkeypatch.undo()
+    store.restore_archived([child.id])
+    assert store.get_task(parent.id).sub_total == 2
@@ -0,0 +1,99 @@
+# 导入 / 导出：各格式导出后再导入，树的结构与字段不变；格式错误时给出明确的 ValueError
+import json
+
+import pytest
+
+from taskStore import TaskStore
+from taskTransfer import iter_export_rows
+
+FORMATS = ["jsonl", "json", "csv", "md"]
+
+
+def outline(store):
+    """按显示顺序的 (深度, 名称, 截止日期, 完成时间, 是否完成)"""
+    return [(row["depth"], row["name"], row["due_date"], row["finish_time"], row["completed"])
+            for row in iter_export_rows(store.conn)]
+
+
+@pytest.fixture
+def sample(store):
+    """两棵树：含完成的子树、截止日期、完成时间和多层嵌套"""
+    project, _ = store.add_task(None, "项目", "2025-03-01")
+    design, _ = store.add_task(project.id, "设计")
+    store.add_task(design.id, "草图", None, "2025-01-02 09:30")
+    store.add_task(design.id, "评审")
+    store.toggle_completed(design.id)
+    store.add_task(project.id, "实现", "2025-02-01")
+    store.add_task(None, "杂项")
+    return store
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_round_trip(sample, tmp_path, fmt):
+    path = str(tmp_path / f"tasks.{fmt}")
+    assert sample.export_tasks(path) == 6
+    target = TaskStore(str(tmp_path / "target.db"))
+    try:
+        assert target.import_tasks(path) == 6
+        assert outline(target) == outline(sample)
+    finally:
+        target.close()
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_import_under_parent_updates_rollups(sample, tmp_path, fmt):
+    path = str(tmp_path / f"tasks.{fmt}")
+    sample.export_tasks(path)
+    inbox, _ = sample.add_task(None, "收件箱")
+    assert sample.import_tasks(path, inbox.id) == 6
+    assert sample.get_task(inbox.id).sub_total == 6
+    assert [task.name for task in sample.get_children(inbox.id)] == ["项目", "杂项"]
+    assert sample.undo() is not None
+    assert sample.get_task(inbox.id).sub_total == 0
+
+
+def test_unknown_extension(store, tmp_path):
+    with pytest.raises(ValueError):
+        store.import_tasks(str(tmp_path / "tasks.txt"))
+
+
+def write_jsonl(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return str(path)
+
+
+@pytest.mark.parametrize("records, message", [
+    ([{"id": 1, "name": "a"}, {"id": 2, "name": "b", "parent_id": 99}], "父任务 99 不在文件中"),
+    ([{"id": 1, "name": "a", "parent_id": 2}, {"id": 2, "name": "b", "parent_id": 1}], "构成循环"),
+    ([{"id": 1, "name": "a"}, {"name": "b"}], "第 2 条记录缺少 id"),
+    ([{"id": 1}], "第 1 条记录缺少 name"),
+    ([{"id": 1, "name": "a", "completed": "true"}], "第 1 条记录的 completed 应为整数"),
+    ([{"id": 0, "name": "a"}], "第 1 条记录的 id 应为正整数"),
+])
+def test_invalid_records_roll_back(store, tmp_path, records, message):
+    parent, _ = store.add_task(None, "目标")
+    with pytest.raises(ValueError, match=message):
+        store.import_tasks(write_jsonl(tmp_path / "bad.jsonl", records), parent.id)
+    assert store.get_task(parent.id).sub_total == 0
+    assert store.conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0] == 1
+    # 触发器随回滚恢复，之后的修改照常记入全文索引与撤销日志
+    store.add_task(parent.id, "之后")
+    assert store.get_task(parent.id).sub_total == 1
+
+
+def test_markdown_plain_bullets_and_tabs(store, tmp_path):
+    path = tmp_path / "outline.md"
+    path.write_text("- 项目 📅 2025-03-01\n\t- [x] 设计\n\t\t* 草图\n\n  + 实现\n- [ ] 杂项\n", encoding="utf-8")
+    assert store.import_tasks(str(path)) == 5
+    assert outline(store) == [(0, "项目", "2025-03-01", None, 0), (1, "实现", None, None, 0),
+                              (1, "设计", None, None, 1), (2, "草图", None, None, 0), (0, "杂项", None, None, 0)]
+
+
+def test_markdown_unparseable_line(store, tmp_path):
+    path = tmp_path / "outline.md"
+    path.write_text("- [ ] 项目\n# 标题\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="第 2 行"):
+        store.import_tasks(str(path))
+    assert store.conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0] == 0
@@ -0,0 +1,25 @@
+class WriteBehindBuffer:
+    """合并界面状态（如节点展开/折叠）的写入：只记录脏数据，
+    延迟 delay_ms 后交给 DbWorker 一次写回；同一 key 多次修改只写最后一次"""
+
+    def __init__(self, root, db, write, delay_ms=300):
+        self.root = root
+        self.db = db
+        self.write = write  # write(store, {key: value})，应在一个事务内完成
+        self.delay_ms = delay_ms
+        self._pending = {}
+        self._after_id = None
+
+    def mark(self, key, value):
+        self._pending[key] = value
+        if self._after_id is None:
+            self._after_id = self.root.after(self.delay_ms, self.flush)
+
+    def flush(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        self.db.submit(self.write, pending)